@@ -5,6 +5,9 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+本番はこちらで動かす（gunicorn + UvicornWorker）。カレンダーのライブ更新(SSE)は
+長く接続を張るので ASGI が必要。WSGI で動かした場合はポーリングに切り替わる。
 """
 
 import os
@@ -20,13 +20,20 @@ if IS_PRODUCTION:
     DATABASES = {
         'default': dj_database_url.config(
             default=os.environ.get('DATABASE_URL'),
-            conn_max_age=600,
-            conn_health_checks=True,
+            # ASGI では同期処理がリクエストごとに別スレッドで動き、持続接続は使い回されずに溜まるので毎回閉じる
+            conn_max_age=0,
         )
     }
 
-    
-    
+    # カレンダーのバージョン番号・予定ありブロック・読書進捗のキャッシュは、
+    # 毎日のバッチ（cron）や管理コマンドの書き込みも見えるようにDBで共有する（createcachetable で作成）
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+
     STATIC_ROOT = BASE_DIR / 'staticfiles'
     STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
     MEDIA_URL = 'media/'
@@ -46,6 +53,12 @@ else:
             'NAME': BASE_DIR / 'db.sqlite3',
         }
     }
+    # 開発環境はプロセス内のキャッシュ（runserver 1プロセス前提。管理コマンドの変更は再起動まで見えない）
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 
 # Application definition
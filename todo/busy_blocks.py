@@ -0,0 +1,112 @@
+from bisect import bisect_left
+
+from django.core.cache import cache
+
+from .models import Schedule, TODAY_TASK_TITLE
+from .recurrence import build_recurrence_specs, expand_occurrences
+
+
+# 公開カレンダーに「予定あり」として表示するユーザー
+PUBLIC_CALENDAR_OWNER_ID = 1
+BUSY_BLOCKS_KEY = "todo:busy-blocks:{user_id}"
+BUSY_RECURRENCES_KEY = "todo:busy-recurrences:{user_id}"
+
+
+def merge_intervals(intervals):
+    """重なっている/隣接している区間をまとめて、開始順の和集合にする"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def _busy_schedules(user_id):
+    return (
+        Schedule.objects
+        .filter(owner_id=user_id)
+        .exclude(title_override=TODAY_TASK_TITLE)
+    )
+
+
+def build_busy_blocks(user_id):
+    """全スケジュールから空き/予定ありブロックを作り直してキャッシュする"""
+    intervals = _busy_schedules(user_id).values_list('start_time', 'end_time')
+    blocks = merge_intervals(intervals)
+    cache.set(BUSY_BLOCKS_KEY.format(user_id=user_id), blocks, timeout=None)
+    return blocks
+
+
+def get_busy_blocks(user_id):
+    """キャッシュ済みのブロックを返す（無ければ作る）"""
+    blocks = cache.get(BUSY_BLOCKS_KEY.format(user_id=user_id))
+    if blocks is None:
+        blocks = build_busy_blocks(user_id)
+    return blocks
+
+
+def busy_blocks_in_range(blocks, range_start=None, range_end=None):
+    """開始順に並んだブロックから、表示範囲と重なるものだけを取り出す"""
+    if range_end is not None:
+        blocks = blocks[:bisect_left(blocks, (range_end,))]
+    if range_start is not None:
+        # 終了時刻も開始順に単調増加しているので二分探索できる
+        ends = [end for _, end in blocks]
+        blocks = blocks[bisect_left(ends, range_start):]
+    return blocks
+
+
+def add_busy_interval(user_id, start, end):
+    """追加された予定をキャッシュ済みのブロックに合流させる"""
+    key = BUSY_BLOCKS_KEY.format(user_id=user_id)
+    blocks = cache.get(key)
+    if blocks is None:
+        # まだ作られていなければ次の読み込み時にまとめて作る
+        return
+    cache.set(key, merge_intervals(blocks + [(start, end)]), timeout=None)
+
+
+def remove_busy_interval(user_id, start, end):
+    """削除/移動された予定を含むブロックだけを作り直す"""
+    key = BUSY_BLOCKS_KEY.format(user_id=user_id)
+    blocks = cache.get(key)
+    if blocks is None:
+        return
+    affected = [block for block in blocks if block[0] <= end and block[1] >= start]
+    if not affected:
+        return
+    span_start = min(block[0] for block in affected)
+    span_end = max(block[1] for block in affected)
+    intervals = (
+        _busy_schedules(user_id)
+        .filter(start_time__lte=span_end, end_time__gte=span_start)
+        .values_list('start_time', 'end_time')
+    )
+    untouched = [block for block in blocks if block not in affected]
+    cache.set(key, merge_intervals(untouched + list(intervals)), timeout=None)
+
+
+def get_busy_recurrences(user_id):
+    """繰り返しルールを展開用の辞書としてキャッシュから返す"""
+    key = BUSY_RECURRENCES_KEY.format(user_id=user_id)
+    specs = cache.get(key)
+    if specs is None:
+        specs = build_recurrence_specs(user_id)
+        cache.set(key, specs, timeout=None)
+    return specs
+
+
+def invalidate_busy_recurrences(user_id):
+    cache.delete(BUSY_RECURRENCES_KEY.format(user_id=user_id))
+
+
+def recurring_busy_intervals(user_id, range_start, range_end):
+    """表示範囲に入る繰り返しの回を (開始, 終了) で返す"""
+    return [
+        (start, end)
+        for spec in get_busy_recurrences(user_id)
+        for _, start, end in expand_occurrences(spec, range_start, range_end)
+    ]
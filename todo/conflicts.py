@@ -0,0 +1,83 @@
+from django.utils import timezone
+
+from .events import event_title
+from .models import Schedule, ScheduleRecurrence, TODAY_TASK_TITLE
+from .recurrence import occurrence_key, recurrences_for_range
+
+
+CONFLICT_FIELDS = (
+    'pk', 'start_time', 'end_time', 'page_count', 'title_override',
+    'action_category__name', 'action_item__title',
+)
+
+
+def blocks_in_range(user_id, range_start, range_end):
+    """範囲と重なる予定を {'id', 'title', 'start', 'end'} のリストで返す
+
+    実体のある予定は (owner, start_time, end_time) のインデックスで1回の範囲クエリ。
+    繰り返しの仮想の回も範囲の分だけ展開して含める。
+    """
+    rows = (
+        Schedule.objects
+        .filter(owner_id=user_id, start_time__lt=range_end, end_time__gt=range_start)
+        .exclude(title_override=TODAY_TASK_TITLE)
+        .values(*CONFLICT_FIELDS)
+    )
+    blocks = [
+        {'id': row['pk'], 'title': event_title(row), 'start': row['start_time'], 'end': row['end_time']}
+        for row in rows
+    ]
+    rules = ScheduleRecurrence.objects.filter(owner_id=user_id)
+    for rule, occurrence_date, start, end in recurrences_for_range(rules, range_start, range_end):
+        master = rule.schedule
+        row = {
+            'title_override': master.title_override,
+            'action_category__name': master.action_category.name if master.action_category else None,
+            'action_item__title': master.action_item.title if master.action_item else None,
+            'page_count': None,
+        }
+        blocks.append({
+            'id': occurrence_key(rule.pk, occurrence_date),
+            'title': event_title(row),
+            'start': start,
+            'end': end,
+        })
+    return blocks
+
+
+def find_conflicts(schedule):
+    """保存した予定と時間が重なる、同じユーザーの他の予定"""
+    if schedule.title_override == TODAY_TASK_TITLE:
+        return []
+    start, end = schedule.start_time, schedule.end_time
+    if start is None or end is None or end <= start:
+        return []
+    return sorted(
+        (block for block in blocks_in_range(schedule.owner_id, start, end) if block['id'] != schedule.pk),
+        key=lambda block: block['start'],
+    )
+
+
+def conflicts_in_range(user_id, range_start, range_end):
+    """範囲内で重なっている予定の組を (先の予定, 後の予定) のリストで返す
+
+    開始順に並べて走査し、まだ終わっていない予定とだけ比べる（sweep line）。
+    """
+    blocks = sorted(blocks_in_range(user_id, range_start, range_end), key=lambda block: (block['start'], block['end']))
+    pairs = []
+    active = []  # 走査中の時刻でまだ終わっていない予定
+    for block in blocks:
+        active = [other for other in active if other['end'] > block['start']]
+        pairs.extend((other, block) for other in active)
+        active.append(block)
+    return pairs
+
+
+def serialize_block(block):
+    return {
+        'id': block['id'],
+        'title': block['title'],
+        # DBから読んだ回(UTC)と繰り返しの回(現地時刻)が混ざるので、現地時刻に揃える
+        'start': timezone.localtime(block['start']).isoformat(),
+        'end': timezone.localtime(block['end']).isoformat(),
+    }
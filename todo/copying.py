@@ -0,0 +1,112 @@
+from bisect import bisect_left
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .busy_blocks import merge_intervals
+from .conflicts import blocks_in_range
+from .models import Schedule, Task, TODAY_TASK_TITLE
+from .signals import calendar_bulk_changed
+
+
+OVERLAP_ALLOW = "allow"
+OVERLAP_SKIP = "skip"
+OVERLAP_POLICIES = (
+    (OVERLAP_ALLOW, "重なっても作る"),
+    (OVERLAP_SKIP, "既存の予定と重なる回は作らない"),
+)
+
+
+class CopyResult:
+    def __init__(self):
+        self.created = 0
+        self.tasks = 0
+        self.skipped = 0
+
+
+def _local_midnight(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def _shift(value, days):
+    # 現地の時刻のまま日付だけずらす
+    return timezone.make_aware(timezone.localtime(value).replace(tzinfo=None) + timedelta(days=days))
+
+
+def _overlaps(busy, start, end):
+    """busy（開始順・重なりなし）のどれかと [start, end) が重なるか"""
+    # end より前に始まる最後の区間だけ見ればよい（それより前の区間はもっと前に終わっている）
+    index = bisect_left(busy, (end,)) - 1
+    return index >= 0 and busy[index][1] > start
+
+
+def copy_schedules(user, source_start, source_end, target_start, target_end, overlap=OVERLAP_ALLOW):
+    """source_start〜source_end の予定（タスクごと）を target_start〜target_end に繰り返し貼り付ける
+
+    元の期間の日数ごとにずらして並べ（1週間なら毎週）、target_end より後の日に始まる回は作らない。
+    「今日のタスク」の予定と繰り返しの仮想の回はコピーしない。ページ数は読んだ記録なので引き継がない。
+    Schedule と Task はそれぞれ bulk_create 1回で作る。
+    """
+    result = CopyResult()
+    period = (source_end - source_start).days + 1
+    sources = list(
+        Schedule.objects
+        .filter(owner=user, start_time__gte=_local_midnight(source_start), start_time__lt=_local_midnight(source_end + timedelta(days=1)))
+        .exclude(title_override=TODAY_TASK_TITLE)
+        .filter(daily_date__isnull=True)
+        .prefetch_related("tasks")
+        .order_by("start_time")
+    )
+
+    copies = []  # [(元の予定, 新しい予定)]
+    offset = (target_start - source_start).days
+    while source_start + timedelta(days=offset) <= target_end:
+        for source in sources:
+            start = _shift(source.start_time, offset)
+            if timezone.localtime(start).date() > target_end:
+                break
+            copies.append((source, Schedule(
+                owner=user,
+                action_category_id=source.action_category_id,
+                action_item_id=source.action_item_id,
+                title_override=source.title_override,
+                start_time=start,
+                end_time=_shift(source.end_time, offset),
+                # bulk_create は Task.save() を通らないので、カウンタは最初から入れておく
+                tasks_total=len(source.tasks.all()),
+            )))
+        offset += period
+    if not copies:
+        return result
+
+    if overlap == OVERLAP_SKIP:
+        # 貼り付け先の既存の予定を1回の範囲クエリで取り、まとめてから二分探索で判定する
+        busy = merge_intervals(
+            (block["start"], block["end"])
+            for block in blocks_in_range(
+                user.pk,
+                min(schedule.start_time for _, schedule in copies),
+                max(schedule.end_time for _, schedule in copies),
+            )
+        )
+        kept = [(source, schedule) for source, schedule in copies if not _overlaps(busy, schedule.start_time, schedule.end_time)]
+        result.skipped = len(copies) - len(kept)
+        copies = kept
+        if not copies:
+            return result
+
+    with transaction.atomic():
+        Schedule.objects.bulk_create([schedule for _, schedule in copies])
+        tasks = Task.objects.bulk_create([
+            Task(owner=user, schedule=schedule, title=task.title, position=task.position)
+            for source, schedule in copies
+            for task in source.tasks.all()
+        ])
+    result.created = len(copies)
+    result.tasks = len(tasks)
+
+    # シグナルが飛ばないので、キャッシュとライブ更新はここで行う
+    # （ページ数は引き継がないので読書統計・進み具合は変わらない）
+    calendar_bulk_changed(user.pk)
+    return result
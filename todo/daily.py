@@ -0,0 +1,158 @@
+from datetime import datetime, timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils import timezone
+
+from .models import DailyRoutineTask, Schedule, Task, TODAY_TASK_TITLE
+from .task_counts import rebuild_task_counts
+
+
+def _today_schedule_times(target_date):
+    start_time = timezone.make_aware(datetime.combine(target_date, datetime.min.time()))
+    end_time = timezone.make_aware(datetime.combine(target_date, datetime.max.time()))
+    return start_time, end_time
+
+
+def get_today_schedule(user, target_date=None):
+    """(owner, daily_date) のインデックスで「今日のタスク」を引く"""
+    target_date = target_date or timezone.localdate()
+    return Schedule.objects.filter(owner=user, daily_date=target_date).first()
+
+
+def sync_daily_routine_tasks(user, schedule):
+    """有効なルーティーンのうち、まだタスクになっていないものを追加する"""
+    routines = DailyRoutineTask.objects.filter(owner=user, active=True).order_by('position', 'id')
+    existing_routine_ids = set(
+        schedule.tasks.filter(daily_routine__isnull=False).values_list('daily_routine_id', flat=True)
+    )
+    next_position = (schedule.tasks.aggregate(max_position=Max('position'))['max_position'] or 0) + 1
+
+    new_tasks = []
+    for routine in routines:
+        if routine.id in existing_routine_ids:
+            continue
+        new_tasks.append(Task(
+            title=routine.title,
+            owner=user,
+            schedule=schedule,
+            daily_routine=routine,
+            position=next_position,
+        ))
+        next_position += 1
+
+    if new_tasks:
+        Task.objects.bulk_create(new_tasks, ignore_conflicts=True)
+        # bulk_create は save() を通らないので、カウンタは数え直す
+        rebuild_task_counts([schedule.pk])
+
+
+def get_or_create_today_schedule(user):
+    """バッチで作られていない場合（新規ユーザーなど）の保険"""
+    today = timezone.localdate()
+    schedule = get_today_schedule(user, today)
+    if schedule:
+        return schedule
+
+    start_time, end_time = _today_schedule_times(today)
+    with transaction.atomic():
+        schedule, _ = Schedule.objects.get_or_create(
+            owner=user,
+            daily_date=today,
+            defaults={
+                'title_override': TODAY_TASK_TITLE,
+                'start_time': start_time,
+                'end_time': end_time,
+            },
+        )
+        sync_daily_routine_tasks(user, schedule)
+    schedule.refresh_from_db(fields=Schedule.COUNTER_FIELDS)
+    return schedule
+
+
+def target_users(target_date, recent_days=30):
+    """日次バッチの対象: 有効なルーティーンを持つか、最近ログインしたユーザー"""
+    recent = timezone.make_aware(datetime.combine(target_date - timedelta(days=recent_days), datetime.min.time()))
+    return User.objects.filter(is_active=True).filter(
+        Q(dailyroutinetask__active=True) | Q(last_login__gte=recent)
+    ).distinct()
+
+
+def prepare_daily_schedules(target_date, users):
+    """対象ユーザー全員の「今日のタスク」とルーティーンのタスクをまとめて作る
+
+    作成したスケジュール数とタスク数を返す（ignore_conflicts で飛ばされた行は数えない）。
+    """
+    user_ids = list(users.values_list('pk', flat=True))
+    start_time, end_time = _today_schedule_times(target_date)
+
+    with transaction.atomic():
+        existing_owner_ids = set(
+            Schedule.objects
+            .filter(owner_id__in=user_ids, daily_date=target_date)
+            .values_list('owner_id', flat=True)
+        )
+        new_schedules = [
+            Schedule(
+                owner_id=user_id,
+                title_override=TODAY_TASK_TITLE,
+                daily_date=target_date,
+                start_time=start_time,
+                end_time=end_time,
+            )
+            for user_id in user_ids
+            if user_id not in existing_owner_ids
+        ]
+        Schedule.objects.bulk_create(new_schedules, ignore_conflicts=True)
+
+        schedule_ids = dict(
+            Schedule.objects
+            .filter(owner_id__in=user_ids, daily_date=target_date)
+            .values_list('owner_id', 'pk')
+        )
+        created_schedules = len(schedule_ids) - len(existing_owner_ids)
+        existing_pairs = set(
+            Task.objects
+            .filter(schedule_id__in=schedule_ids.values(), daily_routine__isnull=False)
+            .values_list('schedule_id', 'daily_routine_id')
+        )
+        next_positions = {
+            row['schedule_id']: (row['max_position'] or 0) + 1
+            for row in (
+                Task.objects
+                .filter(schedule_id__in=schedule_ids.values())
+                .values('schedule_id')
+                .annotate(max_position=Max('position'))
+            )
+        }
+
+        new_tasks = []
+        routines = (
+            DailyRoutineTask.objects
+            .filter(owner_id__in=schedule_ids.keys(), active=True)
+            .order_by('owner_id', 'position', 'id')
+        )
+        for routine in routines:
+            schedule_id = schedule_ids[routine.owner_id]
+            if (schedule_id, routine.pk) in existing_pairs:
+                continue
+            position = next_positions.get(schedule_id, 1)
+            next_positions[schedule_id] = position + 1
+            new_tasks.append(Task(
+                title=routine.title,
+                owner_id=routine.owner_id,
+                schedule_id=schedule_id,
+                daily_routine=routine,
+                position=position,
+            ))
+        Task.objects.bulk_create(new_tasks, ignore_conflicts=True)
+        created_tasks = 0
+        if new_tasks:
+            # ignore_conflicts では挿入された行数が分からないので、数え直して差を取る
+            created_tasks = Task.objects.filter(
+                schedule_id__in=schedule_ids.values(), daily_routine__isnull=False,
+            ).count() - len(existing_pairs)
+            rebuild_task_counts({task.schedule_id for task in new_tasks})
+
+    return created_schedules, created_tasks
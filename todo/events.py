@@ -0,0 +1,44 @@
+# カレンダー(FullCalendar)用のイベント辞書。一覧のJSONとライブ更新(SSE)で同じ形にする
+CALENDAR_EVENT_FIELDS = (
+    'pk', 'start_time', 'end_time', 'page_count', 'title_override',
+    'action_category__name', 'action_category__color', 'action_item__title',
+    'tasks_total', 'tasks_completed',
+)
+
+
+def event_title(row):
+    """カレンダーに出すタイトル（カテゴリ: アイテム (ページ数)、上書きがあればそれ）"""
+    if row['title_override']:
+        return row['title_override']
+    # タイトルをカテゴリから取得（未設定なら「未分類」）
+    title_text = row['action_category__name'] or "未分類"
+
+    # 具体的なアイテムが設定されていれば、タイトルに追加する
+    if row['action_item__title']:
+        title_text += f": {row['action_item__title']}"
+
+    if row['page_count']:
+        title_text += f" ({row['page_count']}p)"
+    return title_text
+
+
+def build_calendar_event(row, url_template):
+    """values() の1行からFullCalendar用のイベント辞書を作る"""
+    total_tasks = row['tasks_total']
+    if total_tasks > 0:
+        progress_percentage = int((row['tasks_completed'] / total_tasks) * 100)
+    else:
+        progress_percentage = 100
+
+    bg_color = row['action_category__color'] or "#6c757d"
+
+    return {
+        'id': row['pk'],
+        'title': event_title(row),
+        'start': row['start_time'].isoformat(),
+        'end': row['end_time'].isoformat(),
+        'url': url_template.replace('/0/', f"/{row['pk']}/"),
+        'backgroundColor': bg_color,
+        'borderColor': bg_color,
+        'extendedProps': {'progress': progress_percentage},
+    }
@@ -1,5 +1,8 @@
+from datetime import MAXYEAR, MINYEAR
+
 from django import forms
-from .models import Schedule, Task, ActionItem, ActionCategory, DailyRoutineTask
+from .copying import OVERLAP_POLICIES, OVERLAP_SKIP
+from .models import Schedule, ScheduleRecurrence, Task, ActionItem, ActionCategory, DailyRoutineTask
 
 class ActionCategoryForm(forms.ModelForm):
     class Meta:
@@ -49,13 +52,14 @@ class PrivateActionItemForm(ActionItemForm):
 class ReadingActionItemForm(forms.ModelForm):
     class Meta:
         model = ActionItem
-        fields = ['title', 'theme', 'reading_purpose', 'book_image', 'book_author']
+        fields = ['title', 'theme', 'reading_purpose', 'book_image', 'book_author', 'total_pages']
         widgets = {
             'title': forms.TextInput(attrs={'class': 'form-control'}),
             'theme': forms.TextInput(attrs={'class': 'form-control'}),
             'reading_purpose': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'book_image': forms.ClearableFileInput(attrs={'class': 'form-control'}),
             'book_author': forms.TextInput(attrs={'class': 'form-control'}),
+            'total_pages': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
         }
         labels = {
             'title': '書籍タイトル',
@@ -63,6 +67,7 @@ class ReadingActionItemForm(forms.ModelForm):
             'reading_purpose': '読む目的',
             'book_image': '書籍画像',
             'book_author': '作者',
+            'total_pages': '総ページ数',
         }
 
 class ScheduleForm(forms.ModelForm):
@@ -91,6 +96,61 @@ class ScheduleForm(forms.ModelForm):
             self.fields['action_item'].required = False
             self.fields['action_item'].empty_label = "（指定なし）"
 
+WEEKDAY_CHOICES = [
+    ('0', '月'), ('1', '火'), ('2', '水'), ('3', '木'), ('4', '金'), ('5', '土'), ('6', '日'),
+]
+
+
+class ScheduleRecurrenceForm(forms.ModelForm):
+    # 空欄なら繰り返さない
+    frequency = forms.ChoiceField(
+        label='繰り返し',
+        choices=[('', '繰り返さない')] + list(ScheduleRecurrence.Frequency.choices),
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+    weekdays = forms.MultipleChoiceField(
+        label='曜日',
+        choices=WEEKDAY_CHOICES,
+        required=False,
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
+    )
+
+    class Meta:
+        model = ScheduleRecurrence
+        fields = ['frequency', 'interval', 'weekdays', 'until']
+        labels = {
+            'interval': '間隔',
+            'until': '終了日',
+        }
+        widgets = {
+            'interval': forms.NumberInput(attrs={'class': 'form-control', 'min': 1}),
+            'until': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['interval'].required = False
+        if self.instance.pk:
+            self.initial['weekdays'] = [str(day) for day in self.instance.weekday_list()]
+
+    def clean_interval(self):
+        return self.cleaned_data.get('interval') or 1
+
+    def clean_weekdays(self):
+        return ','.join(sorted(self.cleaned_data.get('weekdays') or []))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('frequency') == ScheduleRecurrence.Frequency.WEEKDAYS and not cleaned_data.get('weekdays'):
+            self.add_error('weekdays', '曜日を1つ以上選択してください')
+        return cleaned_data
+
+    @property
+    def is_recurring(self):
+        return bool(self.cleaned_data.get('frequency'))
+
+
 # TaskForm は変更なし
 class TaskForm(forms.ModelForm):
     class Meta:
@@ -121,3 +181,54 @@ class DailyRoutineTaskForm(forms.ModelForm):
             'active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
             'position': forms.NumberInput(attrs={'class': 'form-control', 'min': 0}),
         }
+
+
+class ScheduleImportForm(forms.Form):
+    file = forms.FileField(
+        label='ファイル (.ics / .csv)',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.ics,.csv,text/calendar,text/csv'}),
+    )
+
+
+class ScheduleCopyForm(forms.Form):
+    # 元の期間は1か月まで、貼り付け先は1年まで
+    MAX_SOURCE_DAYS = 31
+    MAX_TARGET_DAYS = 366
+
+    source_start = forms.DateField(label='コピー元の開始日', widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    source_end = forms.DateField(label='コピー元の終了日', widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    target_start = forms.DateField(label='貼り付け先の開始日', widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    target_end = forms.DateField(label='貼り付け先の終了日', widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    overlap = forms.ChoiceField(
+        label='既存の予定との重なり',
+        choices=OVERLAP_POLICIES,
+        initial=OVERLAP_SKIP,
+        widget=forms.Select(attrs={'class': 'form-select'}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        source_start, source_end = cleaned_data.get('source_start'), cleaned_data.get('source_end')
+        target_start, target_end = cleaned_data.get('target_start'), cleaned_data.get('target_end')
+        if not all((source_start, source_end, target_start, target_end)):
+            return cleaned_data
+        # 期間の翌日やUTCへの変換で日付の範囲を超えないように、両端の年は受け付けない
+        out_of_range = [
+            name for name in ('source_start', 'source_end', 'target_start', 'target_end')
+            if not MINYEAR < cleaned_data[name].year < MAXYEAR
+        ]
+        for name in out_of_range:
+            self.add_error(name, f'{MINYEAR + 1}年から{MAXYEAR - 1}年の間で指定してください。')
+        if out_of_range:
+            return cleaned_data
+        if source_end < source_start:
+            self.add_error('source_end', '開始日以降の日付を指定してください。')
+        elif (source_end - source_start).days >= self.MAX_SOURCE_DAYS:
+            self.add_error('source_end', f'コピー元は{self.MAX_SOURCE_DAYS}日以内にしてください。')
+        if target_end < target_start:
+            self.add_error('target_end', '開始日以降の日付を指定してください。')
+        elif (target_end - target_start).days >= self.MAX_TARGET_DAYS:
+            self.add_error('target_end', f'貼り付け先は{self.MAX_TARGET_DAYS}日以内にしてください。')
+        if target_start <= source_end and source_start <= target_end:
+            self.add_error('target_start', 'コピー元と重ならない期間を指定してください。')
+        return cleaned_data
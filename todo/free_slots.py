@@ -0,0 +1,99 @@
+from datetime import datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .busy_blocks import merge_intervals
+from .conflicts import blocks_in_range
+from .models import ActionItem, Schedule
+from .signals import calendar_bulk_changed
+
+
+def working_windows(start_date, end_date, day_start, day_end):
+    """start_date〜end_date の各日の作業時間帯を (開始, 終了) のリストで返す"""
+    windows = []
+    current = start_date
+    while current <= end_date:
+        windows.append((
+            timezone.make_aware(datetime.combine(current, day_start)),
+            timezone.make_aware(datetime.combine(current, day_end)),
+        ))
+        current += timedelta(days=1)
+    return windows
+
+
+def _subtract(windows, busy, min_length):
+    """作業時間帯から予定（開始順・重なりなし）を除いた、min_length 以上の空き時間
+
+    どちらも開始順なので、予定の位置を覚えたまま1回走査するだけで済む。
+    """
+    slots = []
+    index = 0
+    for window_start, window_end in windows:
+        cursor = window_start
+        # この時間帯より前に終わる予定は、以降の時間帯にも関係しない
+        while index < len(busy) and busy[index][1] <= cursor:
+            index += 1
+        current = index
+        while current < len(busy) and busy[current][0] < window_end:
+            busy_start, busy_end = busy[current]
+            if busy_start - cursor >= min_length:
+                slots.append((cursor, busy_start))
+            cursor = max(cursor, busy_end)
+            current += 1
+        if window_end - cursor >= min_length:
+            slots.append((cursor, window_end))
+    return slots
+
+
+def find_free_slots(user_id, start_date, end_date, day_start, day_end, duration):
+    """期間内の作業時間帯で、duration 以上続く空き時間を開始順に返す（今より前は含めない）"""
+    now = timezone.now()
+    windows = [
+        (max(start, now), end)
+        for start, end in working_windows(start_date, end_date, day_start, day_end)
+        if end > now
+    ]
+    if not windows:
+        return []
+    # 期間内の予定を1回の範囲クエリで取り、並べ替えて重なりをまとめてから引く
+    blocks = blocks_in_range(user_id, windows[0][0], windows[-1][1])
+    busy = merge_intervals((block['start'], block['end']) for block in blocks)
+    return _subtract(windows, busy, duration)
+
+
+def place_action_items(user, items, slots, duration):
+    """items を順に（期日の早い順に渡す）、入る最初の空き時間へ詰めてスケジュールを作る
+
+    所要時間はどれも同じなので、入らなかった空き時間は後の項目にも入らない。
+    空き時間の位置を進めるだけの貪欲法で、Schedule は bulk_create 1回で作る。
+    戻り値は [(item, schedule), ...]（入りきらなかった項目は含まない）
+    """
+    slots = [list(slot) for slot in slots]
+    index = 0
+    placements = []
+    for item in items:
+        while index < len(slots) and slots[index][1] - slots[index][0] < duration:
+            index += 1
+        if index == len(slots):
+            break
+        start = slots[index][0]
+        slots[index][0] = start + duration
+        placements.append((item, Schedule(
+            owner=user,
+            action_item=item,
+            action_category_id=item.category_id,
+            start_time=start,
+            end_time=start + duration,
+        )))
+    if not placements:
+        return []
+
+    with transaction.atomic():
+        Schedule.objects.bulk_create([schedule for _, schedule in placements])
+        ActionItem.objects.filter(pk__in=[item.pk for item, _ in placements]).update(is_scheduled=True)
+
+    # bulk_create はシグナルが飛ばないので、キャッシュとライブ更新はここで行う
+    # （ページ数は入れないので読書統計は変わらない）
+    calendar_bulk_changed(user.pk)
+    return placements
@@ -0,0 +1,198 @@
+from datetime import date, datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.utils import timezone
+
+from .models import Schedule, ScheduleRecurrence, TODAY_TASK_TITLE
+
+
+ICS_FEED_SALT = "todo.ics-feed"
+ICS_CHUNK_SIZE = 500
+ICAL_WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+
+
+def make_feed_token(user):
+    """購読用URLに入れるトークン（ログインなしでカレンダーアプリから読むため）"""
+    return signing.dumps(user.pk, salt=ICS_FEED_SALT)
+
+
+def read_feed_token(token):
+    """トークンからユーザーIDを取り出す。不正なら None"""
+    try:
+        return signing.loads(token, salt=ICS_FEED_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def _escape(value):
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """RFC 5545 の行の折り返し（75オクテットごと）"""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line + "\r\n"
+    parts = []
+    current = ""
+    limit = 75
+    for char in line:
+        if len((current + char).encode("utf-8")) > limit:
+            parts.append(current)
+            current = ""
+            limit = 74  # 2行目以降は先頭の空白の分だけ短い
+        current += char
+    parts.append(current)
+    return "\r\n ".join(parts) + "\r\n"
+
+
+def _format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def _summary(row):
+    """カレンダーのイベントと同じタイトルにする"""
+    if row["title_override"]:
+        return row["title_override"]
+    summary = row["action_category__name"] or "未分類"
+    if row["action_item__title"]:
+        summary += f": {row['action_item__title']}"
+    if row["page_count"]:
+        summary += f" ({row['page_count']}p)"
+    return summary
+
+
+def _description(row):
+    lines = []
+    if row["action_category__name"]:
+        lines.append(f"カテゴリ: {row['action_category__name']}")
+    if row["action_item__title"]:
+        lines.append(f"アクション: {row['action_item__title']}")
+    if row["start_page"] is not None and row["end_page"] is not None:
+        lines.append(f"ページ: {row['start_page']} - {row['end_page']}")
+    if row["page_count"]:
+        lines.append(f"ページ数: {row['page_count']}p")
+    if row["tasks_total"]:
+        lines.append(f"タスク: {row['tasks_completed']} / {row['tasks_total']}")
+    return "\n".join(lines)
+
+
+def _recurrence_lines(rule, materialized_dates):
+    """繰り返しルールを RRULE / EXDATE にする。実体化済みの回は別のイベントとして出すので除外する"""
+    frequency = "DAILY" if rule["frequency"] == ScheduleRecurrence.Frequency.DAILY else "WEEKLY"
+    parts = [f"FREQ={frequency}"]
+    if rule["interval"] > 1:
+        parts.append(f"INTERVAL={rule['interval']}")
+    if rule["frequency"] == ScheduleRecurrence.Frequency.WEEKDAYS and rule["weekdays"]:
+        weekdays = [ICAL_WEEKDAYS[int(value)] for value in rule["weekdays"].split(",") if value.strip().isdigit()]
+        parts.append("BYDAY=" + ",".join(weekdays))
+        parts.append("WKST=MO")
+    if rule["until"]:
+        # 最終日の終わり（現地時間）までを含める
+        until = timezone.make_aware(datetime.combine(rule["until"], datetime.max.time()))
+        parts.append(f"UNTIL={_format_datetime(until)}")
+    lines = ["RRULE:" + ";".join(parts)]
+
+    skip_dates = {date.fromisoformat(value) for value in rule["exception_dates"]} | materialized_dates
+    if skip_dates:
+        local_time = timezone.localtime(rule["schedule__start_time"]).time().replace(tzinfo=None)
+        values = [
+            _format_datetime(timezone.make_aware(datetime.combine(skip_date, local_time)))
+            for skip_date in sorted(skip_dates)
+        ]
+        lines.append("EXDATE:" + ",".join(values))
+    return lines
+
+
+def _recurrences_by_schedule(user_id):
+    """スケジュールID → 繰り返しルール（と実体化済みの日付）"""
+    rules = {
+        row["schedule_id"]: row
+        for row in ScheduleRecurrence.objects.filter(owner_id=user_id).values(
+            "pk", "schedule_id", "schedule__start_time", "frequency", "interval", "weekdays", "until", "exception_dates",
+        )
+    }
+    materialized = {}
+    for rule_id, occurrence_date in (
+        Schedule.objects
+        .filter(owner_id=user_id, recurrence_source__isnull=False, occurrence_date__isnull=False)
+        .values_list("recurrence_source_id", "occurrence_date")
+    ):
+        materialized.setdefault(rule_id, set()).add(occurrence_date)
+    return {
+        schedule_id: (rule, materialized.get(rule["pk"], set()))
+        for schedule_id, rule in rules.items()
+    }
+
+
+def iter_calendar(user, host):
+    """ユーザーのスケジュールを iCalendar の文字列として少しずつ返す（件数によらずメモリ一定）"""
+    stamp = _format_datetime(timezone.now())
+    yield (
+        "BEGIN:VCALENDAR\r\n"
+        "VERSION:2.0\r\n"
+        "PRODID:-//mainPage//todo//JA\r\n"
+        "CALSCALE:GREGORIAN\r\n"
+        "METHOD:PUBLISH\r\n"
+        + _fold(f"X-WR-CALNAME:{_escape(user.get_username())} のスケジュール")
+        + "X-WR-TIMEZONE:" + timezone.get_current_timezone_name() + "\r\n"
+    )
+
+    recurrences = _recurrences_by_schedule(user.pk)
+    rows = (
+        Schedule.objects
+        .filter(owner=user)
+        .exclude(title_override=TODAY_TASK_TITLE)
+        .order_by("start_time", "pk")
+        .values(
+            "pk", "start_time", "end_time", "title_override", "page_count", "start_page", "end_page",
+            "tasks_total", "tasks_completed", "action_category__name", "action_item__title",
+        )
+    )
+    chunk = []
+    for row in rows.iterator(chunk_size=ICS_CHUNK_SIZE):
+        lines = [
+            "BEGIN:VEVENT",
+            f"UID:schedule-{row['pk']}@{host}",
+            f"DTSTAMP:{stamp}",
+            f"DTSTART:{_format_datetime(row['start_time'])}",
+            f"DTEND:{_format_datetime(row['end_time'])}",
+            f"SUMMARY:{_escape(_summary(row))}",
+        ]
+        description = _description(row)
+        if description:
+            lines.append(f"DESCRIPTION:{_escape(description)}")
+        if row["action_category__name"]:
+            lines.append(f"CATEGORIES:{_escape(row['action_category__name'])}")
+        if row["pk"] in recurrences:
+            lines.extend(_recurrence_lines(*recurrences[row["pk"]]))
+        lines.append("END:VEVENT")
+        chunk.append("".join(_fold(line) for line in lines))
+        if len(chunk) >= ICS_CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    if chunk:
+        yield "".join(chunk)
+    yield "END:VCALENDAR\r\n"
+
+
+async def aiter_calendar(user, host):
+    """ASGI 用の iter_calendar。1チャンクずつスレッドで進めるので、こちらもメモリ一定
+
+    StreamingHttpResponse は同期イテレータを ASGI で返すと全部 list にしてから送るため。
+    """
+    chunks = iter_calendar(user, host)
+    next_chunk = sync_to_async(next)
+    while True:
+        chunk = await next_chunk(chunks, None)
+        if chunk is None:
+            return
+        yield chunk
@@ -0,0 +1,339 @@
+import codecs
+import csv
+import re
+from datetime import MAXYEAR, MINYEAR, datetime, time, timedelta
+from itertools import islice
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from .models import ActionCategory, ActionItem, Schedule
+from .reading_stats import rebuild_reading_stats
+from .signals import calendar_bulk_changed
+from .versions import bump_form_options_version, bump_reading_progress_version
+
+
+IMPORT_BATCH_SIZE = 500
+CSV_COLUMNS = ("start", "end", "category", "item", "title", "page_count", "start_page", "end_page")
+# エクスポートした .ics の SUMMARY「カテゴリ: アイテム (10p)」を読み戻すため
+SUMMARY_PAGES_RE = re.compile(r"\s*\((?P<pages>\d+)p\)$")
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.errors = []  # [(行番号, メッセージ)]
+        self.created_categories = 0
+        self.created_items = 0
+
+    def add_error(self, line, message):
+        self.errors.append((line, message))
+
+
+# --- 読み込み（1行・1イベントずつ返す） ---
+
+def _text_lines(uploaded_file):
+    """アップロードされたファイルをUTF-8の行として少しずつ読む（BOM付きも可）"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    for chunk in uploaded_file.chunks():
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+def _unfold(lines):
+    """iCalendar の折り返し行をつなげて (行番号, 1行) を返す"""
+    current, current_number = None, 0
+    for number, line in enumerate(lines, start=1):
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current_number, current
+        current, current_number = line, number
+    if current is not None:
+        yield current_number, current
+
+
+def _unescape(value):
+    return re.sub(r"\\([\\;,nN])", lambda m: "\n" if m.group(1) in "nN" else m.group(1), value)
+
+
+def _check_year(parsed):
+    # 終了日時の補完やUTCへの変換で datetime の範囲を超えないように、両端の年は受け付けない
+    if not MINYEAR < parsed.year < MAXYEAR:
+        raise ValueError(f"日時は{MINYEAR + 1}年から{MAXYEAR - 1}年の間で指定してください: {parsed:%Y-%m-%d}")
+    return parsed
+
+
+def _parse_ics_datetime(value, params):
+    """DTSTART/DTEND の値を aware な datetime にする（終日は現地の0時）"""
+    if params.get("VALUE") == "DATE" or re.fullmatch(r"\d{8}", value):
+        day = _check_year(datetime.strptime(value, "%Y%m%d").date())
+        return timezone.make_aware(datetime.combine(day, time.min)), True
+    if value.endswith("Z"):
+        return _check_year(datetime.strptime(value, "%Y%m%dT%H%M%SZ")).replace(tzinfo=ZoneInfo("UTC")), False
+    naive = _check_year(datetime.strptime(value, "%Y%m%dT%H%M%S"))
+    tz = timezone.get_current_timezone()
+    if params.get("TZID"):
+        try:
+            tz = ZoneInfo(params["TZID"])
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return timezone.make_aware(naive, tz), False
+
+
+def _split_property(line):
+    """'DTSTART;TZID=Asia/Tokyo:20261005T090000' → ('DTSTART', {'TZID': ...}, '2026...')"""
+    head, _, value = line.partition(":")
+    name, *param_parts = head.split(";")
+    params = {}
+    for part in param_parts:
+        key, _, param_value = part.partition("=")
+        params[key.upper()] = param_value.strip('"')
+    return name.upper(), params, value
+
+
+def iter_ics_rows(uploaded_file):
+    """VEVENT を1件ずつ (開始行番号, {プロパティ名: (パラメータ, 値)}) で返す"""
+    event, event_line = None, 0
+    for number, line in _unfold(_text_lines(uploaded_file)):
+        if not line:
+            continue
+        name, params, value = _split_property(line)
+        if name == "BEGIN" and value.upper() == "VEVENT":
+            event, event_line = {}, number
+        elif name == "END" and value.upper() == "VEVENT" and event is not None:
+            yield event_line, event
+            event = None
+        elif event is not None and name in ("DTSTART", "DTEND", "SUMMARY", "CATEGORIES"):
+            event[name] = (params, value)
+
+
+def _ics_event_to_row(event):
+    """VEVENT の辞書を、CSVの1行と同じキーの辞書にする"""
+    if "DTSTART" not in event:
+        raise ValueError("DTSTART がありません")
+    start, all_day = _parse_ics_datetime(event["DTSTART"][1], event["DTSTART"][0])
+    if "DTEND" in event:
+        end, _ = _parse_ics_datetime(event["DTEND"][1], event["DTEND"][0])
+    elif all_day:
+        end = start + timedelta(days=1)
+    else:
+        end = start + timedelta(hours=1)
+
+    summary = _unescape(event.get("SUMMARY", ({}, ""))[1]).strip()
+    category = _unescape(event.get("CATEGORIES", ({}, ""))[1]).split(",")[0].strip()
+    row = {"start": start, "end": end, "category": category, "item": "", "title": "", "page_count": ""}
+    prefix = f"{category}: "
+    if category and summary.startswith(prefix):
+        item = summary[len(prefix):]
+        match = SUMMARY_PAGES_RE.search(item)
+        if match:
+            row["page_count"] = match.group("pages")
+            item = item[:match.start()]
+        row["item"] = item.strip()
+    elif summary != category:
+        row["title"] = summary
+    return row
+
+
+def iter_csv_rows(uploaded_file):
+    """CSV（1行目はヘッダー: start,end,category,item,title,page_count,start_page,end_page）を1行ずつ返す"""
+    reader = csv.DictReader(_text_lines(uploaded_file))
+    if not reader.fieldnames or not {"start", "end"} <= {name.strip() for name in reader.fieldnames}:
+        raise ValueError("CSVのヘッダーに start と end が必要です")
+    for row in reader:
+        yield reader.line_num, {key.strip(): (value or "").strip() for key, value in row.items() if key}
+
+
+# --- 検証 ---
+
+def _parse_csv_datetime(value):
+    try:
+        parsed = parse_datetime(value.replace("/", "-"))
+        day = parse_date(value.replace("/", "-")) if parsed is None else None
+    except ValueError:
+        # 形式は合っているが 2月30日 のように存在しない日時
+        raise ValueError(f"存在しない日時です: {value}")
+    if parsed is None:
+        if day is None:
+            raise ValueError(f"日時の形式が正しくありません: {value}")
+        parsed = datetime.combine(day, time.min)
+    _check_year(parsed)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _parse_int(value, label):
+    if value in (None, ""):
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{label}は整数で指定してください: {value}")
+    if number < 0:
+        raise ValueError(f"{label}は0以上で指定してください: {value}")
+    return number
+
+
+def clean_row(row):
+    """1行分を検証して Schedule に渡す値にする。問題があれば ValueError"""
+    start, end = row.get("start"), row.get("end")
+    if isinstance(start, str):
+        start = _parse_csv_datetime(start) if start else None
+    if isinstance(end, str):
+        end = _parse_csv_datetime(end) if end else None
+    if start is None or end is None:
+        raise ValueError("開始・終了日時は必須です")
+    if end <= start:
+        raise ValueError("終了日時は開始日時より後にしてください")
+
+    category = (row.get("category") or "")[:50]
+    item = (row.get("item") or "")[:100]
+    title = (row.get("title") or "")[:200]
+    if item and not category:
+        raise ValueError("アクションを指定するときはカテゴリも指定してください")
+    if not (category or title):
+        raise ValueError("カテゴリかタイトルのどちらかが必要です")
+
+    start_page = _parse_int(row.get("start_page"), "開始ページ")
+    end_page = _parse_int(row.get("end_page"), "終了ページ")
+    page_count = _parse_int(row.get("page_count"), "ページ数")
+    if page_count is None and start_page is not None and end_page is not None:
+        page_count = max(end_page - start_page, 0)
+    return {
+        "start_time": start,
+        "end_time": end,
+        "category": category,
+        "item": item,
+        "title_override": title,
+        "start_page": start_page,
+        "end_page": end_page,
+        "page_count": page_count,
+    }
+
+
+# --- 書き込み ---
+
+class _Resolver:
+    """カテゴリ名・アイテム名 → 実体。最初に1回ずつ読み、足りない分はバッチごとにまとめて作る"""
+
+    def __init__(self, user, result):
+        self.user = user
+        self.result = result
+        self.categories = {
+            category.name: category for category in ActionCategory.objects.filter(owner=user)
+        }
+        self.items = {}
+        for item in ActionItem.objects.filter(owner=user, category__isnull=False).order_by("pk"):
+            self.items.setdefault((item.category_id, item.title), item)
+
+    def prepare(self, cleaned_rows):
+        new_categories = {
+            row["category"]: ActionCategory(owner=self.user, name=row["category"])
+            for row in cleaned_rows
+            if row["category"] and row["category"] not in self.categories
+        }
+        if new_categories:
+            ActionCategory.objects.bulk_create(new_categories.values())
+            self.categories.update(new_categories)
+            self.result.created_categories += len(new_categories)
+
+        new_items = {}
+        for row in cleaned_rows:
+            if not row["item"]:
+                continue
+            key = (self.categories[row["category"]].pk, row["item"])
+            if key not in self.items and key not in new_items:
+                new_items[key] = ActionItem(owner=self.user, category_id=key[0], title=row["item"], is_scheduled=True)
+        if new_items:
+            ActionItem.objects.bulk_create(new_items.values())
+            self.items.update(new_items)
+            self.result.created_items += len(new_items)
+
+    def schedule(self, row):
+        category = self.categories.get(row["category"]) if row["category"] else None
+        item = self.items.get((category.pk, row["item"])) if category and row["item"] else None
+        return Schedule(
+            owner=self.user,
+            action_category=category,
+            action_item=item,
+            title_override=row["title_override"],
+            start_time=row["start_time"],
+            end_time=row["end_time"],
+            start_page=row["start_page"],
+            end_page=row["end_page"],
+            page_count=row["page_count"],
+        )
+
+
+def _batches(iterable, size):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def import_schedules(user, uploaded_file, file_format):
+    """.ics / CSV を読み込んで Schedule をまとめて作る
+
+    行ごとの検証エラーは ImportResult.errors に入れ、正しい行だけを取り込む。
+    """
+    result = ImportResult()
+    if file_format == "ics":
+        raw_rows = ((line, event, _ics_event_to_row) for line, event in iter_ics_rows(uploaded_file))
+    else:
+        raw_rows = ((line, row, None) for line, row in iter_csv_rows(uploaded_file))
+
+    resolver = _Resolver(user, result)
+    affected_dates = set()
+    affected_items = set()
+    with transaction.atomic():
+        for batch in _batches(raw_rows, IMPORT_BATCH_SIZE):
+            cleaned_rows = []
+            for line, raw, convert in batch:
+                try:
+                    cleaned_rows.append(clean_row(convert(raw) if convert else raw))
+                except ValueError as error:
+                    result.add_error(line, str(error))
+            if not cleaned_rows:
+                continue
+            resolver.prepare(cleaned_rows)
+            schedules = [resolver.schedule(row) for row in cleaned_rows]
+            Schedule.objects.bulk_create(schedules, batch_size=IMPORT_BATCH_SIZE)
+            result.created += len(schedules)
+            affected_dates.update(timezone.localtime(schedule.start_time).date() for schedule in schedules)
+            affected_items.update(schedule.action_item_id for schedule in schedules if schedule.action_item_id)
+
+        if affected_dates:
+            # bulk_create は save() を通らないので、読書統計は取り込んだ日だけ作り直す
+            rebuild_reading_stats(user_ids=[user.pk], dates=affected_dates)
+
+    if result.created:
+        # シグナルが飛ばないので、キャッシュとライブ更新はここで行う
+        calendar_bulk_changed(user.pk)
+        for item_id in affected_items:
+            bump_reading_progress_version(item_id)
+    if result.created_categories or result.created_items:
+        bump_form_options_version(user.pk)
+    return result
+
+
+def detect_format(uploaded_file):
+    """拡張子（なければ先頭行）で .ics か CSV かを判定する"""
+    name = (uploaded_file.name or "").lower()
+    if name.endswith((".ics", ".ical", ".ifb")):
+        return "ics"
+    if name.endswith(".csv"):
+        return "csv"
+    head = next(uploaded_file.chunks(), b"")[:64]
+    uploaded_file.seek(0)
+    return "ics" if head.lstrip(codecs.BOM_UTF8).upper().startswith(b"BEGIN:VCALENDAR") else "csv"
@@ -0,0 +1,112 @@
+import asyncio
+import json
+import threading
+
+from django.db import transaction
+from django.urls import reverse
+
+from .events import CALENDAR_EVENT_FIELDS, build_calendar_event
+from .models import Schedule, TODAY_TASK_TITLE
+
+
+# ユーザーごとの購読キュー。プロセス内だけのpub/sub（Render の web は1プロセスで動かしている）
+SUBSCRIBER_QUEUE_SIZE = 100
+KEEPALIVE_SECONDS = 15
+
+_subscribers = {}  # {user_id: {(loop, queue), ...}}
+_lock = threading.Lock()
+
+
+def subscribe(user_id):
+    """現在のイベントループ用のキューを登録して返す"""
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    entry = (asyncio.get_running_loop(), queue)
+    with _lock:
+        _subscribers.setdefault(user_id, set()).add(entry)
+    return entry
+
+
+def unsubscribe(user_id, entry):
+    with _lock:
+        entries = _subscribers.get(user_id)
+        if entries:
+            entries.discard(entry)
+            if not entries:
+                del _subscribers[user_id]
+
+
+def _put(queue, message):
+    if queue.full():
+        # 追いつけていない接続には、差分をやめて全件取り直しを指示する
+        while not queue.empty():
+            queue.get_nowait()
+        message = ("refetch", {})
+    queue.put_nowait(message)
+
+
+def publish(user_id, event, data):
+    """購読中の全接続に送る。どのスレッドから呼んでもよい"""
+    with _lock:
+        entries = list(_subscribers.get(user_id, ()))
+    for loop, queue in entries:
+        try:
+            loop.call_soon_threadsafe(_put, queue, (event, data))
+        except RuntimeError:
+            # ループが閉じている（切断済み）
+            unsubscribe(user_id, (loop, queue))
+
+
+def publish_on_commit(user_id, event, data_func):
+    """コミットされてから送る（ロールバックされた変更は流さない）。購読者がいなければ何もしない"""
+    if user_id not in _subscribers:
+        return
+    transaction.on_commit(lambda: publish(user_id, event, data_func()))
+
+
+def format_message(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+# --- 送る内容 ---
+
+def schedule_event_data(schedule_id):
+    """変更後のスケジュールをカレンダーのイベントと同じ形で返す（消えていれば deleted）"""
+    row = (
+        Schedule.objects
+        .filter(pk=schedule_id)
+        .exclude(title_override=TODAY_TASK_TITLE)
+        .values(*CALENDAR_EVENT_FIELDS, 'recurrence_source_id', 'recurrence__id')
+        .first()
+    )
+    if row is None:
+        return {'id': schedule_id, 'deleted': True}
+    if row['recurrence_source_id'] or row['recurrence__id']:
+        # 繰り返しに関わる変更は仮想の回の表示も変わるので、取り直してもらう
+        return {'id': schedule_id, 'refetch': True}
+    url_template = reverse('todo:schedule_detail', kwargs={'pk': 0})
+    return {'id': schedule_id, 'event': build_calendar_event(row, url_template)}
+
+
+def progress_data(schedule_id):
+    row = Schedule.objects.filter(pk=schedule_id).values('tasks_total', 'tasks_completed').first()
+    if row is None:
+        return {'id': schedule_id, 'deleted': True}
+    progress = int(row['tasks_completed'] / row['tasks_total'] * 100) if row['tasks_total'] else 100
+    return {'id': schedule_id, 'progress': progress}
+
+
+async def event_stream(user_id):
+    """SSE の本体。切断されるまで、変更イベントと keepalive を流し続ける"""
+    entry = subscribe(user_id)
+    _, queue = entry
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                event, data = await asyncio.wait_for(queue.get(), timeout=KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield format_message(event, data)
+    finally:
+        unsubscribe(user_id, entry)
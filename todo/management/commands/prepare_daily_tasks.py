@@ -0,0 +1,34 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from todo.daily import prepare_daily_schedules, target_users
+
+
+class Command(BaseCommand):
+    help = "「今日のタスク」のスケジュールと毎日のルーティーンのタスクを全ユーザー分まとめて作成する"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--date", help="対象日 (YYYY-MM-DD)。省略時は今日")
+        parser.add_argument(
+            "--recent-days",
+            type=int,
+            default=30,
+            help="この日数以内にログインしたユーザーも対象にする（既定: 30）",
+        )
+
+    def handle(self, *args, **options):
+        if options["date"]:
+            try:
+                target_date = datetime.strptime(options["date"], "%Y-%m-%d").date()
+            except ValueError:
+                raise CommandError("--date は YYYY-MM-DD 形式で指定してください")
+        else:
+            target_date = timezone.localdate()
+
+        users = target_users(target_date, options["recent_days"])
+        schedule_count, task_count = prepare_daily_schedules(target_date, users)
+        self.stdout.write(self.style.SUCCESS(
+            f"{target_date}: スケジュール {schedule_count} 件、タスク {task_count} 件を作成しました"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from todo.reading_stats import rebuild_reading_stats
+
+
+class Command(BaseCommand):
+    help = "Scheduleから読書統計（日別・カテゴリ別の集計テーブル）を作り直す"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="対象ユーザーID（複数指定可）")
+
+    def handle(self, *args, **options):
+        count = rebuild_reading_stats(user_ids=options["user_ids"])
+        self.stdout.write(self.style.SUCCESS(f"読書統計を {count} 行作成しました"))
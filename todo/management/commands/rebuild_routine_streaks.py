@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from todo.models import DailyRoutineTask
+from todo.routine_streaks import rebuild_routine_streaks
+
+
+class Command(BaseCommand):
+    help = "毎日のルーティーンの連続記録（current_streak/longest_streak）を完了したタスクから作り直す"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="対象ユーザーID（複数指定可）")
+
+    def handle(self, *args, **options):
+        routine_ids = None
+        if options["user_ids"]:
+            routine_ids = DailyRoutineTask.objects.filter(owner_id__in=options["user_ids"]).values_list("pk", flat=True)
+        count = rebuild_routine_streaks(routine_ids)
+        self.stdout.write(self.style.SUCCESS(f"ルーティーン {count} 件の連続記録を作り直しました"))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from todo.task_counts import repair_task_counts
+
+
+class Command(BaseCommand):
+    help = "Scheduleのタスク数カウンタ（tasks_total/tasks_completed）を実際のタスクに合わせて直す"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", type=int, action="append", dest="user_ids", help="対象ユーザーID（複数指定可）")
+
+    def handle(self, *args, **options):
+        count = repair_task_counts(user_ids=options["user_ids"])
+        self.stdout.write(self.style.SUCCESS(f"タスク数カウンタを {count} 件修正しました"))
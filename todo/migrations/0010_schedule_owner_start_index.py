@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0009_dailyroutinetask_task_daily_routine_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['owner', 'start_time'], name='todo_sched_owner_start_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:05
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0010_schedule_owner_start_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='occurrence_date',
+            field=models.DateField(blank=True, null=True, verbose_name='繰り返しの日付'),
+        ),
+        migrations.CreateModel(
+            name='ScheduleRecurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.CharField(choices=[('daily', '毎日'), ('weekly', '毎週'), ('weekdays', '曜日指定')], default='weekly', max_length=20, verbose_name='繰り返し')),
+                ('interval', models.PositiveIntegerField(default=1, verbose_name='間隔')),
+                ('weekdays', models.CharField(blank=True, max_length=20, verbose_name='曜日')),
+                ('until', models.DateField(blank=True, null=True, verbose_name='終了日')),
+                ('exception_dates', models.JSONField(blank=True, default=list, verbose_name='除外日')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('schedule', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='recurrence', to='todo.schedule', verbose_name='元のスケジュール')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='recurrence_source',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='materialized_schedules', to='todo.schedulerecurrence', verbose_name='繰り返しルール'),
+        ),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(condition=models.Q(('recurrence_source__isnull', False)), fields=('recurrence_source', 'occurrence_date'), name='unique_materialized_occurrence'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:06
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+TODAY_TASK_TITLE = "\u4eca\u65e5\u306e\u30bf\u30b9\u30af"
+
+
+def backfill_daily_date(apps, schema_editor):
+    # 既存の「今日のタスク」に日付を付ける（同じ日に複数あれば最初の1件だけ）
+    Schedule = apps.get_model('todo', 'Schedule')
+    seen = set()
+    schedules = Schedule.objects.filter(title_override=TODAY_TASK_TITLE).order_by('pk')
+    for schedule in schedules.iterator():
+        key = (schedule.owner_id, timezone.localtime(schedule.start_time).date())
+        if key in seen:
+            continue
+        seen.add(key)
+        schedule.daily_date = key[1]
+        schedule.save(update_fields=['daily_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0011_schedule_recurrence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='daily_date',
+            field=models.DateField(blank=True, null=True, verbose_name='今日のタスクの日付'),
+        ),
+        migrations.RunPython(backfill_daily_date, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='schedule',
+            constraint=models.UniqueConstraint(condition=models.Q(('daily_date__isnull', False)), fields=('owner', 'daily_date'), name='unique_daily_task_schedule_per_day'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:09
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+
+def populate_reading_stats(apps, schema_editor):
+    # 既存のスケジュールから集計テーブルを作る
+    Schedule = apps.get_model('todo', 'Schedule')
+    DailyReadingStat = apps.get_model('todo', 'DailyReadingStat')
+    rows = (
+        Schedule.objects
+        .filter(action_category__track_pages=True, page_count__isnull=False)
+        .annotate(local_date=TruncDate('start_time', tzinfo=timezone.get_current_timezone()))
+        .values('owner_id', 'local_date', 'action_category_id')
+        .annotate(
+            total_pages=Sum('page_count'),
+            duration=Sum(ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())),
+            session_count=Count('pk'),
+        )
+    )
+    DailyReadingStat.objects.bulk_create([
+        DailyReadingStat(
+            owner_id=row['owner_id'],
+            date=row['local_date'],
+            category_id=row['action_category_id'],
+            pages=row['total_pages'] or 0,
+            minutes=max(int(row['duration'].total_seconds() // 60), 0) if row['duration'] else 0,
+            sessions=row['session_count'],
+        )
+        for row in rows
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0012_schedule_daily_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyReadingStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='日付')),
+                ('pages', models.IntegerField(default=0, verbose_name='ページ数')),
+                ('minutes', models.IntegerField(default=0, verbose_name='時間(分)')),
+                ('sessions', models.IntegerField(default=0, verbose_name='回数')),
+                ('category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='todo.actioncategory', verbose_name='カテゴリ')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('owner', 'date', 'category'), name='unique_daily_reading_stat')],
+            },
+        ),
+        migrations.RunPython(populate_reading_stats, migrations.RunPython.noop),
+    ]
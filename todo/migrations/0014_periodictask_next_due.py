@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:11
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_next_due(apps, schema_editor):
+    # 既存の定期タスクに次回の期限を入れる
+    PeriodicTask = apps.get_model('todo', 'PeriodicTask')
+    tasks = list(PeriodicTask.objects.filter(last_done__isnull=False))
+    for task in tasks:
+        task.next_due = task.last_done + timedelta(days=task.interval_days)
+    PeriodicTask.objects.bulk_update(tasks, ['next_due'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0013_dailyreadingstat'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='periodictask',
+            name='next_due',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_next_due, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='periodictask',
+            index=models.Index(fields=['owner', 'next_due'], name='todo_periodic_owner_due_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0014_periodictask_next_due'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='actionitem',
+            index=models.Index(fields=['owner', 'completed', 'due_date', 'id'], name='todo_item_owner_list_idx'),
+        ),
+    ]
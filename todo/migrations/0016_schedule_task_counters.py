@@ -0,0 +1,48 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:14
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def populate_task_counters(apps, schema_editor):
+    # 既存のスケジュールのタスク数を数えて入れる
+    Schedule = apps.get_model('todo', 'Schedule')
+    Task = apps.get_model('todo', 'Task')
+
+    def count_subquery(**filters):
+        tasks = (
+            Task.objects
+            .filter(schedule=OuterRef('pk'), **filters)
+            .order_by()
+            .values('schedule')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return Coalesce(Subquery(tasks, output_field=IntegerField()), Value(0))
+
+    Schedule.objects.update(
+        tasks_total=count_subquery(),
+        tasks_completed=count_subquery(completed=True),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0015_actionitem_list_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='schedule',
+            name='tasks_completed',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='完了タスク数'),
+        ),
+        migrations.AddField(
+            model_name='schedule',
+            name='tasks_total',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='タスク数'),
+        ),
+        migrations.RunPython(populate_task_counters, migrations.RunPython.noop),
+    ]
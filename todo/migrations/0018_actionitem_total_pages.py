@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0017_schedule_overlap_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actionitem',
+            name='total_pages',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='総ページ数'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.5 on 2026-10-18 07:29
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+
+def populate_routine_streaks(apps, schema_editor):
+    # 既存の完了したタスクの日付から連続記録を作る
+    DailyRoutineTask = apps.get_model('todo', 'DailyRoutineTask')
+    Task = apps.get_model('todo', 'Task')
+    dates = {}
+    for routine_id, day in (
+        Task.objects
+        .filter(daily_routine__isnull=False, completed=True, schedule__daily_date__isnull=False)
+        .order_by('daily_routine_id', 'schedule__daily_date')
+        .values_list('daily_routine_id', 'schedule__daily_date')
+        .distinct()
+    ):
+        dates.setdefault(routine_id, []).append(day)
+    routines = list(DailyRoutineTask.objects.filter(pk__in=dates))
+    for routine in routines:
+        current = longest = 0
+        previous = None
+        for day in dates[routine.pk]:
+            current = current + 1 if previous and day - previous == timedelta(days=1) else 1
+            longest = max(longest, current)
+            previous = day
+        routine.current_streak, routine.longest_streak, routine.streak_last_date = current, longest, previous
+    DailyRoutineTask.objects.bulk_update(routines, ['current_streak', 'longest_streak', 'streak_last_date'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo', '0018_actionitem_total_pages'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailyroutinetask',
+            name='current_streak',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='最新の連続日数'),
+        ),
+        migrations.AddField(
+            model_name='dailyroutinetask',
+            name='longest_streak',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='最長の連続日数'),
+        ),
+        migrations.AddField(
+            model_name='dailyroutinetask',
+            name='streak_last_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='最後に完了した日'),
+        ),
+        migrations.RunPython(populate_routine_streaks, migrations.RunPython.noop),
+    ]
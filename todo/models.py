@@ -1,7 +1,12 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
 from django.utils import timezone
 from django.contrib.auth.models import User
 
+
+TODAY_TASK_TITLE = "\u4eca\u65e5\u306e\u30bf\u30b9\u30af"
+
 class ActionCategory(models.Model):
     name = models.CharField("カテゴリ名", max_length=50)
     color = models.CharField("色コード", max_length=20, default='#6c757d')
@@ -21,6 +26,7 @@ class ActionItem(models.Model):
     reading_purpose = models.TextField("読む目的", blank=True)
     book_image = models.ImageField("書籍画像", upload_to="todo/book_images/", null=True, blank=True)
     book_author = models.CharField("作者", max_length=100, blank=True)
+    total_pages = models.PositiveIntegerField("総ページ数", null=True, blank=True)
     due_date = models.DateField("期日", null=True, blank=True)
     is_scheduled = models.BooleanField("スケジュール済み", default=False)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -30,6 +36,12 @@ class ActionItem(models.Model):
     text3 = models.CharField("達成可能(Achievable)", max_length=200, blank=True)
     completed = models.BooleanField("完了フラグ", default=False)
 
+    class Meta:
+        indexes = [
+            # 一覧のキーセットページング (completed, due_date, pk) 用
+            models.Index(fields=["owner", "completed", "due_date", "id"], name="todo_item_owner_list_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -38,11 +50,30 @@ class PeriodicTask(models.Model):
     title = models.CharField(max_length=200)
     interval_days = models.PositiveIntegerField(default=7)
     last_done = models.DateField(null=True, blank=True)
+    # 次回の期限（前回実施日 + 間隔）。未実施なら None。並べ替えと絞り込みをDBで行うために保存する
+    next_due = models.DateField(null=True, blank=True, editable=False)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "next_due"], name="todo_periodic_owner_due_idx"),
+        ]
+
     def __str__(self):
         return self.title
 
+    def compute_next_due(self):
+        if self.last_done is None:
+            return None
+        return self.last_done + timedelta(days=self.interval_days)
+
+    def save(self, *args, **kwargs):
+        self.next_due = self.compute_next_due()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "next_due" not in update_fields:
+            kwargs["update_fields"] = list(update_fields) + ["next_due"]
+        super().save(*args, **kwargs)
+
 
 class DailyRoutineTask(models.Model):
     title = models.CharField("タスク名", max_length=200)
@@ -51,6 +82,10 @@ class DailyRoutineTask(models.Model):
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField("作成日", auto_now_add=True)
     updated_at = models.DateTimeField("更新日", auto_now=True)
+    # 連続記録。タスクの完了切り替えで更新する（一覧で毎回タスクをたどらないため）
+    current_streak = models.PositiveIntegerField("最新の連続日数", default=0, editable=False)
+    longest_streak = models.PositiveIntegerField("最長の連続日数", default=0, editable=False)
+    streak_last_date = models.DateField("最後に完了した日", null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.title
@@ -90,11 +125,97 @@ class Schedule(models.Model):
     end_time = models.DateTimeField("終了時刻")
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
 
+    # 繰り返し予定の1回分を編集したときに作られる実体（元のルールと日付）
+    recurrence_source = models.ForeignKey(
+        "ScheduleRecurrence",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="materialized_schedules",
+        verbose_name="繰り返しルール",
+    )
+    occurrence_date = models.DateField("繰り返しの日付", null=True, blank=True)
+    # 「今日のタスク」用スケジュールの日付（毎日のバッチで作られる）
+    daily_date = models.DateField("今日のタスクの日付", null=True, blank=True)
+    # タスク数のカウンタ。Task の保存/削除でF()式により更新する（進捗表示で数え直さないため）
+    tasks_total = models.PositiveIntegerField("タスク数", default=0, editable=False)
+    tasks_completed = models.PositiveIntegerField("完了タスク数", default=0, editable=False)
+
+    COUNTER_FIELDS = ("tasks_total", "tasks_completed")
+
     def __str__(self):
         if self.action_item:
             return self.action_item.title
         return "(アクション未設定)"
 
+    def save(self, *args, **kwargs):
+        # 読書統計の集計テーブルを同じトランザクションで更新する（削除はシグナル側）
+        from .reading_stats import previous_contribution, record_schedule_change, schedule_contribution
+
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            # タスク数のカウンタは古い値で上書きしない
+            kwargs["update_fields"] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        with transaction.atomic():
+            before = previous_contribution(self.pk) if self.pk else None
+            super().save(*args, **kwargs)
+            record_schedule_change(before, schedule_contribution(self))
+
+    @property
+    def progress_percentage(self):
+        if self.tasks_total > 0:
+            return (self.tasks_completed / self.tasks_total) * 100
+        return 100
+
+    class Meta:
+        indexes = [
+            # カレンダーの表示範囲での絞り込みと、重なりの判定（start < 範囲の終了 かつ end > 範囲の開始）用
+            models.Index(fields=["owner", "start_time", "end_time"], name="todo_sched_owner_span_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recurrence_source", "occurrence_date"],
+                condition=models.Q(recurrence_source__isnull=False),
+                name="unique_materialized_occurrence",
+            ),
+            models.UniqueConstraint(
+                fields=["owner", "daily_date"],
+                condition=models.Q(daily_date__isnull=False),
+                name="unique_daily_task_schedule_per_day",
+            ),
+        ]
+
+
+class ScheduleRecurrence(models.Model):
+    class Frequency(models.TextChoices):
+        DAILY = "daily", "毎日"
+        WEEKLY = "weekly", "毎週"
+        WEEKDAYS = "weekdays", "曜日指定"
+
+    # 1回目の予定（時刻と長さはここから取る）
+    schedule = models.OneToOneField(
+        Schedule,
+        on_delete=models.CASCADE,
+        related_name="recurrence",
+        verbose_name="元のスケジュール",
+    )
+    frequency = models.CharField("繰り返し", max_length=20, choices=Frequency.choices, default=Frequency.WEEKLY)
+    interval = models.PositiveIntegerField("間隔", default=1)
+    # 曜日指定のとき "0,2,4" のように保存する（月=0）
+    weekdays = models.CharField("曜日", max_length=20, blank=True)
+    until = models.DateField("終了日", null=True, blank=True)
+    # 削除された回の日付 ("YYYY-MM-DD") のリスト
+    exception_dates = models.JSONField("除外日", default=list, blank=True)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+
+    def __str__(self):
+        return f"{self.schedule} ({self.get_frequency_display()})"
+
+    def weekday_list(self):
+        return [int(day) for day in self.weekdays.split(",") if day.strip().isdigit()]
+
 # --- 3. 「タスク」モデルは変更なし ---
 class Task(models.Model):
     title = models.CharField("タスク名", max_length=200)
@@ -114,6 +235,18 @@ class Task(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        # スケジュールのタスク数カウンタを同じトランザクションで更新する（削除はシグナル側）
+        from .routine_streaks import record_routine_completion
+        from .task_counts import previous_task_state, record_task_change
+
+        with transaction.atomic():
+            before = previous_task_state(self.pk) if self.pk else None
+            super().save(*args, **kwargs)
+            record_task_change(before, (self.schedule_id, self.completed))
+            if self.daily_routine_id and (before[1] if before else False) != self.completed:
+                record_routine_completion(self.daily_routine_id, self.schedule_id, self.completed)
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -122,3 +255,21 @@ class Task(models.Model):
                 name="unique_daily_routine_task_per_schedule",
             ),
         ]
+
+
+class DailyReadingStat(models.Model):
+    """ユーザー・現地の日付・カテゴリごとの読書記録の集計（Scheduleの保存/削除で更新）"""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE)
+    date = models.DateField("日付")
+    category = models.ForeignKey(ActionCategory, on_delete=models.CASCADE, verbose_name="カテゴリ")
+    pages = models.IntegerField("ページ数", default=0)
+    minutes = models.IntegerField("時間(分)", default=0)
+    sessions = models.IntegerField("回数", default=0)
+
+    def __str__(self):
+        return f"{self.date} {self.category}: {self.pages}p"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "date", "category"], name="unique_daily_reading_stat"),
+        ]
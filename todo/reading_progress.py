@@ -0,0 +1,99 @@
+import math
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .busy_blocks import merge_intervals
+from .models import Schedule
+from .versions import get_reading_progress_versions
+
+
+READING_PROGRESS_KEY = "todo:reading-progress:{item_id}:{version}"
+
+
+def _summarize(rows):
+    """1冊分の (start_page, end_page, page_count, start_time) から、キャッシュする集計を作る
+
+    ページ範囲 [開始, 終了) は和集合にして、読み直した範囲を二重に数えない。
+    """
+    ranges, loose_pages, dates = [], 0, set()
+    for start_page, end_page, page_count, start_time in rows:
+        if start_page is not None and end_page is not None and end_page > start_page:
+            ranges.append((start_page, end_page))
+        elif page_count:
+            # ページ範囲の無い回は、読んだページ数だけ足す
+            loose_pages += page_count
+        else:
+            continue
+        dates.add(timezone.localtime(start_time).date())
+    covered = merge_intervals(ranges)
+    return {
+        'ranges': covered,
+        'pages_read': sum(end - start for start, end in covered) + loose_pages,
+        'first_date': min(dates) if dates else None,
+        'reading_days': len(dates),
+    }
+
+
+class ReadingProgress:
+    """1冊分の読書の進み具合（読了予定日は今日の日付で毎回計算する）"""
+
+    def __init__(self, summary, total_pages, today):
+        self.ranges = summary['ranges']
+        self.pages_read = summary['pages_read']
+        self.reading_days = summary['reading_days']
+        self.total_pages = total_pages
+        self.pages_remaining = None
+        self.percentage = None
+        if total_pages:
+            self.pages_remaining = max(total_pages - self.pages_read, 0)
+            self.percentage = min(int(self.pages_read / total_pages * 100), 100)
+
+        # ペースは読み始めた日から今日までの1日あたりのページ数
+        self.pace = None
+        self.projected_finish = None
+        if summary['first_date'] and self.pages_read:
+            elapsed_days = max((today - summary['first_date']).days + 1, 1)
+            self.pace = self.pages_read / elapsed_days
+            if self.pages_remaining:
+                self.projected_finish = today + timedelta(days=math.ceil(self.pages_remaining / self.pace))
+
+
+def reading_progress_for_items(items, today=None):
+    """items（ActionItem）の進み具合を {item_id: ReadingProgress} で返す
+
+    ページ範囲の集計はアイテムごとのバージョン（スケジュールの変更で進む）をキーにキャッシュし、
+    キャッシュに無いアイテムの分だけ1回のクエリでまとめて読む。
+    """
+    items = list(items)
+    if not items:
+        return {}
+    today = today or timezone.localdate()
+    versions = get_reading_progress_versions([item.pk for item in items])
+    keys = {item.pk: READING_PROGRESS_KEY.format(item_id=item.pk, version=versions[item.pk]) for item in items}
+    cached = cache.get_many(keys.values())
+    summaries = {item_id: cached[key] for item_id, key in keys.items() if key in cached}
+
+    missing = [item_id for item_id in keys if item_id not in summaries]
+    if missing:
+        rows_by_item = {item_id: [] for item_id in missing}
+        for item_id, *row in (
+            Schedule.objects
+            .filter(action_item_id__in=missing)
+            .values_list('action_item_id', 'start_page', 'end_page', 'page_count', 'start_time')
+        ):
+            rows_by_item[item_id].append(row)
+        fresh = {item_id: _summarize(rows) for item_id, rows in rows_by_item.items()}
+        cache.set_many({keys[item_id]: summary for item_id, summary in fresh.items()}, timeout=None)
+        summaries.update(fresh)
+
+    return {item.pk: ReadingProgress(summaries[item.pk], item.total_pages, today) for item in items}
+
+
+def attach_reading_progress(items):
+    """テンプレートで使えるように item.reading_progress を付ける"""
+    progress = reading_progress_for_items(items)
+    for item in items:
+        item.reading_progress = progress[item.pk]
+    return items
@@ -0,0 +1,115 @@
+from django.db import transaction
+from django.db.models import Count, DurationField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ActionCategory, DailyReadingStat, Schedule
+
+
+def _contribution(owner_id, start_time, end_time, page_count, category_id, track_pages):
+    """集計に足し込む値 ((owner_id, 日付, category_id), ページ数, 分) を返す。対象外なら None"""
+    if not category_id or not track_pages or page_count is None:
+        return None
+    minutes = max(int((end_time - start_time).total_seconds() // 60), 0)
+    key = (owner_id, timezone.localtime(start_time).date(), category_id)
+    return key, page_count, minutes
+
+
+def schedule_contribution(schedule):
+    category = schedule.action_category
+    return _contribution(
+        schedule.owner_id, schedule.start_time, schedule.end_time, schedule.page_count,
+        schedule.action_category_id, category.track_pages if category else False,
+    )
+
+
+def deleted_contribution(schedule):
+    """削除したスケジュールの寄与
+
+    ユーザー削除などのカスケードではカテゴリが先に消えていることがあるので、
+    schedule.action_category は読まずにIDで引く。カテゴリが無ければ対象外（集計行もカスケードで消える）。
+    """
+    if not schedule.action_category_id:
+        return None
+    track_pages = (
+        ActionCategory.objects.filter(pk=schedule.action_category_id).values_list('track_pages', flat=True).first()
+    )
+    return _contribution(
+        schedule.owner_id, schedule.start_time, schedule.end_time, schedule.page_count,
+        schedule.action_category_id, bool(track_pages),
+    )
+
+
+def previous_contribution(schedule_id):
+    """保存前のDB上の値での寄与"""
+    row = (
+        Schedule.objects
+        .filter(pk=schedule_id)
+        .values_list('owner_id', 'start_time', 'end_time', 'page_count', 'action_category_id', 'action_category__track_pages')
+        .first()
+    )
+    return _contribution(*row) if row else None
+
+
+def _apply(contribution, sign):
+    (owner_id, day, category_id), pages, minutes = contribution
+    rows = DailyReadingStat.objects.filter(owner_id=owner_id, date=day, category_id=category_id)
+    if sign > 0:
+        DailyReadingStat.objects.get_or_create(owner_id=owner_id, date=day, category_id=category_id)
+    rows.update(
+        pages=F('pages') + sign * pages,
+        minutes=F('minutes') + sign * minutes,
+        sessions=F('sessions') + sign,
+    )
+    if sign < 0:
+        rows.filter(sessions__lte=0).delete()
+
+
+def record_schedule_change(before, after):
+    """保存/削除の前後の寄与の差分を集計テーブルに反映する"""
+    if before == after:
+        return
+    with transaction.atomic():
+        if before:
+            _apply(before, -1)
+        if after:
+            _apply(after, +1)
+
+
+def rebuild_reading_stats(user_ids=None, dates=None):
+    """生のScheduleから集計テーブルを作り直す（ユーザー・日付で範囲を絞れる）"""
+    schedules = Schedule.objects.filter(action_category__track_pages=True, page_count__isnull=False)
+    stats = DailyReadingStat.objects.all()
+    if user_ids is not None:
+        schedules = schedules.filter(owner_id__in=user_ids)
+        stats = stats.filter(owner_id__in=user_ids)
+
+    rows = (
+        schedules
+        .annotate(local_date=TruncDate('start_time', tzinfo=timezone.get_current_timezone()))
+        .values('owner_id', 'local_date', 'action_category_id')
+        .annotate(
+            total_pages=Sum('page_count'),
+            duration=Sum(ExpressionWrapper(F('end_time') - F('start_time'), output_field=DurationField())),
+            session_count=Count('pk'),
+        )
+    )
+    if dates is not None:
+        rows = rows.filter(local_date__in=dates)
+        stats = stats.filter(date__in=dates)
+
+    with transaction.atomic():
+        stats.delete()
+        new_stats = [
+            DailyReadingStat(
+                owner_id=row['owner_id'],
+                date=row['local_date'],
+                category_id=row['action_category_id'],
+                pages=row['total_pages'] or 0,
+                minutes=max(int(row['duration'].total_seconds() // 60), 0) if row['duration'] else 0,
+                sessions=row['session_count'],
+            )
+            for row in rows
+        ]
+        DailyReadingStat.objects.bulk_create(new_stats, batch_size=500)
+    return len(new_stats)
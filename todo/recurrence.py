@@ -0,0 +1,178 @@
+import re
+from datetime import date, datetime, timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Schedule, ScheduleRecurrence
+
+
+OCCURRENCE_KEY_RE = re.compile(r"^r(?P<rule_id>\d+)-(?P<date>\d{8})$")
+
+
+def occurrence_key(rule_id, occurrence_date):
+    """仮想の回をカレンダー上で識別するためのID（例: r12-20261005）"""
+    return f"r{rule_id}-{occurrence_date:%Y%m%d}"
+
+
+def parse_occurrence_key(value):
+    """occurrence_key の逆変換。形式が違えば None を返す"""
+    match = OCCURRENCE_KEY_RE.match(str(value or ""))
+    if not match:
+        return None
+    try:
+        occurrence_date = datetime.strptime(match.group("date"), "%Y%m%d").date()
+    except ValueError:
+        return None
+    return int(match.group("rule_id")), occurrence_date
+
+
+def build_recurrence_spec(rule, skip_dates=()):
+    """ルールを展開に必要な値だけの辞書にする（キャッシュにも入れられる形）"""
+    master = rule.schedule
+    return {
+        "id": rule.pk,
+        "first_start": master.start_time,
+        "duration": master.end_time - master.start_time,
+        "frequency": rule.frequency,
+        "interval": max(rule.interval, 1),
+        "weekdays": tuple(rule.weekday_list()),
+        "until": rule.until,
+        "skip_dates": set(skip_dates) | {date.fromisoformat(value) for value in rule.exception_dates},
+    }
+
+
+def occurrence_dates(spec, start_date, end_date):
+    """start_date〜end_date(両端含む)の中でルールに当てはまる日付を返す"""
+    first_date = timezone.localtime(spec["first_start"]).date()
+    start_date = max(start_date, first_date)
+    if spec["until"]:
+        end_date = min(end_date, spec["until"])
+
+    interval = spec["interval"]
+    first_monday = first_date - timedelta(days=first_date.weekday())
+    current = start_date
+    while current <= end_date:
+        days = (current - first_date).days
+        if spec["frequency"] == ScheduleRecurrence.Frequency.DAILY:
+            matched = days % interval == 0
+        elif spec["frequency"] == ScheduleRecurrence.Frequency.WEEKLY:
+            matched = current.weekday() == first_date.weekday() and (days // 7) % interval == 0
+        else:
+            weeks = (current - first_monday).days // 7
+            matched = current.weekday() in spec["weekdays"] and weeks % interval == 0
+        if matched:
+            yield current
+        current += timedelta(days=1)
+
+
+def occurrence_start(spec, occurrence_date):
+    """その日の回の開始時刻（1回目と同じ現地時刻）"""
+    local_time = timezone.localtime(spec["first_start"]).time().replace(tzinfo=None)
+    return timezone.make_aware(datetime.combine(occurrence_date, local_time))
+
+
+def expand_occurrences(spec, range_start, range_end):
+    """表示範囲と重なる仮想の回を (日付, 開始, 終了) で返す
+
+    1回目（元のスケジュール）、除外日、実体化済みの日は含めない。
+    """
+    first_date = timezone.localtime(spec["first_start"]).date()
+    start_date = timezone.localtime(range_start - spec["duration"]).date()
+    end_date = timezone.localtime(range_end).date()
+    for current in occurrence_dates(spec, start_date, end_date):
+        if current == first_date or current in spec["skip_dates"]:
+            continue
+        start = occurrence_start(spec, current)
+        end = start + spec["duration"]
+        if start < range_end and end > range_start:
+            yield current, start, end
+
+
+def _materialized_dates(rules):
+    """ルールごとの実体化済みの日付 {rule_id: {date, ...}}"""
+    materialized = {}
+    if not rules:
+        return materialized
+    for rule_id, materialized_date in (
+        Schedule.objects
+        .filter(recurrence_source__in=rules, occurrence_date__isnull=False)
+        .values_list("recurrence_source_id", "occurrence_date")
+    ):
+        materialized.setdefault(rule_id, set()).add(materialized_date)
+    return materialized
+
+
+def recurrences_for_range(rules, range_start, range_end):
+    """ルールの QuerySet から、表示範囲の仮想の回を (rule, 日付, 開始, 終了) で返す
+
+    実体化済みの日は1回のクエリでまとめて取得する。
+    """
+    rules = list(
+        rules
+        .filter(schedule__start_time__lt=range_end)
+        .exclude(until__lt=timezone.localtime(range_start).date() - timedelta(days=1))
+        .select_related("schedule__action_category", "schedule__action_item")
+    )
+    if not rules:
+        return []
+
+    materialized = _materialized_dates(rules)
+    occurrences = []
+    for rule in rules:
+        spec = build_recurrence_spec(rule, materialized.get(rule.pk, ()))
+        for current, start, end in expand_occurrences(spec, range_start, range_end):
+            occurrences.append((rule, current, start, end))
+    return occurrences
+
+
+def build_recurrence_specs(user_id):
+    """ユーザーの全ルールを展開用の辞書にする（公開カレンダーのキャッシュ用）"""
+    rules = list(ScheduleRecurrence.objects.filter(owner_id=user_id).select_related("schedule"))
+    materialized = _materialized_dates(rules)
+    return [build_recurrence_spec(rule, materialized.get(rule.pk, ())) for rule in rules]
+
+
+def occurs_on(rule, occurrence_date):
+    """その日がルールの（1回目以外の）回かどうか"""
+    spec = build_recurrence_spec(rule)
+    first_date = timezone.localtime(spec["first_start"]).date()
+    if occurrence_date == first_date or occurrence_date in spec["skip_dates"]:
+        return False
+    return any(True for _ in occurrence_dates(spec, occurrence_date, occurrence_date))
+
+
+def build_occurrence(rule, occurrence_date):
+    """仮想の回を保存前の Schedule にする（表示だけならDBに書かない）"""
+    master = rule.schedule
+    spec = build_recurrence_spec(rule)
+    start = occurrence_start(spec, occurrence_date)
+    return Schedule(
+        owner_id=rule.owner_id,
+        action_category_id=master.action_category_id,
+        action_item_id=master.action_item_id,
+        title_override=master.title_override,
+        start_time=start,
+        end_time=start + spec["duration"],
+        recurrence_source=rule,
+        occurrence_date=occurrence_date,
+    )
+
+
+def materialize_occurrence(rule, occurrence_date):
+    """仮想の回を実体の Schedule にする（既にあればそれを返す）"""
+    with transaction.atomic():
+        existing = Schedule.objects.filter(recurrence_source=rule, occurrence_date=occurrence_date).first()
+        if existing:
+            return existing
+        schedule = build_occurrence(rule, occurrence_date)
+        schedule.save()
+        return schedule
+
+
+def add_exception_date(rule, occurrence_date):
+    """削除された回を除外日に追加する"""
+    value = occurrence_date.isoformat()
+    if value not in rule.exception_dates:
+        rule.exception_dates = rule.exception_dates + [value]
+        rule.save(update_fields=["exception_dates"])
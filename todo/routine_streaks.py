@@ -0,0 +1,90 @@
+from datetime import timedelta
+
+from django.db.models import Count, F, Q
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import DailyRoutineTask, Schedule, Task
+
+
+STREAK_FIELDS = ("current_streak", "longest_streak", "streak_last_date")
+
+
+def _streaks(dates):
+    """完了した日付（昇順・重複なし）から (最新の連続日数, 最新の完了日, 最長の連続日数)"""
+    current = longest = 0
+    previous = None
+    for day in dates:
+        current = current + 1 if previous and day - previous == timedelta(days=1) else 1
+        longest = max(longest, current)
+        previous = day
+    return current, previous, longest
+
+
+def rebuild_routine_streaks(routine_ids=None):
+    """ルーティーンの連続記録を、完了したタスクの日付から作り直す。作り直した件数を返す"""
+    routines = DailyRoutineTask.objects.all()
+    if routine_ids is not None:
+        routines = routines.filter(pk__in=list(routine_ids))
+    routines = list(routines)
+    dates = {routine.pk: [] for routine in routines}
+    for routine_id, day in (
+        Task.objects
+        .filter(daily_routine__in=routines, completed=True, schedule__daily_date__isnull=False)
+        .order_by("daily_routine_id", "schedule__daily_date")
+        .values_list("daily_routine_id", "schedule__daily_date")
+        .distinct()
+    ):
+        dates[routine_id].append(day)
+    for routine in routines:
+        routine.current_streak, routine.streak_last_date, routine.longest_streak = _streaks(dates[routine.pk])
+    DailyRoutineTask.objects.bulk_update(routines, STREAK_FIELDS)
+    return len(routines)
+
+
+def record_routine_completion(routine_id, schedule_id, completed):
+    """ルーティーンのタスクの完了/未完了の切り替えを連続記録に反映する
+
+    最新の連続の翌日を完了にした（毎日チェックする普段の場合）ときは1つ進めるだけ。
+    過去の日の変更や取り消しは、そのルーティーンだけ作り直す。
+    """
+    day = Schedule.objects.filter(pk=schedule_id).values_list("daily_date", flat=True).first()
+    if day is None:
+        return
+    if completed:
+        extended = DailyRoutineTask.objects.filter(pk=routine_id, streak_last_date=day - timedelta(days=1)).update(
+            current_streak=F("current_streak") + 1,
+            longest_streak=Greatest(F("longest_streak"), F("current_streak") + 1),
+            streak_last_date=day,
+        )
+        if extended:
+            return
+    rebuild_routine_streaks([routine_id])
+
+
+def routines_with_stats(user, today=None):
+    """ルーティーン一覧に、今の連続日数と直近7日/30日の達成率を付けて返す（1回のクエリ）"""
+    today = today or timezone.localdate()
+
+    def window(days):
+        return Q(generated_tasks__schedule__daily_date__range=(today - timedelta(days=days - 1), today))
+
+    done = Q(generated_tasks__completed=True)
+    routines = list(
+        DailyRoutineTask.objects
+        .filter(owner=user)
+        .annotate(
+            done_7=Count("generated_tasks", filter=window(7) & done),
+            total_7=Count("generated_tasks", filter=window(7)),
+            done_30=Count("generated_tasks", filter=window(30) & done),
+            total_30=Count("generated_tasks", filter=window(30)),
+        )
+        .order_by("position", "id")
+    )
+    for routine in routines:
+        # 昨日まで続いていれば、今日まだチェックしていなくても途切れていない
+        alive = routine.streak_last_date is not None and routine.streak_last_date >= today - timedelta(days=1)
+        routine.active_streak = routine.current_streak if alive else 0
+        routine.rate_7 = round(routine.done_7 * 100 / routine.total_7) if routine.total_7 else None
+        routine.rate_30 = round(routine.done_30 * 100 / routine.total_30) if routine.total_30 else None
+    return routines
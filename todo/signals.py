@@ -0,0 +1,176 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .busy_blocks import (
+    PUBLIC_CALENDAR_OWNER_ID, add_busy_interval, build_busy_blocks, invalidate_busy_recurrences,
+    remove_busy_interval,
+)
+from .models import ActionCategory, ActionItem, Schedule, ScheduleRecurrence, Task, TODAY_TASK_TITLE
+from .reading_stats import deleted_contribution, rebuild_reading_stats, record_schedule_change
+from .live import progress_data, publish_on_commit, schedule_event_data
+from .routine_streaks import rebuild_routine_streaks
+from .task_counts import record_task_change
+from .versions import bump_calendar_version, bump_form_options_version, bump_reading_progress_version
+
+
+def calendar_bulk_changed(user_id):
+    """bulk_create / bulk_update の後に、シグナルの代わりにカレンダー側の更新をまとめて行う
+
+    ETag の無効化・公開カレンダーの埋まり具合・ライブ更新。読書統計など呼び出し元ごとの後始末は別。
+    """
+    bump_calendar_version(user_id)
+    if user_id == PUBLIC_CALENDAR_OWNER_ID:
+        build_busy_blocks(user_id)
+    publish_on_commit(user_id, 'refetch', dict)
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+@receiver(post_save, sender=ScheduleRecurrence)
+@receiver(post_delete, sender=ScheduleRecurrence)
+@receiver(post_save, sender=ActionCategory)
+@receiver(post_delete, sender=ActionCategory)
+@receiver(post_save, sender=ActionItem)
+@receiver(post_delete, sender=ActionItem)
+def bump_owner_calendar_version(sender, instance, **kwargs):
+    """スケジュール/タスクの変更でカレンダーのETagを無効にする
+
+    イベントにはカテゴリ名・色とアイテム名も入るので、カテゴリ/アイテムの変更でも無効にする。
+    """
+    bump_calendar_version(instance.owner_id)
+
+
+@receiver(post_save, sender=ActionCategory)
+@receiver(post_delete, sender=ActionCategory)
+@receiver(post_save, sender=ActionItem)
+@receiver(post_delete, sender=ActionItem)
+def bump_owner_form_options_version(sender, instance, **kwargs):
+    """カテゴリ/アイテムの変更でスケジュールフォームの選択肢を無効にする"""
+    bump_form_options_version(instance.owner_id)
+
+
+def _is_public_busy_schedule(instance):
+    return instance.owner_id == PUBLIC_CALENDAR_OWNER_ID and instance.title_override != TODAY_TASK_TITLE
+
+
+@receiver(pre_save, sender=Schedule)
+def remember_previous_schedule_time(sender, instance, **kwargs):
+    """公開カレンダー対象の予定は、移動前の時間を覚えておく"""
+    instance._busy_previous_interval = None
+    if instance.pk and instance.owner_id == PUBLIC_CALENDAR_OWNER_ID:
+        previous = (
+            Schedule.objects
+            .filter(pk=instance.pk)
+            .exclude(title_override=TODAY_TASK_TITLE)
+            .values_list('start_time', 'end_time')
+            .first()
+        )
+        instance._busy_previous_interval = previous
+
+
+@receiver(post_save, sender=Schedule)
+def update_public_busy_blocks(sender, instance, **kwargs):
+    """公開カレンダーの「予定あり」ブロックを差分で更新する"""
+    if instance.owner_id == PUBLIC_CALENDAR_OWNER_ID:
+        # 1回目の移動や回の実体化で展開結果が変わるので作り直させる
+        invalidate_busy_recurrences(instance.owner_id)
+    previous = getattr(instance, '_busy_previous_interval', None)
+    if previous:
+        remove_busy_interval(instance.owner_id, *previous)
+    if _is_public_busy_schedule(instance):
+        add_busy_interval(instance.owner_id, instance.start_time, instance.end_time)
+
+
+@receiver(post_delete, sender=Schedule)
+def remove_public_busy_block(sender, instance, **kwargs):
+    if instance.owner_id == PUBLIC_CALENDAR_OWNER_ID:
+        invalidate_busy_recurrences(instance.owner_id)
+    if _is_public_busy_schedule(instance):
+        remove_busy_interval(instance.owner_id, instance.start_time, instance.end_time)
+
+
+@receiver(post_save, sender=ScheduleRecurrence)
+@receiver(post_delete, sender=ScheduleRecurrence)
+def invalidate_public_recurrences(sender, instance, **kwargs):
+    if instance.owner_id == PUBLIC_CALENDAR_OWNER_ID:
+        invalidate_busy_recurrences(instance.owner_id)
+
+
+@receiver(post_delete, sender=Schedule)
+def remove_reading_stat(sender, instance, **kwargs):
+    """削除（カスケード削除を含む）を読書統計に反映する。削除と同じトランザクションで実行される"""
+    record_schedule_change(deleted_contribution(instance), None)
+
+
+@receiver(pre_save, sender=Schedule)
+def remember_previous_action_item(sender, instance, **kwargs):
+    """アイテムを付け替えたときに、元のアイテムの読書進捗も無効にするため"""
+    instance._previous_action_item_id = None
+    update_fields = kwargs.get('update_fields')
+    if instance.pk and (update_fields is None or 'action_item' in update_fields):
+        instance._previous_action_item_id = (
+            Schedule.objects.filter(pk=instance.pk).values_list('action_item_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def bump_reading_progress(sender, instance, **kwargs):
+    """スケジュールの変更で、関係するアイテムの読書進捗のキャッシュを無効にする"""
+    item_ids = {instance.action_item_id, getattr(instance, '_previous_action_item_id', None)}
+    for item_id in item_ids - {None}:
+        bump_reading_progress_version(item_id)
+
+
+@receiver(post_delete, sender=Task)
+def decrement_task_counts(sender, instance, **kwargs):
+    """タスクの削除をスケジュールのタスク数カウンタに反映する"""
+    record_task_change((instance.schedule_id, instance.completed), None)
+
+
+@receiver(post_delete, sender=Task)
+def rebuild_routine_streak_on_delete(sender, instance, **kwargs):
+    """完了済みのルーティーンのタスクが消えたら、そのルーティーンの連続記録を作り直す"""
+    if instance.daily_routine_id and instance.completed:
+        rebuild_routine_streaks([instance.daily_routine_id])
+
+
+@receiver(pre_save, sender=ActionCategory)
+def remember_previous_track_pages(sender, instance, **kwargs):
+    instance._previous_track_pages = None
+    if instance.pk:
+        instance._previous_track_pages = (
+            ActionCategory.objects.filter(pk=instance.pk).values_list('track_pages', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=ActionCategory)
+def rebuild_stats_on_track_pages_change(sender, instance, created, **kwargs):
+    """「ページ数を記録する」を切り替えたら、そのユーザーの読書統計を作り直す"""
+    previous = getattr(instance, '_previous_track_pages', None)
+    if not created and previous is not None and previous != instance.track_pages:
+        rebuild_reading_stats(user_ids=[instance.owner_id])
+
+
+@receiver(post_save, sender=Schedule)
+@receiver(post_delete, sender=Schedule)
+def publish_schedule_change(sender, instance, **kwargs):
+    """開いている他のタブ・端末のカレンダーに変更を流す（SSE）"""
+    if instance.title_override == TODAY_TASK_TITLE:
+        return
+    schedule_id = instance.pk
+    publish_on_commit(instance.owner_id, 'schedule', lambda: schedule_event_data(schedule_id))
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def publish_task_progress(sender, instance, **kwargs):
+    schedule_id = instance.schedule_id
+    publish_on_commit(instance.owner_id, 'progress', lambda: progress_data(schedule_id))
+
+
+@receiver(post_save, sender=ScheduleRecurrence)
+@receiver(post_delete, sender=ScheduleRecurrence)
+def publish_recurrence_change(sender, instance, **kwargs):
+    publish_on_commit(instance.owner_id, 'refetch', dict)
@@ -0,0 +1,68 @@
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Schedule, Task
+
+
+def previous_task_state(task_id):
+    """保存前のDB上の (schedule_id, completed)"""
+    return Task.objects.filter(pk=task_id).values_list('schedule_id', 'completed').first()
+
+
+def record_task_change(before, after):
+    """タスクの作成/更新/削除の前後 (schedule_id, completed) の差分をカウンタに反映する"""
+    if before == after:
+        return
+    deltas = {}
+    for state, sign in ((before, -1), (after, +1)):
+        if state is None:
+            continue
+        schedule_id, completed = state
+        total, done = deltas.get(schedule_id, (0, 0))
+        deltas[schedule_id] = (total + sign, done + sign * int(completed))
+
+    with transaction.atomic():
+        for schedule_id, (total, done) in deltas.items():
+            if total or done:
+                Schedule.objects.filter(pk=schedule_id).update(
+                    tasks_total=F('tasks_total') + total,
+                    tasks_completed=F('tasks_completed') + done,
+                )
+
+
+def _count_subquery(**filters):
+    tasks = (
+        Task.objects
+        .filter(schedule=OuterRef('pk'), **filters)
+        .order_by()
+        .values('schedule')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(tasks, output_field=IntegerField()), Value(0))
+
+
+def rebuild_task_counts(schedule_ids):
+    """指定したスケジュールのカウンタを実際のタスクから数え直す（bulk_create の後など）"""
+    return Schedule.objects.filter(pk__in=list(schedule_ids)).update(
+        tasks_total=_count_subquery(),
+        tasks_completed=_count_subquery(completed=True),
+    )
+
+
+def repair_task_counts(user_ids=None):
+    """実際のタスク数とずれているスケジュールを探して直す。直した件数を返す"""
+    schedules = Schedule.objects.all()
+    if user_ids is not None:
+        schedules = schedules.filter(owner_id__in=user_ids)
+    drifted = (
+        schedules
+        .annotate(
+            actual_total=Count('tasks'),
+            actual_completed=Count('tasks', filter=Q(tasks__completed=True)),
+        )
+        .exclude(tasks_total=F('actual_total'), tasks_completed=F('actual_completed'))
+        .values_list('pk', flat=True)
+    )
+    return rebuild_task_counts(drifted)
@@ -1,3 +1,971 @@
+import json
+from base64 import urlsafe_b64encode
+from datetime import date, datetime, time, timedelta
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from .busy_blocks import PUBLIC_CALENDAR_OWNER_ID
+from .conflicts import conflicts_in_range, find_conflicts
+from .copying import copy_schedules
+from .daily import prepare_daily_schedules
+from .free_slots import find_free_slots
+from .ical import make_feed_token
+from .importing import import_schedules
+from .models import ActionCategory, ActionItem, DailyReadingStat, DailyRoutineTask, Schedule, ScheduleRecurrence, Task, TODAY_TASK_TITLE
+from .reading_stats import rebuild_reading_stats
+from .recurrence import (
+    add_exception_date, materialize_occurrence, occurrence_key, occurs_on, parse_occurrence_key, recurrences_for_range,
+)
+from .routine_streaks import rebuild_routine_streaks, routines_with_stats
+
+
+def aware(*args):
+    return timezone.make_aware(datetime(*args))
+
+
+class ReadingStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('reader', password='p')
+        self.category = ActionCategory.objects.create(name='読書', owner=self.user, track_pages=True)
+        self.item = ActionItem.objects.create(title='本', owner=self.user, category=self.category)
+
+    def create_reading(self, start, pages=10, **kwargs):
+        fields = {'owner': self.user, 'action_category': self.category, 'action_item': self.item}
+        fields.update(kwargs)
+        return Schedule.objects.create(start_time=start, end_time=start + timedelta(hours=1), page_count=pages, **fields)
+
+    def assert_rollup_matches_rebuild(self):
+        def snapshot():
+            return sorted(DailyReadingStat.objects.values_list('owner_id', 'date', 'category_id', 'pages', 'minutes', 'sessions'))
+        maintained = snapshot()
+        rebuild_reading_stats()
+        self.assertEqual(maintained, snapshot())
+        return maintained
+
+    def test_create_and_edit(self):
+        schedule = self.create_reading(aware(2026, 10, 5, 9))
+        self.create_reading(aware(2026, 10, 5, 20), pages=5)
+        schedule.page_count = 30
+        schedule.save()
+        rows = self.assert_rollup_matches_rebuild()
+        self.assertEqual([row[3:] for row in rows], [(35, 120, 2)])
+
+    def test_drag_across_days(self):
+        schedule = self.create_reading(aware(2026, 10, 5, 23, 30))
+        self.client.force_login(self.user)
+        self.client.post(
+            reverse('todo:update_schedule_time'),
+            json.dumps({'id': schedule.pk, 'start': '2026-10-06T00:30:00+09:00', 'end': '2026-10-06T01:30:00+09:00'}),
+            content_type='application/json',
+        )
+        rows = self.assert_rollup_matches_rebuild()
+        self.assertEqual([row[1] for row in rows], [date(2026, 10, 6)])
+
+        self.client.post(
+            reverse('todo:batch_update_schedule_time'),
+            json.dumps({'moves': [{'id': schedule.pk, 'start': '2026-10-07T08:00:00+09:00', 'end': '2026-10-07T09:00:00+09:00'}]}),
+            content_type='application/json',
+        )
+        rows = self.assert_rollup_matches_rebuild()
+        self.assertEqual([row[1] for row in rows], [date(2026, 10, 7)])
+
+    def test_category_change(self):
+        schedule = self.create_reading(aware(2026, 10, 5, 9))
+        other = ActionCategory.objects.create(name='漫画', owner=self.user, track_pages=True)
+        untracked = ActionCategory.objects.create(name='運動', owner=self.user)
+        schedule.action_category = other
+        schedule.save()
+        rows = self.assert_rollup_matches_rebuild()
+        self.assertEqual([row[2] for row in rows], [other.pk])
+
+        schedule.action_category = untracked
+        schedule.save()
+        self.assertEqual(self.assert_rollup_matches_rebuild(), [])
+
+        untracked.track_pages = True
+        untracked.save()
+        self.assertEqual(len(self.assert_rollup_matches_rebuild()), 1)
+
+    def test_import(self):
+        self.create_reading(aware(2026, 10, 5, 9))
+        csv_file = SimpleUploadedFile('schedules.csv', (
+            'start,end,category,item,page_count\n'
+            '2026-10-05 20:00,2026-10-05 21:00,読書,本,12\n'
+            '2026-10-06 20:00,2026-10-06 20:30,読書,本,8\n'
+        ).encode())
+        result = import_schedules(self.user, csv_file, 'csv')
+        self.assertEqual((result.created, result.errors), (2, []))
+        rows = self.assert_rollup_matches_rebuild()
+        self.assertEqual([row[3] for row in rows], [22, 8])
+
+    def test_user_cascade_delete(self):
+        schedule = self.create_reading(aware(2026, 10, 5, 9))
+        Task.objects.create(title='t', owner=self.user, schedule=schedule, completed=True)
+        self.assertEqual(DailyReadingStat.objects.count(), 1)
+
+        self.user.delete()
+
+        self.assertFalse(Schedule.objects.exists())
+        self.assertEqual(self.assert_rollup_matches_rebuild(), [])
+
+    def test_item_and_category_cascade_delete(self):
+        self.create_reading(aware(2026, 10, 5, 9))
+        self.item.delete()
+        self.assertEqual(self.assert_rollup_matches_rebuild(), [])
+
+        self.create_reading(aware(2026, 10, 5, 9), action_item=None)
+        self.category.delete()
+        self.assertEqual(self.assert_rollup_matches_rebuild(), [])
+
+
+class CalendarEtagTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('owner', password='p')
+        self.client.force_login(self.user)
+        self.category = ActionCategory.objects.create(name='読書', owner=self.user)
+        self.item = ActionItem.objects.create(title='本', owner=self.user, category=self.category)
+        Schedule.objects.create(
+            owner=self.user, action_category=self.category, action_item=self.item,
+            start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10),
+        )
+        self.url = reverse('todo:calendar_events') + '?start=2026-10-01T00:00:00%2B09:00&end=2026-11-01T00:00:00%2B09:00'
+
+    def assert_refetched_after(self, change):
+        etag = self.client.get(self.url)['ETag']
+        change()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_item_rename_changes_etag(self):
+        def rename():
+            self.item.title = '別の本'
+            self.item.save()
+        response = self.assert_refetched_after(rename)
+        self.assertEqual(response.json()[0]['title'], '読書: 別の本')
+
+    def test_category_color_change_changes_etag(self):
+        def recolor():
+            self.category.color = '#123456'
+            self.category.save()
+        response = self.assert_refetched_after(recolor)
+        self.assertEqual(response.json()[0]['backgroundColor'], '#123456')
+
+
+class RecurrenceOccurrenceViewTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planner', password='p')
+        self.client.force_login(self.user)
+        master = Schedule.objects.create(
+            owner=self.user, title_override='朝の勉強',
+            start_time=aware(2026, 10, 5, 7), end_time=aware(2026, 10, 5, 8),
+        )
+        self.rule = ScheduleRecurrence.objects.create(
+            schedule=master, owner=self.user, frequency=ScheduleRecurrence.Frequency.DAILY,
+        )
+        self.key = occurrence_key(self.rule.pk, date(2026, 10, 7))
+
+    def occurrence_url(self, name='todo:schedule_occurrence', day='20261007'):
+        return reverse(name, kwargs={'pk': self.rule.pk, 'occurrence_date': day})
+
+    def materialized(self):
+        return Schedule.objects.filter(recurrence_source=self.rule)
+
+    def test_malformed_dates_are_not_found(self):
+        self.assertEqual(self.client.get(f'/schedule/recurrences/{self.rule.pk}/2026-10-07/').status_code, 404)
+        self.assertEqual(self.client.get(self.occurrence_url(day='20261399')).status_code, 404)
+
+    def test_opening_an_occurrence_does_not_materialize_it(self):
+        response = self.client.get(self.occurrence_url())
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['schedule'].pk)
+        self.assertEqual(response.context['schedule'].start_time, aware(2026, 10, 7, 7))
+        self.assertEqual(self.client.get(self.occurrence_url('todo:schedule_occurrence_edit_form')).status_code, 200)
+        self.assertFalse(self.materialized().exists())
+
+    def test_adding_a_task_materializes_the_occurrence(self):
+        response = self.client.post(self.occurrence_url(), {'title': '単語'})
+        schedule = self.materialized().get()
+        self.assertRedirects(response, reverse('todo:schedule_detail', kwargs={'pk': schedule.pk}))
+        self.assertEqual(schedule.occurrence_date, date(2026, 10, 7))
+        self.assertEqual(list(schedule.tasks.values_list('title', flat=True)), ['単語'])
+
+    def test_edit_materializes_only_when_valid(self):
+        url = self.occurrence_url('todo:schedule_occurrence_update')
+        self.client.post(url, {'start_time': 'not a time', 'end_time': ''})
+        self.assertFalse(self.materialized().exists())
+
+        response = self.client.post(url, {'start_time': '2026-10-07T07:30', 'end_time': '2026-10-07T08:30'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.materialized().get().start_time, aware(2026, 10, 7, 7, 30))
+
+    def test_rejected_batch_move_does_not_materialize(self):
+        response = self.client.post(
+            reverse('todo:batch_update_schedule_time'),
+            json.dumps({'moves': [{'id': self.key, 'start': '2026-10-07T09:00:00+09:00', 'end': '2026-10-07T08:00:00+09:00'}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['results'][0]['status'], 'error')
+        self.assertFalse(self.materialized().exists())
+
+    def test_batch_move_materializes_the_moved_occurrence(self):
+        response = self.client.post(
+            reverse('todo:batch_update_schedule_time'),
+            json.dumps({'moves': [{'id': self.key, 'start': '2026-10-07T09:00:00+09:00', 'end': '2026-10-07T10:00:00+09:00'}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['status'], 'success')
+        self.assertEqual(self.materialized().get().start_time, aware(2026, 10, 7, 9))
+
+
+class ActionItemCursorTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('lister', password='p')
+        self.client.force_login(self.user)
+        ActionItem.objects.create(title='やること', owner=self.user)
+
+    def get_page(self, cursor_values, section='todo'):
+        cursor = urlsafe_b64encode(json.dumps(cursor_values).encode()).decode()
+        return self.client.get(reverse('todo:action_item_list'), {'section': section, 'after': cursor})
+
+    def test_tampered_cursors_fall_back_to_the_first_page(self):
+        for values in ([False, 5, 1], [False, '2026-13-45', 1], [False, None, 'x'], ['no', None, 1], [0, None, 1]):
+            with self.subTest(values=values):
+                response = self.get_page(values)
+                self.assertEqual(response.status_code, 200)
+                self.assertContains(response, 'やること')
+        self.assertEqual(self.get_page([1, 2, 3], section='reading').status_code, 200)
+
+
+class DailyBatchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('morning', password='p')
+        DailyRoutineTask.objects.create(title='日記', owner=self.user)
+        DailyRoutineTask.objects.create(title='筋トレ', owner=self.user)
+
+    def test_counts_only_inserted_rows(self):
+        users = User.objects.filter(pk=self.user.pk)
+        self.assertEqual(prepare_daily_schedules(date(2026, 10, 5), users), (1, 2))
+        self.assertEqual(prepare_daily_schedules(date(2026, 10, 5), users), (0, 0))
+
+
+class SummaryYearTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('summary', password='p')
+        self.client.force_login(self.user)
+
+    def test_out_of_range_years_fall_back_to_this_year(self):
+        this_year = timezone.localdate().year
+        for year in ('0', '1', '9999', '99999', '-5'):
+            with self.subTest(year=year):
+                response = self.client.get(reverse('todo:yearly_summary'), {'year': year})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['year'], this_year)
+                response = self.client.get(reverse('todo:monthly_summary'), {'year': year, 'month': '1'})
+                self.assertEqual(response.status_code, 200)
+
+
+class TaskCounterTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('counter', password='p')
+        self.client.force_login(self.user)
+        self.first = Schedule.objects.create(owner=self.user, start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10))
+        self.second = Schedule.objects.create(owner=self.user, start_time=aware(2026, 10, 6, 9), end_time=aware(2026, 10, 6, 10))
+        self.tasks = [Task.objects.create(title=f't{i}', owner=self.user, schedule=self.first) for i in range(3)]
+
+    def assert_counters_match(self):
+        for schedule in Schedule.objects.filter(owner=self.user):
+            self.assertEqual(
+                (schedule.tasks_total, schedule.tasks_completed),
+                (schedule.tasks.count(), schedule.tasks.filter(completed=True).count()),
+                schedule,
+            )
+
+    def test_toggle(self):
+        self.client.post(reverse('todo:toggle_task', kwargs={'pk': self.tasks[0].pk}))
+        self.assert_counters_match()
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.tasks_completed, 1)
+        self.client.post(reverse('todo:toggle_task', kwargs={'pk': self.tasks[0].pk}))
+        self.assert_counters_match()
+
+    def test_delete(self):
+        self.tasks[1].completed = True
+        self.tasks[1].save()
+        self.tasks[1].delete()
+        self.assert_counters_match()
+        self.first.delete()
+        self.assert_counters_match()
+
+    def test_move_to_another_schedule(self):
+        task = self.tasks[2]
+        task.completed = True
+        task.schedule = self.second
+        task.save()
+        self.assert_counters_match()
+        self.second.refresh_from_db()
+        self.assertEqual((self.second.tasks_total, self.second.tasks_completed), (1, 1))
+
+    def test_schedule_save_does_not_overwrite_counters(self):
+        stale = Schedule.objects.get(pk=self.first.pk)
+        Task.objects.create(title='new', owner=self.user, schedule=self.first)
+        stale.title_override = '更新'
+        stale.save()
+        self.assert_counters_match()
+
+    def test_daily_batch(self):
+        DailyRoutineTask.objects.create(title='日記', owner=self.user)
+        prepare_daily_schedules(date(2026, 10, 7), User.objects.filter(pk=self.user.pk))
+        self.assert_counters_match()
+        self.assertEqual(Schedule.objects.get(daily_date=date(2026, 10, 7)).tasks_total, 1)
+
+    def test_copy(self):
+        result = copy_schedules(self.user, date(2026, 10, 5), date(2026, 10, 6), date(2026, 10, 12), date(2026, 10, 25))
+        # 2日分を2週間に7回貼り付ける
+        self.assertEqual((result.created, result.tasks), (14, 21))
+        self.assert_counters_match()
+
+
+class RoutineStreakTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('routine', password='p')
+        self.routine = DailyRoutineTask.objects.create(title='日記', owner=self.user)
+        self.today = date(2026, 10, 18)
+        self.tasks = {}
+        for offset in range(6, -1, -1):
+            day = self.today - timedelta(days=offset)
+            schedule = Schedule.objects.create(
+                owner=self.user, daily_date=day, title_override=TODAY_TASK_TITLE,
+                start_time=aware(day.year, day.month, day.day), end_time=aware(day.year, day.month, day.day, 23, 59),
+            )
+            self.tasks[day] = Task.objects.create(title='日記', owner=self.user, schedule=schedule, daily_routine=self.routine)
+
+    def set_completed(self, offset, completed=True):
+        task = self.tasks[self.today - timedelta(days=offset)]
+        task.completed = completed
+        task.save()
+
+    def streak(self):
+        self.routine.refresh_from_db()
+        maintained = (self.routine.current_streak, self.routine.longest_streak, self.routine.streak_last_date)
+        rebuild_routine_streaks([self.routine.pk])
+        self.routine.refresh_from_db()
+        self.assertEqual(maintained, (self.routine.current_streak, self.routine.longest_streak, self.routine.streak_last_date))
+        return maintained[:2]
+
+    def test_extend(self):
+        for offset in (3, 2, 1):
+            self.set_completed(offset)
+        self.assertEqual(self.streak(), (3, 3))
+
+    def test_break_starts_a_new_streak(self):
+        for offset in (6, 5, 4):
+            self.set_completed(offset)
+        self.set_completed(1)
+        self.assertEqual(self.streak(), (1, 3))
+        self.set_completed(0)
+        self.assertEqual(self.streak(), (2, 3))
+
+    def test_filling_a_gap_joins_streaks(self):
+        for offset in (4, 2, 1):
+            self.set_completed(offset)
+        self.set_completed(3)
+        self.assertEqual(self.streak(), (4, 4))
+
+    def test_undo(self):
+        for offset in (3, 2, 1):
+            self.set_completed(offset)
+        self.set_completed(1, completed=False)
+        self.assertEqual(self.streak(), (2, 2))
+        self.set_completed(3, completed=False)
+        self.assertEqual(self.streak(), (1, 1))
+
+    def test_deleting_a_completed_task(self):
+        for offset in (2, 1):
+            self.set_completed(offset)
+        self.tasks[self.today - timedelta(days=1)].delete()
+        self.assertEqual(self.streak(), (1, 1))
+
+    def test_stats_for_the_category_list(self):
+        for offset in (2, 1):
+            self.set_completed(offset)
+        routine, = routines_with_stats(self.user, today=self.today)
+        self.assertEqual((routine.active_streak, routine.rate_7, routine.rate_30), (2, 29, 29))
+        # 2日空くと今の連続は0になる（最長はそのまま）
+        routine, = routines_with_stats(self.user, today=self.today + timedelta(days=2))
+        self.assertEqual((routine.active_streak, routine.longest_streak), (0, 2))
+
+
+class RecurrenceExpansionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('repeat', password='p')
+        # 2026-10-05 は月曜日
+        self.master = Schedule.objects.create(
+            owner=self.user, title_override='勉強',
+            start_time=aware(2026, 10, 5, 7), end_time=aware(2026, 10, 5, 8, 30),
+        )
+
+    def create_rule(self, frequency, **kwargs):
+        return ScheduleRecurrence.objects.create(schedule=self.master, owner=self.user, frequency=frequency, **kwargs)
+
+    def expanded_dates(self, range_start=None, range_end=None):
+        rules = ScheduleRecurrence.objects.filter(owner=self.user)
+        return [
+            occurrence_date
+            for _, occurrence_date, _, _ in recurrences_for_range(
+                rules, range_start or aware(2026, 10, 1), range_end or aware(2026, 11, 1),
+            )
+        ]
+
+    def test_daily_with_interval(self):
+        self.create_rule(ScheduleRecurrence.Frequency.DAILY, interval=2)
+        self.assertEqual(
+            self.expanded_dates(range_end=aware(2026, 10, 14)),
+            [date(2026, 10, 7), date(2026, 10, 9), date(2026, 10, 11), date(2026, 10, 13)],
+        )
+
+    def test_weekly_with_interval(self):
+        self.create_rule(ScheduleRecurrence.Frequency.WEEKLY, interval=2)
+        self.assertEqual(self.expanded_dates(range_end=aware(2026, 11, 3)), [date(2026, 10, 19), date(2026, 11, 2)])
+
+    def test_weekdays_with_interval_and_until(self):
+        self.create_rule(ScheduleRecurrence.Frequency.WEEKDAYS, weekdays='0,2', interval=2, until=date(2026, 10, 20))
+        self.assertEqual(self.expanded_dates(), [date(2026, 10, 7), date(2026, 10, 19)])
+
+    def test_exception_and_materialized_dates_are_skipped(self):
+        rule = self.create_rule(ScheduleRecurrence.Frequency.DAILY, until=date(2026, 10, 9))
+        add_exception_date(rule, date(2026, 10, 7))
+        materialize_occurrence(rule, date(2026, 10, 8))
+        self.assertEqual(self.expanded_dates(), [date(2026, 10, 6), date(2026, 10, 9)])
+        self.assertFalse(occurs_on(rule, date(2026, 10, 7)))
+        self.assertTrue(occurs_on(rule, date(2026, 10, 9)))
+        self.assertFalse(occurs_on(rule, date(2026, 10, 10)))
+
+    def test_occurrences_keep_the_local_time_and_length(self):
+        self.create_rule(ScheduleRecurrence.Frequency.WEEKLY)
+        (_, occurrence_date, start, end), = recurrences_for_range(
+            ScheduleRecurrence.objects.filter(owner=self.user), aware(2026, 10, 12), aware(2026, 10, 13),
+        )
+        self.assertEqual((occurrence_date, start, end), (date(2026, 10, 12), aware(2026, 10, 12, 7), aware(2026, 10, 12, 8, 30)))
+
+    def test_range_overlapping_an_occurrence_from_the_previous_day(self):
+        self.master.end_time = aware(2026, 10, 6, 1)
+        self.master.save()
+        self.create_rule(ScheduleRecurrence.Frequency.DAILY)
+        self.assertEqual(self.expanded_dates(aware(2026, 10, 8, 0, 30), aware(2026, 10, 8, 1)), [date(2026, 10, 7)])
+
+    def test_virtual_id_round_trip(self):
+        key = occurrence_key(12, date(2026, 10, 5))
+        self.assertEqual(key, 'r12-20261005')
+        self.assertEqual(parse_occurrence_key(key), (12, date(2026, 10, 5)))
+        for value in ('r12-20261399', 'r12-2026105', '12', 12, None, 'rx-20261005', 'r12-20261005x'):
+            with self.subTest(value=value):
+                self.assertIsNone(parse_occurrence_key(value))
+
+
+class CalendarEventsRangeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('viewer', password='p')
+        self.client.force_login(self.user)
+        Schedule.objects.create(owner=self.user, title_override='予定', start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10))
+
+    def test_invalid_range_values_are_ignored(self):
+        for start in ('2026-02-30T00:00:00', '2026-02-30', '0001-01-01T00:00:00+14:00', 'tomorrow'):
+            with self.subTest(start=start):
+                response = self.client.get(reverse('todo:calendar_events'), {'start': start})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.json()), 1)
+
+    def test_non_decimal_category_ids_are_ignored(self):
+        response = self.client.get(reverse('todo:calendar_events'), {'category': ['²', 'x']})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 1)
+
+
+class BatchUpdateTimeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('mover', password='p')
+        self.client.force_login(self.user)
+        self.schedule = Schedule.objects.create(owner=self.user, start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10))
+
+    def post_moves(self, moves):
+        response = self.client.post(
+            reverse('todo:batch_update_schedule_time'), json.dumps({'moves': moves}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_each_move_gets_its_own_result(self):
+        data = self.post_moves([
+            {'id': self.schedule.pk, 'start': '2026-10-06T09:00:00+09:00', 'end': '2026-10-06T10:00:00+09:00'},
+            {'id': self.schedule.pk, 'start': '2026-02-30T10:00:00'},
+            {'id': str(self.schedule.pk), 'start': '2026-10-06T10:00:00+09:00', 'end': '2026-10-06T09:00:00+09:00'},
+            {'id': 999999, 'start': '2026-10-06T09:00:00+09:00'},
+        ])
+        self.assertEqual(data['status'], 'partial')
+        self.assertEqual(
+            [(result['status'], result.get('message')) for result in data['results']],
+            [('success', None), ('error', 'invalid start'), ('error', 'end must be after start'), ('error', 'not found')],
+        )
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.start_time, aware(2026, 10, 6, 9))
+
+    def test_rejects_ids_that_are_not_ints_or_strings(self):
+        for schedule_id in (True, 1.0, [1], None, '²', ' 1'):
+            with self.subTest(schedule_id=schedule_id):
+                data = self.post_moves([{'id': schedule_id, 'start': '2026-10-07T09:00:00+09:00'}])
+                self.assertEqual(data['results'][0]['message'], 'invalid id')
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.start_time, aware(2026, 10, 5, 9))
+
+
+class ScheduleUpdateTimeTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('dragger', password='p')
+        self.client.force_login(self.user)
+        self.schedule = Schedule.objects.create(owner=self.user, start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10))
+        self.other = Schedule.objects.create(owner=self.user, title_override='会議', start_time=aware(2026, 10, 6, 9), end_time=aware(2026, 10, 6, 11))
+
+    def drag(self, **data):
+        return self.client.post(
+            reverse('todo:update_schedule_time'), json.dumps({'id': self.schedule.pk, **data}), content_type='application/json',
+        )
+
+    def test_missing_end_defaults_to_one_hour(self):
+        response = self.drag(start='2026-10-06T10:00:00+09:00')
+        self.assertEqual(response.status_code, 200)
+        self.schedule.refresh_from_db()
+        self.assertEqual((self.schedule.start_time, self.schedule.end_time), (aware(2026, 10, 6, 10), aware(2026, 10, 6, 11)))
+
+    def test_conflicts_are_reported_in_local_time(self):
+        response = self.drag(start='2026-10-06T10:00:00+09:00', end='2026-10-06T12:00:00+09:00')
+        self.assertEqual(response.json()['conflicts'], [{
+            'id': self.other.pk, 'title': '会議',
+            'start': '2026-10-06T09:00:00+09:00', 'end': '2026-10-06T11:00:00+09:00',
+        }])
+
+    def test_bad_requests_get_json_errors(self):
+        response = self.client.post(reverse('todo:update_schedule_time'), 'not json', content_type='application/json')
+        self.assertEqual((response.status_code, response.json()['status']), (400, 'error'))
+        for schedule_id in (999999, '²'):
+            response = self.client.post(
+                reverse('todo:update_schedule_time'),
+                json.dumps({'id': schedule_id, 'start': '2026-10-06T10:00:00+09:00'}),
+                content_type='application/json',
+            )
+            self.assertEqual((response.status_code, response.json()['message']), (404, 'not found'))
+
+    def test_invalid_times_are_rejected(self):
+        for data in ({'start': '2026-02-30T10:00:00'}, {'start': '2026-10-06T10:00:00+09:00', 'end': '2026-10-06T09:00:00+09:00'}):
+            with self.subTest(data=data):
+                self.assertEqual(self.drag(**data).status_code, 400)
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.start_time, aware(2026, 10, 5, 9))
+
+
+class PublicBusyBlockTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create(pk=PUBLIC_CALENDAR_OWNER_ID, username='public')
+        self.first = Schedule.objects.create(owner=self.owner, start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10))
+        Schedule.objects.create(owner=self.owner, start_time=aware(2026, 10, 5, 9, 30), end_time=aware(2026, 10, 5, 11))
+
+    def busy(self):
+        response = self.client.get(reverse('todo:public_calendar_events'))
+        return [(event['start'], event['end']) for event in response.json()]
+
+    def test_blocks_follow_drags_and_deletes(self):
+        self.assertEqual(self.busy(), [('2026-10-05T09:00:00+09:00', '2026-10-05T11:00:00+09:00')])
+        self.client.force_login(self.owner)
+        self.client.post(
+            reverse('todo:update_schedule_time'),
+            json.dumps({'id': self.first.pk, 'start': '2026-10-05T13:00:00+09:00'}),
+            content_type='application/json',
+        )
+        self.assertEqual(self.busy(), [
+            ('2026-10-05T09:30:00+09:00', '2026-10-05T11:00:00+09:00'),
+            ('2026-10-05T13:00:00+09:00', '2026-10-05T14:00:00+09:00'),
+        ])
+        Schedule.objects.get(pk=self.first.pk).delete()
+        self.assertEqual(self.busy(), [('2026-10-05T09:30:00+09:00', '2026-10-05T11:00:00+09:00')])
+
+    def test_recurring_blocks_are_merged_in_local_time(self):
+        ScheduleRecurrence.objects.create(schedule=self.first, owner=self.owner, frequency=ScheduleRecurrence.Frequency.DAILY)
+        response = self.client.get(reverse('todo:public_calendar_events'), {
+            'start': '2026-10-06T00:00:00+09:00', 'end': '2026-10-07T00:00:00+09:00',
+        })
+        self.assertEqual(
+            [(event['start'], event['end']) for event in response.json()],
+            [('2026-10-06T09:00:00+09:00', '2026-10-06T10:00:00+09:00')],
+        )
+
+
+class ScheduleConflictTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('busy', password='p')
+        self.client.force_login(self.user)
+
+    def create(self, title, start, end, **kwargs):
+        return Schedule.objects.create(owner=self.user, title_override=title, start_time=start, end_time=end, **kwargs)
+
+    def test_find_conflicts_includes_overlaps_only(self):
+        schedule = self.create('本', aware(2026, 10, 5, 9), aware(2026, 10, 5, 11))
+        overlapping = self.create('会議', aware(2026, 10, 5, 10), aware(2026, 10, 5, 12))
+        self.create('隣', aware(2026, 10, 5, 11), aware(2026, 10, 5, 12))
+        self.create(TODAY_TASK_TITLE, aware(2026, 10, 5), aware(2026, 10, 5, 23, 59), daily_date=date(2026, 10, 5))
+        self.assertEqual([block['id'] for block in find_conflicts(schedule)], [overlapping.pk])
+
+    def test_find_conflicts_includes_virtual_occurrences(self):
+        master = self.create('朝', aware(2026, 10, 5, 7), aware(2026, 10, 5, 8))
+        rule = ScheduleRecurrence.objects.create(schedule=master, owner=self.user, frequency=ScheduleRecurrence.Frequency.DAILY)
+        schedule = self.create('早朝', aware(2026, 10, 7, 7, 30), aware(2026, 10, 7, 9))
+        self.assertEqual([block['id'] for block in find_conflicts(schedule)], [occurrence_key(rule.pk, date(2026, 10, 7))])
+
+    def test_conflicts_in_range_pairs_each_overlap_once(self):
+        first = self.create('A', aware(2026, 10, 5, 9), aware(2026, 10, 5, 12))
+        second = self.create('B', aware(2026, 10, 5, 10), aware(2026, 10, 5, 11))
+        third = self.create('C', aware(2026, 10, 5, 10, 30), aware(2026, 10, 5, 13))
+        self.create('D', aware(2026, 10, 5, 13), aware(2026, 10, 5, 14))
+        pairs = conflicts_in_range(self.user.pk, aware(2026, 10, 5), aware(2026, 10, 6))
+        self.assertEqual(
+            {(a['id'], b['id']) for a, b in pairs},
+            {(first.pk, second.pk), (first.pk, third.pk), (second.pk, third.pk)},
+        )
+
+    def test_weekly_view(self):
+        self.create('A', aware(2026, 10, 7, 9), aware(2026, 10, 7, 11))
+        self.create('B', aware(2026, 10, 7, 10), aware(2026, 10, 7, 12))
+        response = self.client.get(reverse('todo:schedule_conflicts'), {'date': '2026-10-08'})
+        self.assertEqual(response.context['start_of_week'], date(2026, 10, 5))
+        self.assertEqual(len(response.context['conflicts']), 1)
+        self.assertEqual(response.context['conflicts'][0]['overlap_start'], aware(2026, 10, 7, 10))
+
+    def test_invalid_dates_fall_back_to_this_week(self):
+        today = timezone.localdate()
+        for value in ('2026-02-30', '0001-01-01', '9999-12-31', 'soon'):
+            with self.subTest(value=value):
+                response = self.client.get(reverse('todo:schedule_conflicts'), {'date': value})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['start_of_week'], today - timedelta(days=today.weekday()))
+
+
+class TimeSummaryDataTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('hours', password='p')
+        self.client.force_login(self.user)
+        self.category = ActionCategory.objects.create(owner=self.user, name='勉強', color='#123456')
+
+    def test_hours_by_category(self):
+        Schedule.objects.create(
+            owner=self.user, title_override='A', action_category=self.category,
+            start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 11, 30),
+        )
+        response = self.client.get(reverse('todo:time_summary_data'), {'start': '2026-10-05', 'end': '2026-10-11', 'unit': 'day'})
+        series = response.json()['series']
+        self.assertEqual([row['total_hours'] for row in series], [2.5])
+        self.assertEqual(series[0]['hours'][0], 2.5)
+
+    def test_out_of_range_dates_are_rejected(self):
+        for params in (
+            {'start': '0001-01-01', 'end': '0001-01-05'},
+            {'start': '9999-12-01', 'end': '9999-12-31'},
+            {'end': '0001-01-10'},
+            {'start': '2026-02-30'},
+            {'start': '2026-10-11', 'end': '2026-10-05'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('todo:time_summary_data'), params)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['status'], 'error')
+
+    def test_etag_follows_resolved_range(self):
+        url = reverse('todo:time_summary_data')
+        today = timezone.localdate()
+        default_etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, {'end': today.isoformat()})['ETag'], default_etag)
+        # 日付が変わると既定の期間が変わるので、前日の ETag では 304 にならない
+        yesterday_etag = self.client.get(url, {'end': (today - timedelta(days=1)).isoformat()})['ETag']
+        self.assertNotEqual(yesterday_etag, default_etag)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=default_etag).status_code, 304)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=yesterday_etag).status_code, 200)
+        self.assertNotEqual(self.client.get(url, {'unit': 'month'})['ETag'], default_etag)
+
+
+class ReorderTasksTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('order', password='p')
+        self.client.force_login(self.user)
+        self.schedule = Schedule.objects.create(
+            owner=self.user, title_override='A', start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10),
+        )
+
+    def test_reorders_own_tasks_and_ignores_malformed_ids(self):
+        first = Task.objects.create(owner=self.user, schedule=self.schedule, title='1')
+        second = Task.objects.create(owner=self.user, schedule=self.schedule, title='2')
+        other = User.objects.create_user('other', password='p')
+        foreign = Task.objects.create(owner=other, schedule=Schedule.objects.create(
+            owner=other, title_override='B', start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10),
+        ), title='x')
+        response = self.client.post(reverse('todo:reorder_tasks'), {
+            'task_pks': ['²', str(second.pk), '', '-1', str(foreign.pk), str(first.pk)],
+        })
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(Task.objects.get(pk=second.pk).position, 1)
+        self.assertEqual(Task.objects.get(pk=first.pk).position, 5)
+        self.assertEqual(Task.objects.get(pk=foreign.pk).position, foreign.position)
+
+
+class IcsAsgiStreamTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('asgi', password='p')
+        Schedule.objects.create(owner=self.user, title_override='会議', start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10))
+
+    async def test_export_streams_with_an_async_iterator(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('todo:schedule_ics_export'))
+        self.assertTrue(response.is_async)
+        body = ''.join([chunk.decode() async for chunk in response.streaming_content])
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('SUMMARY:会議\r\n', body)
+        self.assertTrue(body.endswith('END:VCALENDAR\r\n'))
+
+    def test_wsgi_export_keeps_the_sync_iterator(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('todo:schedule_ics_export'))
+        self.assertFalse(response.is_async)
+        self.assertIn('SUMMARY:会議\r\n', b''.join(response.streaming_content).decode())
+
+
+class IcsExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('exporter', password='p')
+        self.client.force_login(self.user)
+        self.category = ActionCategory.objects.create(owner=self.user, name='読書', color='#123456')
+        self.item = ActionItem.objects.create(owner=self.user, category=self.category, title='本')
+
+    def export(self, **headers):
+        return self.client.get(reverse('todo:schedule_ics_export'), **headers)
+
+    def test_export_lines(self):
+        Schedule.objects.create(
+            owner=self.user, action_category=self.category, action_item=self.item, page_count=12,
+            start_time=aware(2026, 10, 5, 20), end_time=aware(2026, 10, 5, 21),
+        )
+        master = Schedule.objects.create(owner=self.user, title_override='朝, 散歩', start_time=aware(2026, 10, 5, 7), end_time=aware(2026, 10, 5, 8))
+        rule = ScheduleRecurrence.objects.create(schedule=master, owner=self.user, frequency=ScheduleRecurrence.Frequency.DAILY)
+        add_exception_date(rule, date(2026, 10, 6))
+        prepare_daily_schedules(date(2026, 10, 5), User.objects.filter(pk=self.user.pk))
+
+        response = self.export()
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        body = b''.join(response.streaming_content).decode()
+        self.assertEqual(body.count('BEGIN:VEVENT'), 2)
+        self.assertIn('DTSTART:20261005T110000Z\r\n', body)
+        self.assertIn('SUMMARY:読書: 本 (12p)\r\n', body)
+        self.assertIn('CATEGORIES:読書\r\n', body)
+        self.assertIn('SUMMARY:朝\\, 散歩\r\n', body)
+        self.assertIn('RRULE:FREQ=DAILY\r\n', body)
+        self.assertIn('EXDATE:20261005T220000Z\r\n', body)
+        self.assertNotIn(TODAY_TASK_TITLE, body)
+
+    def test_etag_changes_with_schedules(self):
+        etag = self.export()['ETag']
+        self.assertEqual(self.export(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Schedule.objects.create(owner=self.user, title_override='追加', start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10))
+        response = self.export(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_feed_uses_the_token_instead_of_login(self):
+        Schedule.objects.create(owner=self.user, title_override='会議', start_time=aware(2026, 10, 5, 9), end_time=aware(2026, 10, 5, 10))
+        self.client.logout()
+        response = self.client.get(reverse('todo:schedule_ics_feed', kwargs={'token': make_feed_token(self.user)}))
+        self.assertIn('SUMMARY:会議\r\n', b''.join(response.streaming_content).decode())
+        response = self.client.get(reverse('todo:schedule_ics_feed', kwargs={'token': 'forged'}))
+        self.assertEqual(response.status_code, 404)
+
+
+class ScheduleImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('importer', password='p')
+        self.client.force_login(self.user)
+
+    def test_csv_rows_with_errors_are_reported_and_skipped(self):
+        csv_file = SimpleUploadedFile('schedules.csv', (
+            '﻿start,end,category,item,title,page_count\n'
+            '2026-10-05 09:00,2026-10-05 10:00,読書,本,,12\n'
+            '2026-10-05 11:00,2026-10-05 10:00,読書,,,\n'
+            '2026-02-30 09:00,2026-02-30 10:00,,,会議,\n'
+            '0001-01-01 00:00,0001-01-01 01:00,,,古い,\n'
+            '2026/10/06,2026/10/07,,本,,\n'
+            '2026-10-06 09:00,2026-10-06 10:00,,,,\n'
+            '2026-10-06 09:00,2026-10-06 10:00,運動,,,-3\n'
+            '2026-10-07,2026-10-08,,,休み,\n'
+        ).encode())
+        result = import_schedules(self.user, csv_file, 'csv')
+        self.assertEqual(result.created, 2)
+        self.assertEqual([line for line, _ in result.errors], [3, 4, 5, 6, 7, 8])
+        self.assertEqual((result.created_categories, result.created_items), (1, 1))
+        schedule = Schedule.objects.get(action_item__title='本')
+        self.assertEqual((schedule.action_category.name, schedule.page_count), ('読書', 12))
+        self.assertEqual(Schedule.objects.get(title_override='休み').start_time, aware(2026, 10, 7))
+
+    def test_ics_round_trip(self):
+        category = ActionCategory.objects.create(owner=self.user, name='読書')
+        item = ActionItem.objects.create(owner=self.user, category=category, title='本')
+        Schedule.objects.create(
+            owner=self.user, action_category=category, action_item=item, page_count=12,
+            start_time=aware(2026, 10, 5, 20), end_time=aware(2026, 10, 5, 21),
+        )
+        Schedule.objects.create(owner=self.user, title_override='会議; 定例', start_time=aware(2026, 10, 6, 9), end_time=aware(2026, 10, 6, 10))
+        exported = b''.join(self.client.get(reverse('todo:schedule_ics_export')).streaming_content)
+
+        other = User.objects.create_user('other', password='p')
+        result = import_schedules(other, SimpleUploadedFile('schedules.ics', exported), 'ics')
+        self.assertEqual((result.created, result.errors), (2, []))
+        rows = Schedule.objects.filter(owner=other).order_by('start_time').values_list(
+            'start_time', 'end_time', 'title_override', 'action_category__name', 'action_item__title', 'page_count',
+        )
+        self.assertEqual(list(rows), [
+            (aware(2026, 10, 5, 20), aware(2026, 10, 5, 21), '', '読書', '本', 12),
+            (aware(2026, 10, 6, 9), aware(2026, 10, 6, 10), '会議; 定例', None, None, None),
+        ])
+
+    def test_ics_out_of_range_dates_are_row_errors(self):
+        ics_file = SimpleUploadedFile('schedules.ics', (
+            'BEGIN:VCALENDAR\r\n'
+            'BEGIN:VEVENT\r\nDTSTART;VALUE=DATE:99991231\r\nSUMMARY:終わり\r\nEND:VEVENT\r\n'
+            'BEGIN:VEVENT\r\nDTSTART:20261005T000000Z\r\nSUMMARY:会議\r\nEND:VEVENT\r\n'
+            'END:VCALENDAR\r\n'
+        ).encode())
+        result = import_schedules(self.user, ics_file, 'ics')
+        self.assertEqual(result.created, 1)
+        self.assertEqual([line for line, _ in result.errors], [2])
+        self.assertEqual(Schedule.objects.get(owner=self.user).end_time, aware(2026, 10, 5, 10))
+
+    def test_view_shows_file_level_errors(self):
+        response = self.client.post(reverse('todo:schedule_import'), {
+            'file': SimpleUploadedFile('schedules.csv', 'when,what\n2026-10-05,x\n'.encode()),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('file', response.context['form'].errors)
+        self.assertFalse(Schedule.objects.filter(owner=self.user).exists())
+
+
+class FreeSlotTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('planner', password='p')
+        self.client.force_login(self.user)
+        self.day = timezone.localdate() + timedelta(days=1)
+
+    def at(self, hour, minute=0, days=0):
+        return timezone.make_aware(datetime.combine(self.day + timedelta(days=days), time(hour, minute)))
+
+    def busy(self, start, end):
+        Schedule.objects.create(owner=self.user, title_override='予定', start_time=start, end_time=end)
+
+    def test_busy_times_are_merged_and_short_gaps_dropped(self):
+        self.busy(self.at(10), self.at(11))
+        self.busy(self.at(10, 30), self.at(12))
+        self.busy(self.at(12, 30), self.at(17))
+        slots = find_free_slots(self.user.pk, self.day, self.day + timedelta(days=1), time(9), time(18), timedelta(minutes=60))
+        self.assertEqual(slots, [
+            (self.at(9), self.at(10)), (self.at(17), self.at(18)), (self.at(9, days=1), self.at(18, days=1)),
+        ])
+
+    def test_place_fills_slots_in_due_date_order(self):
+        category = ActionCategory.objects.create(owner=self.user, name='仕事')
+        late = ActionItem.objects.create(owner=self.user, category=category, title='後', due_date=self.day + timedelta(days=5))
+        undated = ActionItem.objects.create(owner=self.user, category=category, title='期日なし')
+        overdue = ActionItem.objects.create(owner=self.user, category=category, title='急ぎ', due_date=self.day - timedelta(days=2))
+        ActionItem.objects.create(owner=self.user, category=category, title='済', completed=True)
+        self.busy(self.at(9), self.at(16))
+        response = self.client.post(reverse('todo:free_slots_place'), json.dumps({
+            'start': self.day.isoformat(), 'end': self.day.isoformat(), 'duration': 60,
+        }), content_type='application/json')
+        data = response.json()
+        self.assertEqual([row['item_id'] for row in data['placed']], [overdue.pk, late.pk])
+        self.assertEqual([row['overdue'] for row in data['placed']], [True, False])
+        self.assertEqual(data['unplaced'], [undated.pk])
+        schedule = Schedule.objects.get(action_item=late)
+        self.assertEqual((schedule.start_time, schedule.end_time, schedule.action_category), (self.at(17), self.at(18), category))
+        self.assertEqual(set(ActionItem.objects.filter(is_scheduled=True).values_list('pk', flat=True)), {overdue.pk, late.pk})
+
+    def test_invalid_params_are_rejected(self):
+        for params in (
+            {'start': '2026-02-30'},
+            {'start': '9999-12-31'},
+            {'start': '0001-01-01'},
+            {'start': '2026-10-10', 'end': '2026-10-09'},
+            {'day_start': '18:00', 'day_end': '09:00'},
+            {'duration': '0'},
+            {'duration': '99999999999999'},
+            {'duration': '²'},
+        ):
+            with self.subTest(params=params):
+                response = self.client.get(reverse('todo:free_slots'), params)
+                self.assertEqual(response.status_code, 400)
+
+
+class ScheduleCopyTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('copier', password='p')
+        self.client.force_login(self.user)
+        self.category = ActionCategory.objects.create(owner=self.user, name='読書', track_pages=True)
+        self.item = ActionItem.objects.create(owner=self.user, category=self.category, title='本')
+        self.source = Schedule.objects.create(
+            owner=self.user, action_category=self.category, action_item=self.item, start_page=1, end_page=20, page_count=20,
+            start_time=aware(2026, 10, 5, 23), end_time=aware(2026, 10, 6, 1),
+        )
+        Task.objects.create(owner=self.user, schedule=self.source, title='要約', completed=True)
+        prepare_daily_schedules(date(2026, 10, 5), User.objects.filter(pk=self.user.pk))
+
+    def copies(self):
+        return Schedule.objects.filter(owner=self.user, start_time__gte=aware(2026, 10, 12)).order_by('start_time')
+
+    def test_copies_keep_local_times_and_tasks_but_not_pages(self):
+        result = copy_schedules(self.user, date(2026, 10, 5), date(2026, 10, 11), date(2026, 10, 12), date(2026, 10, 25))
+        self.assertEqual((result.created, result.tasks, result.skipped), (2, 2, 0))
+        self.assertEqual(
+            list(self.copies().values_list('start_time', 'end_time', 'action_item', 'page_count', 'tasks_total', 'tasks_completed')),
+            [
+                (aware(2026, 10, 12, 23), aware(2026, 10, 13, 1), self.item.pk, None, 1, 0),
+                (aware(2026, 10, 19, 23), aware(2026, 10, 20, 1), self.item.pk, None, 1, 0),
+            ],
+        )
+        self.assertFalse(Task.objects.filter(schedule__in=self.copies(), completed=True).exists())
+        self.assertFalse(self.copies().filter(title_override=TODAY_TASK_TITLE).exists())
+
+    def test_skip_leaves_out_overlapping_copies(self):
+        Schedule.objects.create(owner=self.user, title_override='先約', start_time=aware(2026, 10, 13), end_time=aware(2026, 10, 13, 0, 30))
+        result = copy_schedules(self.user, date(2026, 10, 5), date(2026, 10, 11), date(2026, 10, 12), date(2026, 10, 25), overlap='skip')
+        self.assertEqual((result.created, result.skipped), (1, 1))
+        self.assertEqual(self.copies().filter(action_item=self.item).get().start_time, aware(2026, 10, 19, 23))
 
-# Create your tests here.
+    def test_form_rejects_bad_ranges(self):
+        url = reverse('todo:schedule_copy')
+        for data, field in (
+            ({'source_end': '2026-10-04'}, 'source_end'),
+            ({'source_end': '2026-11-30'}, 'source_end'),
+            ({'target_start': '2026-10-08'}, 'target_start'),
+            ({'target_end': '2027-12-31'}, 'target_end'),
+            ({'target_end': '9999-12-31'}, 'target_end'),
+            ({'source_start': '0001-01-01'}, 'source_start'),
+        ):
+            with self.subTest(data=data):
+                response = self.client.post(url, {
+                    'source_start': '2026-10-05', 'source_end': '2026-10-11',
+                    'target_start': '2026-10-12', 'target_end': '2026-10-25', 'overlap': 'allow', **data,
+                })
+                self.assertIn(field, response.context['form'].errors)
+        self.assertFalse(self.copies().exists())
+        response = self.client.post(url, {
+            'source_start': '2026-10-05', 'source_end': '2026-10-11',
+            'target_start': '2026-10-12', 'target_end': '2026-10-25', 'overlap': 'allow',
+        })
+        self.assertEqual(response.context['result'].created, 2)
@@ -0,0 +1,85 @@
+from datetime import datetime, timedelta
+
+from django.db.models import Case, DurationField, ExpressionWrapper, F, Sum, Value, When
+from django.db.models.functions import Greatest, Least
+from django.utils import timezone
+
+from .models import Schedule, TODAY_TASK_TITLE
+
+
+TIME_UNITS = ("day", "week", "month")
+# 1区間 = SELECT の1列なので、列数（区間数）と期間に上限を設ける
+MAX_BUCKETS = 400
+MAX_RANGE_DAYS = 366 * 5
+
+
+def bucket_starts(start_date, end_date, unit):
+    """start_date〜end_date を含む区間（日/週(月曜始まり)/月）の開始日のリスト"""
+    if unit == "week":
+        current = start_date - timedelta(days=start_date.weekday())
+    elif unit == "month":
+        current = start_date.replace(day=1)
+    else:
+        current = start_date
+    starts = []
+    while current <= end_date:
+        starts.append(current)
+        current = _next_bucket(current, unit)
+    return starts
+
+
+def _next_bucket(current, unit):
+    if unit == "week":
+        return current + timedelta(days=7)
+    if unit == "month":
+        return (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return current + timedelta(days=1)
+
+
+def _local_midnight(day):
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def time_by_category(user_id, start_date, end_date, unit):
+    """カテゴリごと・区間ごとの予定の合計時間を1回のクエリで集計する
+
+    区間ごとに「予定と区間の重なり（min(終了) - max(開始)）」の合計を1列ずつ SELECT し、
+    カテゴリで GROUP BY する。日をまたぐ予定は現地の0時（区間の境目）で分けて数える。
+    戻り値: (区間の開始日のリスト, [{'category_id', 'name', 'color', 'durations': [timedelta, ...]}])
+    """
+    starts = bucket_starts(start_date, end_date, unit)
+    if len(starts) > MAX_BUCKETS:
+        raise ValueError(f"too many buckets (max {MAX_BUCKETS}); use a larger unit")
+    bounds = [_local_midnight(day) for day in starts] + [_local_midnight(_next_bucket(starts[-1], unit))]
+
+    duration = DurationField()
+    annotations = {}
+    for index, (bucket_start, bucket_end) in enumerate(zip(bounds, bounds[1:])):
+        overlap = ExpressionWrapper(
+            Least(F("end_time"), Value(bucket_end)) - Greatest(F("start_time"), Value(bucket_start)),
+            output_field=duration,
+        )
+        annotations[f"bucket_{index}"] = Sum(Case(
+            When(start_time__lt=bucket_end, end_time__gt=bucket_start, then=overlap),
+            default=Value(timedelta(0)),
+            output_field=duration,
+        ))
+
+    rows = (
+        Schedule.objects
+        .filter(owner_id=user_id, start_time__lt=bounds[-1], end_time__gt=bounds[0])
+        .exclude(title_override=TODAY_TASK_TITLE)
+        .values("action_category_id", "action_category__name", "action_category__color")
+        .annotate(**annotations)
+        .order_by("action_category__name")
+    )
+    series = [
+        {
+            "category_id": row["action_category_id"],
+            "name": row["action_category__name"] or "未分類",
+            "color": row["action_category__color"] or "#6c757d",
+            "durations": [row[f"bucket_{index}"] or timedelta(0) for index in range(len(starts))],
+        }
+        for row in rows
+    ]
+    return starts, series
@@ -1,4 +1,4 @@
-from django.urls import path
+from django.urls import path, re_path
 from . import views
 
 app_name = 'todo'
@@ -6,6 +6,11 @@ app_name = 'todo'
 urlpatterns = [
     path("", views.calendar_view, name="calendar"),
     path("api/events/", views.calendar_events, name="calendar_events"),
+    path("api/events/stream/", views.calendar_stream, name="calendar_stream"),
+    path("export/schedules.ics", views.schedule_ics_export, name="schedule_ics_export"),
+    path("feed/<str:token>/schedules.ics", views.schedule_ics_feed, name="schedule_ics_feed"),
+    path("import/", views.schedule_import, name="schedule_import"),
+    path("copy/", views.schedule_copy, name="schedule_copy"),
     path("pomodoro/start/", views.pomodoro_start, name="pomodoro_start"),
     path("today/setup/", views.today_tasks_setup, name="today_tasks_setup"),
     path("daily-routines/create/", views.daily_routine_create, name="daily_routine_create"),
@@ -17,6 +22,7 @@ urlpatterns = [
 
     # スケジュール作成用
     path("create-form/", views.schedule_create_form, name="create_form"),
+    path("api/form-options/", views.schedule_form_options, name="schedule_form_options"),
     path("create/", views.schedule_create, name="create"),
     path("edit-form/<int:pk>/", views.schedule_edit_form, name="edit_form"),
     path("update/<int:pk>/", views.schedule_update, name="update"),
@@ -30,7 +36,15 @@ urlpatterns = [
     path("task/update/<int:pk>/", views.task_update, name="task_update"),
     path("task/delete/<int:pk>/", views.task_delete, name="task_delete"),
     path("schedule/<int:pk>/", views.schedule_detail, name="schedule_detail"),
+    re_path(r"^recurrences/(?P<pk>\d+)/(?P<occurrence_date>\d{8})/$", views.schedule_occurrence, name="schedule_occurrence"),
+    re_path(r"^recurrences/(?P<pk>\d+)/(?P<occurrence_date>\d{8})/edit-form/$", views.schedule_occurrence_edit_form, name="schedule_occurrence_edit_form"),
+    re_path(r"^recurrences/(?P<pk>\d+)/(?P<occurrence_date>\d{8})/update/$", views.schedule_occurrence_update, name="schedule_occurrence_update"),
+    re_path(r"^recurrences/(?P<pk>\d+)/(?P<occurrence_date>\d{8})/delete/$", views.schedule_occurrence_delete, name="schedule_occurrence_delete"),
     path("api/update_time/", views.schedule_update_time, name="update_schedule_time"),
+    path("api/update_times/", views.schedule_batch_update_time, name="batch_update_schedule_time"),
+    path("conflicts/", views.schedule_conflicts, name="schedule_conflicts"),
+    path("api/free-slots/", views.free_slots, name="free_slots"),
+    path("api/free-slots/place/", views.free_slots_place, name="free_slots_place"),
     path("tasks/reorder/", views.reorder_tasks, name="reorder_tasks"),
 
     path("action-items/<int:pk>/", views.action_item_detail, name="action_item_detail"),
@@ -53,6 +67,9 @@ urlpatterns = [
     #統計用
     path("summary/", views.weekly_summary, name="weekly_summary"),
     path("summary/monthly/", views.monthly_summary, name="monthly_summary"),
+    path("summary/yearly/", views.yearly_summary, name="yearly_summary"),
+    path("summary/time/", views.time_summary, name="time_summary"),
+    path("api/summary/time/", views.time_summary_data, name="time_summary_data"),
 
     # 公開用API
     path("api/public-events/", views.public_calendar_events, name="public_calendar_events"),
@@ -0,0 +1,71 @@
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.cache import cache
+
+
+CALENDAR_VERSION_KEY = "todo:calendar-version:{user_id}"
+FORM_OPTIONS_VERSION_KEY = "todo:form-options-version:{user_id}"
+READING_PROGRESS_VERSION_KEY = "todo:reading-progress-version:{item_id}"
+
+
+def _now_version():
+    # マイクロ秒単位の時刻をそのままバージョン番号として使う
+    return time.time_ns() // 1000
+
+
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # キャッシュが消えた場合は「今変更された」とみなして作り直す
+        version = _now_version()
+        cache.add(key, version, timeout=None)
+        version = cache.get(key, version)
+    return version
+
+
+def _bump_version(key):
+    previous = cache.get(key) or 0
+    version = max(_now_version(), previous + 1)
+    cache.set(key, version, timeout=None)
+    return version
+
+
+def get_calendar_version(user_id):
+    """ユーザーごとのスケジュール/タスク変更バージョンを返す"""
+    return _get_version(CALENDAR_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_calendar_version(user_id):
+    """スケジュール/タスクが書き換わったときにバージョンを進める"""
+    return _bump_version(CALENDAR_VERSION_KEY.format(user_id=user_id))
+
+
+def get_form_options_version(user_id):
+    """スケジュールフォームの選択肢（カテゴリ/アイテム）のバージョンを返す"""
+    return _get_version(FORM_OPTIONS_VERSION_KEY.format(user_id=user_id))
+
+
+def bump_form_options_version(user_id):
+    """カテゴリ/アイテムが書き換わったときにバージョンを進める"""
+    return _bump_version(FORM_OPTIONS_VERSION_KEY.format(user_id=user_id))
+
+
+def get_reading_progress_versions(item_ids):
+    """アイテムごとの読書進捗のバージョンを {item_id: version} で返す（まとめて1回で読む）"""
+    keys = {READING_PROGRESS_VERSION_KEY.format(item_id=item_id): item_id for item_id in item_ids}
+    versions = {keys[key]: version for key, version in cache.get_many(keys).items()}
+    for key, item_id in keys.items():
+        if item_id not in versions:
+            versions[item_id] = _get_version(key)
+    return versions
+
+
+def bump_reading_progress_version(item_id):
+    """アイテムのスケジュール（ページ範囲・日付）が書き換わったときにバージョンを進める"""
+    return _bump_version(READING_PROGRESS_VERSION_KEY.format(item_id=item_id))
+
+
+def calendar_version_datetime(version):
+    """バージョン番号(マイクロ秒)をLast-Modified用のdatetimeに変換する"""
+    return datetime.fromtimestamp(version / 1_000_000, tz=dt_timezone.utc)
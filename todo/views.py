@@ -1,22 +1,55 @@
 ﻿from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse, HttpResponse
-from django.urls import reverse_lazy, reverse
-from django.views.decorators.http import require_POST
-from django.db.models import Max, Q, Sum
+from django.core.handlers.asgi import ASGIRequest
+from django.http import Http404, JsonResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
+from django.db import transaction
+from django.db.models import BooleanField, Case, F, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Lower, NullIf, Trim
 from django.utils import timezone
-
-from datetime import datetime, timedelta, date
-
-from .models import Schedule, Task, ActionItem, ActionCategory, PeriodicTask, DailyRoutineTask
-from .forms import ScheduleForm, TaskForm, ActionItemForm, PrivateActionItemForm, ReadingActionItemForm, ActionCategoryForm, DailyRoutineTaskForm
-
+from django.utils.dateparse import parse_date, parse_datetime, parse_time
+
+from datetime import MAXYEAR, MINYEAR, datetime, time, timedelta, date
+
+from .models import Schedule, ScheduleRecurrence, Task, ActionItem, ActionCategory, PeriodicTask, DailyRoutineTask, DailyReadingStat, TODAY_TASK_TITLE
+from .recurrence import add_exception_date, build_occurrence, materialize_occurrence, occurrence_key, occurs_on, parse_occurrence_key, recurrences_for_range
+from .busy_blocks import (
+    PUBLIC_CALENDAR_OWNER_ID, busy_blocks_in_range, get_busy_blocks, merge_intervals,
+    recurring_busy_intervals,
+)
+from .versions import (
+    bump_reading_progress_version, calendar_version_datetime, get_calendar_version,
+    get_form_options_version,
+)
+from .reading_stats import rebuild_reading_stats
+from .reading_progress import attach_reading_progress
+from .routine_streaks import routines_with_stats
+from .time_analytics import MAX_RANGE_DAYS, TIME_UNITS, time_by_category
+from .events import CALENDAR_EVENT_FIELDS, build_calendar_event
+from .conflicts import conflicts_in_range, find_conflicts, serialize_block
+from .free_slots import find_free_slots, place_action_items
+from .live import event_stream, schedule_event_data
+from .signals import calendar_bulk_changed
+from .ical import aiter_calendar, iter_calendar, make_feed_token, read_feed_token
+from .importing import CSV_COLUMNS, detect_format, import_schedules
+from .copying import copy_schedules
+from .daily import get_or_create_today_schedule, get_today_schedule, sync_daily_routine_tasks
+from .forms import ScheduleForm, ScheduleCopyForm, ScheduleImportForm, ScheduleRecurrenceForm, TaskForm, ActionItemForm, PrivateActionItemForm, ReadingActionItemForm, ActionCategoryForm, DailyRoutineTaskForm
+
+import csv
 import json
+import logging
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 import calendar
 
 
-TODAY_TASK_TITLE = "\u4eca\u65e5\u306e\u30bf\u30b9\u30af"
+logger = logging.getLogger(__name__)
+
 
 ACTION_ITEM_SECTIONS = {'todo', 'reading', 'private'}
 SECTION_CATEGORY_NAMES = {
@@ -48,6 +81,15 @@ def _get_action_item_form_class(section):
     return ActionItemForm
 
 
+def _filter_action_item_section(action_items, section):
+    """やることリストの各セクション（todo / reading / private）に入る項目に絞る"""
+    if section == 'reading':
+        return action_items.filter(category__name='読書')
+    if section == 'private':
+        return action_items.filter(Q(category__name='その他') | Q(category__isnull=True))
+    return action_items.exclude(Q(category__name__in=['読書', 'その他']) | Q(category__isnull=True))
+
+
 def _get_action_item_section_from_item(item):
     if item.category and item.category.name == '読書':
         return 'reading'
@@ -56,20 +98,103 @@ def _get_action_item_section_from_item(item):
     return 'todo'
 
 
-def _group_reading_items_by_theme(action_items):
-    grouped = {}
-    for item in action_items:
-        theme = item.theme.strip() if item.theme else '未設定'
-        grouped.setdefault(theme, []).append(item)
-    return [
-        {'theme': theme, 'items': sorted(items, key=lambda item: item.title)}
-        for theme, items in sorted(grouped.items(), key=lambda pair: pair[0])
-    ]
+ACTION_ITEM_PAGE_SIZE = 30
+
+
+def _encode_cursor(values):
+    """キーセットページングのカーソル（最後の行の並び順の値）を文字列にする"""
+    return urlsafe_b64encode(json.dumps(values).encode()).decode()
+
 
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
 
-def _build_periodic_task_items(user):
-    today = date.today()
-    periodic_tasks = PeriodicTask.objects.filter(owner=user).order_by('id')
+
+def _is_iso_date_or_none(value):
+    if value is None:
+        return True
+    try:
+        return isinstance(value, str) and parse_date(value) is not None
+    except ValueError:
+        return False
+
+
+# カーソルの各要素の型チェック（改ざんされた値で500にしないため）
+ACTION_ITEM_CURSOR_TYPES = (lambda value: isinstance(value, bool), _is_iso_date_or_none, _is_int)
+READING_CURSOR_TYPES = (lambda value: isinstance(value, str), lambda value: isinstance(value, str), _is_int)
+
+
+def _decode_cursor(value, checks):
+    """_encode_cursor の逆変換。要素の数や型が checks と合わないなど、不正な値なら None（先頭ページ扱い）"""
+    if not value:
+        return None
+    try:
+        values = json.loads(urlsafe_b64decode(value.encode()))
+    except ValueError:
+        return None
+    if not isinstance(values, list) or len(values) != len(checks):
+        return None
+    if not all(check(item) for check, item in zip(checks, values)):
+        return None
+    return values
+
+
+def _reading_theme_key():
+    """テーマの表示名（前後の空白を除き、空なら「未設定」）をDB側で求める"""
+    return Coalesce(NullIf(Trim('theme'), Value('')), Value('未設定'))
+
+
+def _action_items_after(action_items, cursor):
+    """(completed, due_date, pk) の順で cursor より後の行に絞る（期日なしは最後）"""
+    completed, due_date, pk = cursor
+    due_date = parse_date(due_date) if due_date else None
+    if due_date is None:
+        after = Q(due_date__isnull=True, pk__gt=pk)
+    else:
+        after = Q(due_date__gt=due_date) | Q(due_date__isnull=True) | Q(due_date=due_date, pk__gt=pk)
+    condition = Q(completed=completed) & after
+    if not completed:
+        condition |= Q(completed=True)
+    return action_items.filter(condition)
+
+
+def _reading_items_after(action_items, cursor):
+    """(テーマ, タイトル, pk) の順で cursor より後の行に絞る"""
+    theme, title, pk = cursor
+    return action_items.filter(
+        Q(theme_key__gt=theme)
+        | Q(theme_key=theme, title__gt=title)
+        | Q(theme_key=theme, title=title, pk__gt=pk)
+    )
+
+
+def _parse_due_within(request):
+    """?due=N（N日以内に期限が来るものだけ表示）を読む。指定なし・不正なら None"""
+    try:
+        due_within = int(request.GET.get('due', ''))
+    except ValueError:
+        return None
+    return due_within if due_within >= 0 else None
+
+
+def _build_periodic_task_items(user, due_within=None):
+    # 期限(next_due)はDBに保存済みなので、超過判定・並べ替え・絞り込みはSQLで行う
+    today = timezone.localdate()
+    periodic_tasks = PeriodicTask.objects.filter(owner=user)
+    if due_within is not None:
+        periodic_tasks = periodic_tasks.filter(
+            Q(next_due__isnull=True) | Q(next_due__lte=today + timedelta(days=due_within))
+        )
+    periodic_tasks = (
+        periodic_tasks
+        .annotate(is_overdue=Case(
+            When(Q(next_due__isnull=True) | Q(next_due__lt=today), then=Value(True)),
+            default=Value(False),
+            output_field=BooleanField(),
+        ))
+        # 未実施 → 期限の早い順（超過しているものほど上）
+        .order_by(F('next_due').asc(nulls_first=True), Lower('title'))
+    )
     items = []
     for task in periodic_tasks:
         if task.last_done:
@@ -78,79 +203,41 @@ def _build_periodic_task_items(user):
         else:
             days_since = None
             days_display = "未実施"
-        is_overdue = (days_since is None) or (days_since > task.interval_days)
         items.append({
             'id': task.id,
             'title': task.title,
             'interval_days': task.interval_days,
             'last_done': task.last_done,
+            'next_due': task.next_due,
             'days_display': days_display,
-            'is_overdue': is_overdue,
+            'is_overdue': task.is_overdue,
             'days_since': days_since,
         })
-
-    items.sort(key=lambda item: (
-        not item['is_overdue'],
-        -(item['days_since'] or 0),
-        item['title'].lower()
-    ))
     return items
 
 
-def _get_or_create_today_schedule(user):
-    today = timezone.localdate()
-    schedule = Schedule.objects.filter(
-        owner=user,
-        title_override=TODAY_TASK_TITLE,
-        start_time__date=today
-    ).first()
-    if schedule:
-        return schedule
-
-    start_time = timezone.make_aware(datetime.combine(today, datetime.min.time()))
-    end_time = timezone.make_aware(datetime.combine(today, datetime.max.time()))
-    return Schedule.objects.create(
-        owner=user,
-        title_override=TODAY_TASK_TITLE,
-        start_time=start_time,
-        end_time=end_time,
-    )
-
-
-def _sync_daily_routine_tasks(user, schedule):
-    routines = DailyRoutineTask.objects.filter(owner=user, active=True).order_by('position', 'id')
-    existing_routine_ids = set(
-        schedule.tasks.filter(daily_routine__isnull=False).values_list('daily_routine_id', flat=True)
-    )
-    next_position = (schedule.tasks.aggregate(max_position=Max('position'))['max_position'] or 0) + 1
-
-    new_tasks = []
-    for routine in routines:
-        if routine.id in existing_routine_ids:
-            continue
-        new_tasks.append(Task(
-            title=routine.title,
-            owner=user,
-            schedule=schedule,
-            daily_routine=routine,
-            position=next_position,
-        ))
-        next_position += 1
-
-    if new_tasks:
-        Task.objects.bulk_create(new_tasks)
+def _task_progress(schedule):
+    """スケジュールのタスク数・完了数・進捗率（カウンタの列を読むだけ）"""
+    return {
+        'total_tasks': schedule.tasks_total,
+        'completed_tasks': schedule.tasks_completed,
+        'progress_percentage': schedule.progress_percentage,
+    }
 
 
 @login_required
 def calendar_view(request):
     """カレンダーページ"""
-    return render(request, "todo/calendar.html")
+    ics_feed_url = request.build_absolute_uri(
+        reverse('todo:schedule_ics_feed', kwargs={'token': make_feed_token(request.user)})
+    )
+    return render(request, "todo/calendar.html", {'ics_feed_url': ics_feed_url})
 
 
 @login_required
 def today_tasks_setup(request):
-    schedule = _get_or_create_today_schedule(request.user)
-    _sync_daily_routine_tasks(request.user, schedule)
+    # 通常は日次バッチ (prepare_daily_tasks) で作成済みなので、引くだけで済む
+    schedule = get_or_create_today_schedule(request.user)
 
     if request.method == 'POST':
         form = TaskForm(data=request.POST)
@@ -161,27 +248,28 @@ def today_tasks_setup(request):
             new_task.save()
             return redirect('todo:today_tasks_setup')
 
+    due_within = _parse_due_within(request)
     tasks = schedule.tasks.order_by('completed', 'position')
-    total_tasks = tasks.count()
-    completed_tasks = tasks.filter(completed=True).count()
-    if total_tasks > 0:
-        progress_percentage = (completed_tasks / total_tasks) * 100
-    else:
-        progress_percentage = 100
 
     context = {
         'schedule': schedule,
         'tasks': tasks,
-        'progress_percentage': progress_percentage,
-        'completed_tasks': completed_tasks,
-        'total_tasks': total_tasks,
+        **_task_progress(schedule),
         'form': TaskForm(),
         'task_form_action': reverse('todo:today_tasks_setup'),
-        'periodic_tasks': _build_periodic_task_items(request.user),
+        'periodic_tasks': _build_periodic_task_items(request.user, due_within),
+        'due_within': due_within,
     }
     return render(request, 'todo/today_setup.html', context)
 
 
+def _sync_today_routines(user):
+    """ルーティーンが変わったときだけ、作成済みの今日のタスクに反映する"""
+    schedule = get_today_schedule(user)
+    if schedule:
+        sync_daily_routine_tasks(user, schedule)
+
+
 @login_required
 @require_POST
 def daily_routine_create(request):
@@ -190,6 +278,7 @@ def daily_routine_create(request):
         routine = form.save(commit=False)
         routine.owner = request.user
         routine.save()
+        _sync_today_routines(request.user)
     return redirect(request.META.get('HTTP_REFERER', reverse('todo:today_tasks_setup')))
 
 
@@ -200,6 +289,7 @@ def daily_routine_update(request, pk):
     form = DailyRoutineTaskForm(request.POST, instance=routine)
     if form.is_valid():
         form.save()
+        _sync_today_routines(request.user)
     return redirect(request.META.get('HTTP_REFERER', reverse('todo:today_tasks_setup')))
 
 
@@ -211,58 +301,492 @@ def daily_routine_delete(request, pk):
     return redirect(request.META.get('HTTP_REFERER', reverse('todo:today_tasks_setup')))
 
 
+def _parse_calendar_datetime(value):
+    """FullCalendar の start/end パラメータを aware な datetime に変換する
+
+    形式が違う値や、2月30日のような存在しない日時、扱えない年は None（呼び出し側で未指定として扱う）。
+    """
+    if not value or not isinstance(value, str):
+        return None
+    # クエリ文字列で '+09:00' の '+' が空白に化けることがあるので戻す
+    value = value.strip()
+    if 'T' in value:
+        value = value.replace(' ', '+')
+    try:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            parsed_date = parse_date(value[:10])
+            if parsed_date is None:
+                return None
+            parsed = datetime.combine(parsed_date, datetime.min.time())
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+    except (ValueError, OverflowError):
+        return None
+    # 両端の年はUTCとの変換や前後の日の計算で範囲を超えるので扱わない
+    if not MINYEAR < parsed.year < MAXYEAR:
+        return None
+    return parsed
+
+
+def _calendar_range(request):
+    """リクエストの start/end を (開始, 終了) で返す（無ければ None）"""
+    return (
+        _parse_calendar_datetime(request.GET.get('start')),
+        _parse_calendar_datetime(request.GET.get('end')),
+    )
+
+
+def _calendar_category_ids(request):
+    return [value for value in request.GET.getlist('category') if value.isdecimal()]
+
+
+def _filter_schedules_for_calendar(queryset, range_start, range_end, category_ids):
+    """表示範囲(start/end)とカテゴリでスケジュールを絞り込む"""
+    # 範囲と重なる予定だけを返す（範囲をまたぐ予定も含める）
+    if range_end:
+        queryset = queryset.filter(start_time__lt=range_end)
+    if range_start:
+        queryset = queryset.filter(end_time__gt=range_start)
+    if category_ids:
+        queryset = queryset.filter(action_category_id__in=category_ids)
+    return queryset
+
+
+def _calendar_events_etag(request, *args, **kwargs):
+    return f'"{request.user.pk}-{get_calendar_version(request.user.pk)}"'
+
+
+def _calendar_events_last_modified(request, *args, **kwargs):
+    return calendar_version_datetime(get_calendar_version(request.user.pk))
+
+
+def _public_calendar_events_etag(request, *args, **kwargs):
+    return f'"public-{get_calendar_version(PUBLIC_CALENDAR_OWNER_ID)}"'
+
+
+def _public_calendar_events_last_modified(request, *args, **kwargs):
+    return calendar_version_datetime(get_calendar_version(PUBLIC_CALENDAR_OWNER_ID))
+
+
+def _ics_feed_user(token):
+    user_id = read_feed_token(token)
+    if user_id is None:
+        raise Http404("Invalid feed token")
+    return get_object_or_404(User, pk=user_id, is_active=True)
+
+
+def _ics_feed_etag(request, token):
+    user_id = read_feed_token(token)
+    if user_id is None:
+        return None
+    return f'"ics-{user_id}-{get_calendar_version(user_id)}"'
+
+
+def _ics_feed_last_modified(request, token):
+    user_id = read_feed_token(token)
+    if user_id is None:
+        return None
+    return calendar_version_datetime(get_calendar_version(user_id))
+
+
+def _ics_export_etag(request, *args, **kwargs):
+    return f'"ics-{request.user.pk}-{get_calendar_version(request.user.pk)}"'
+
+
+def _ics_response(user, request):
+    # 1件ずつ書き出すので、何年分あってもメモリに全件を載せない
+    # （ASGI では同期イテレータだと一度に読み込まれてしまうので非同期イテレータを渡す）
+    stream = aiter_calendar if isinstance(request, ASGIRequest) else iter_calendar
+    return StreamingHttpResponse(
+        stream(user, request.get_host()),
+        content_type='text/calendar; charset=utf-8',
+    )
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_ics_export_etag, last_modified_func=_calendar_events_last_modified)
+def schedule_ics_export(request):
+    """自分のスケジュールを .ics ファイルとしてダウンロードする"""
+    response = _ics_response(request.user, request)
+    response['Content-Disposition'] = 'attachment; filename="schedules.ics"'
+    return response
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_ics_feed_etag, last_modified_func=_ics_feed_last_modified)
+def schedule_ics_feed(request, token):
+    """カレンダーアプリから購読するための .ics フィード（URLのトークンで認証する）"""
+    return _ics_response(_ics_feed_user(token), request)
+
+
 @login_required
+async def calendar_stream(request):
+    """カレンダーの変更を Server-Sent Events で流す（ASGI で動かしているときだけ）"""
+    if not isinstance(request, ASGIRequest):
+        # WSGI では接続を張り続けられないので、204 を返してクライアントをポーリングに切り替えさせる
+        return HttpResponse(status=204)
+    user = await request.auser()
+    response = StreamingHttpResponse(event_stream(user.pk), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_calendar_events_etag, last_modified_func=_calendar_events_last_modified)
 def calendar_events(request):
     """カレンダーに表示するイベント（スケジュール）をJSON形式で返すビュー"""
-    # select_related を action_category に変更
     schedules = (
         Schedule.objects
         .filter(owner=request.user)
         .exclude(title_override=TODAY_TASK_TITLE)
-        .select_related('action_category')
     )
-    events = []
-    
-    for schedule in schedules:
-        tasks = schedule.tasks.all()
-        total_tasks = tasks.count()
-        completed_tasks = tasks.filter(completed=True).count()
-        if total_tasks > 0:
-            progress_percentage = int((completed_tasks / total_tasks) * 100)
-        else:
-            progress_percentage = 100
-
-        # タイトルと色を新しいカテゴリから取得
-        # データ移行済みなので action_category は必ずあるはずですが、念のため安全策をとります
-        title_text = "未分類"
-        bg_color = "#6c757d"
-        
-        if schedule.action_category:
-            title_text = schedule.action_category.name
-            bg_color = schedule.action_category.color
-        
-        # ★追加: 具体的なアイテムが設定されていれば、タイトルに追加する
-        if schedule.action_item:
-            title_text += f": {schedule.action_item.title}"
-
-        # ページ数があればそれも表示しちゃう？（お好みで）
-        if schedule.page_count:
-            title_text += f" ({schedule.page_count}p)"
-
-        if getattr(schedule, 'title_override', None):
-            title_text = schedule.title_override
-
-        events.append({
-            'id': schedule.pk,
-            'title': title_text, # 進捗率(%)を表示したい場合はここに f"{title_text} ({progress_percentage}%)"
-            'start': schedule.start_time.isoformat(),
-            'end': schedule.end_time.isoformat(),
-            'url': reverse_lazy('todo:schedule_detail', kwargs={'pk': schedule.pk}),
-            'backgroundColor': bg_color,
-            'borderColor': bg_color,
-        })
+    range_start, range_end = _calendar_range(request)
+    category_ids = _calendar_category_ids(request)
+    schedules = _filter_schedules_for_calendar(schedules, range_start, range_end, category_ids)
+    # タスク数（カウンタ列）・カテゴリ・アイテム名を1回のクエリでまとめて取得する
+    rows = schedules.values(*CALENDAR_EVENT_FIELDS).order_by('start_time')
+
+    # URLは1回だけ逆引きして、pkを差し替えて使う
+    url_template = reverse('todo:schedule_detail', kwargs={'pk': 0})
+    events = [build_calendar_event(row, url_template) for row in rows]
+
+    # 繰り返し予定は表示範囲の分だけその場で展開する
+    if range_start and range_end:
+        rules = ScheduleRecurrence.objects.filter(owner=request.user)
+        if category_ids:
+            rules = rules.filter(schedule__action_category_id__in=category_ids)
+        for rule, occurrence_date, start, end in recurrences_for_range(rules, range_start, range_end):
+            events.append(_build_occurrence_event(rule, occurrence_date, start, end))
     return JsonResponse(events, safe=False)
 
+
+def _build_occurrence_event(rule, occurrence_date, start, end):
+    """まだ実体のない繰り返しの回をイベント辞書にする"""
+    master = rule.schedule
+    row = {
+        'pk': occurrence_key(rule.pk, occurrence_date),
+        'start_time': start,
+        'end_time': end,
+        'page_count': None,
+        'title_override': master.title_override,
+        'action_category__name': master.action_category.name if master.action_category else None,
+        'action_category__color': master.action_category.color if master.action_category else None,
+        'action_item__title': master.action_item.title if master.action_item else None,
+        'tasks_total': 0,
+        'tasks_completed': 0,
+    }
+    event = build_calendar_event(row, '')
+    event['url'] = reverse('todo:schedule_occurrence', kwargs={
+        'pk': rule.pk,
+        'occurrence_date': occurrence_date.strftime('%Y%m%d'),
+    })
+    event['extendedProps']['recurring'] = True
+    return event
+
+
+def _block_url(block_id):
+    """予定の詳細ページ（繰り返しの仮想の回はその回のページ）"""
+    occurrence = parse_occurrence_key(block_id)
+    if occurrence is None:
+        return reverse('todo:schedule_detail', kwargs={'pk': block_id})
+    rule_id, occurrence_date = occurrence
+    return reverse('todo:schedule_occurrence', kwargs={
+        'pk': rule_id,
+        'occurrence_date': occurrence_date.strftime('%Y%m%d'),
+    })
+
+
+@login_required
+def schedule_conflicts(request):
+    """1週間（月〜日）の中で時間が重なっている予定の一覧"""
+    today = timezone.localdate()
+    try:
+        target_date = parse_date(request.GET.get('date') or '') or today
+    except ValueError:
+        # 2月30日のような存在しない日付
+        target_date = today
+    if not _is_summary_year(target_date.year):
+        # 前後の週の計算で date の範囲を超えないように、サマリと同じく両端の年は扱わない
+        target_date = today
+    start_of_week = target_date - timedelta(days=target_date.weekday())
+    range_start = timezone.make_aware(datetime.combine(start_of_week, datetime.min.time()))
+    range_end = timezone.make_aware(datetime.combine(start_of_week + timedelta(days=7), datetime.min.time()))
+
+    pairs = conflicts_in_range(request.user.pk, range_start, range_end)
+    for first, second in pairs:
+        for block in (first, second):
+            block.setdefault('url', _block_url(block['id']))
+    conflicts = [
+        {
+            'first': first,
+            'second': second,
+            'overlap_start': max(first['start'], second['start']),
+            'overlap_end': min(first['end'], second['end']),
+        }
+        for first, second in pairs
+    ]
+    context = {
+        'conflicts': conflicts,
+        'start_of_week': start_of_week,
+        'end_of_week': start_of_week + timedelta(days=6),
+        'prev_week_start': start_of_week - timedelta(days=7),
+        'next_week_start': start_of_week + timedelta(days=7),
+    }
+    return render(request, 'todo/schedule_conflicts.html', context)
+
+
+FREE_SLOT_MAX_DAYS = 62
+FREE_SLOT_MAX_DURATION = 24 * 60  # 分。1日の作業時間帯より長い空きは無い
+
+
+def _parse_free_slot_params(params):
+    """空き時間検索の (開始日, 終了日, 作業開始, 作業終了, 所要時間) を読む。不正なら ValueError
+
+    start/end は日付（省略時は今日から1週間）、day_start/day_end は "HH:MM"、duration は分。
+    """
+    def read(name, parser, default):
+        value = params.get(name)
+        if value in (None, ''):
+            return default
+        parsed = parser(str(value))
+        if parsed is None:
+            raise ValueError(f'invalid {name}')
+        return parsed
+
+    start_date = read('start', parse_date, timezone.localdate())
+    if not _is_summary_year(start_date.year):
+        raise ValueError(f'start must be between {MINYEAR + 1} and {MAXYEAR - 1}')
+    end_date = read('end', parse_date, None) or start_date + timedelta(days=6)
+    day_start = read('day_start', parse_time, time(9))
+    day_end = read('day_end', parse_time, time(18))
+    duration = read('duration', int, 60)
+    if end_date < start_date or (end_date - start_date).days >= FREE_SLOT_MAX_DAYS:
+        raise ValueError(f'end must be within {FREE_SLOT_MAX_DAYS} days after start')
+    if day_end <= day_start:
+        raise ValueError('day_end must be after day_start')
+    if not 0 < duration <= FREE_SLOT_MAX_DURATION:
+        raise ValueError(f'duration must be between 1 and {FREE_SLOT_MAX_DURATION} minutes')
+    return start_date, end_date, day_start, day_end, timedelta(minutes=duration)
+
+
+def _serialize_slot(start, end):
+    return {'start': timezone.localtime(start).isoformat(), 'end': timezone.localtime(end).isoformat()}
+
+
+@login_required
+def free_slots(request):
+    """作業時間帯の中の空き時間を返す API
+
+    例: ?start=2026-10-05&end=2026-10-11&day_start=09:00&day_end=18:00&duration=60
+    """
+    try:
+        params = _parse_free_slot_params(request.GET)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    slots = find_free_slots(request.user.pk, *params)
+    return JsonResponse({'status': 'success', 'slots': [_serialize_slot(start, end) for start, end in slots]})
+
+
+@login_required
+@require_POST
+def free_slots_place(request):
+    """未スケジュールのやることを期日の早い順に空き時間へ入れ、スケジュールをまとめて作る
+
+    リクエスト: free_slots と同じパラメータ（JSON）と、対象を絞るときは "item_ids": [1, 2, ...]
+    """
+    try:
+        data = json.loads(request.body.decode('utf-8') or '{}')
+        if not isinstance(data, dict):
+            raise ValueError('request body must be an object')
+        params = _parse_free_slot_params(data)
+        item_ids = data.get('item_ids')
+        if item_ids is not None and not (isinstance(item_ids, list) and all(isinstance(pk, int) for pk in item_ids)):
+            raise ValueError('item_ids must be a list of integers')
+    except (ValueError, UnicodeDecodeError) as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+    items = (
+        ActionItem.objects
+        .filter(owner=request.user, is_scheduled=False, completed=False)
+        .order_by(F('due_date').asc(nulls_last=True), 'pk')
+    )
+    if item_ids is not None:
+        items = items.filter(pk__in=item_ids)
+    items = list(items)
+
+    duration = params[-1]
+    placements = place_action_items(request.user, items, find_free_slots(request.user.pk, *params), duration)
+    placed_ids = {item.pk for item, _ in placements}
+    return JsonResponse({
+        'status': 'success',
+        'placed': [
+            {
+                'item_id': item.pk,
+                'schedule_id': schedule.pk,
+                **_serialize_slot(schedule.start_time, schedule.end_time),
+                # 期日までに空きが無く、期日を過ぎた日に入った
+                'overdue': bool(item.due_date and timezone.localtime(schedule.start_time).date() > item.due_date),
+            }
+            for item, schedule in placements
+        ],
+        'unplaced': [item.pk for item in items if item.pk not in placed_ids],
+    })
+
+
+def _get_occurrence_rule(user, rule_id, occurrence_date):
+    """繰り返しの回のルールを取得する。その日に回が無ければ 404"""
+    rule = get_object_or_404(ScheduleRecurrence.objects.select_related('schedule'), pk=rule_id, owner=user)
+    if not occurs_on(rule, occurrence_date):
+        raise Http404("No such occurrence")
+    return rule
+
+
+def _get_schedule_for_update(user, schedule_id):
+    """IDからスケジュールを取得する。繰り返しの回のIDなら実体化してから返す"""
+    occurrence = parse_occurrence_key(schedule_id)
+    if occurrence is None:
+        if not str(schedule_id).isdecimal():
+            raise Http404("Invalid schedule id")
+        return get_object_or_404(Schedule, pk=schedule_id, owner=user)
+    return materialize_occurrence(_get_occurrence_rule(user, *occurrence), occurrence[1])
+
+
+def _parse_occurrence_url(request, pk, occurrence_date):
+    """URLの (ルールID, YYYYMMDD) から (ルール, 日付, 実体化済みの回 or None) を返す"""
+    occurrence = parse_occurrence_key(f"r{pk}-{occurrence_date}")
+    if occurrence is None:
+        raise Http404("Invalid occurrence date")
+    rule = _get_occurrence_rule(request.user, *occurrence)
+    existing = Schedule.objects.filter(recurrence_source=rule, occurrence_date=occurrence[1]).first()
+    return rule, occurrence[1], existing
+
+
+@login_required
+def schedule_occurrence(request, pk, occurrence_date):
+    """繰り返しの回の詳細ページ
+
+    開いただけでは実体化しない（保存前の Schedule で表示する）。タスクを追加したときに実体化する。
+    """
+    rule, day, existing = _parse_occurrence_url(request, pk, occurrence_date)
+    if existing:
+        return redirect('todo:schedule_detail', pk=existing.pk)
+    form = TaskForm(data=request.POST) if request.method == 'POST' else TaskForm()
+    if request.method == 'POST' and form.is_valid():
+        with transaction.atomic():
+            schedule = materialize_occurrence(rule, day)
+            new_task = form.save(commit=False)
+            new_task.owner = request.user
+            new_task.schedule = schedule
+            new_task.save()
+        return redirect('todo:schedule_detail', pk=schedule.pk)
+    return _render_schedule_detail(request, build_occurrence(rule, day), form, request.path)
+
+
+@login_required
+def schedule_occurrence_edit_form(request, pk, occurrence_date):
+    """繰り返しの回の編集フォーム（保存するまで実体化しない）"""
+    rule, day, existing = _parse_occurrence_url(request, pk, occurrence_date)
+    if existing:
+        return schedule_edit_form(request, existing.pk)
+    schedule = build_occurrence(rule, day)
+    form = ScheduleForm(instance=schedule, user=request.user)
+    _limit_action_item_choices(form)
+    context = {
+        'form': form,
+        'schedule': schedule,
+        'recurrence_form': None,
+        'form_options_version': get_form_options_version(request.user.pk),
+    }
+    return render(request, 'todo/partials/schedule_edit_form.html', context)
+
+
+@login_required
+@require_POST
+def schedule_occurrence_update(request, pk, occurrence_date):
+    """繰り返しの回を編集する。入力が正しいときだけ実体化して保存する"""
+    rule, day, existing = _parse_occurrence_url(request, pk, occurrence_date)
+    if existing:
+        return schedule_update(request, existing.pk)
+    form = ScheduleForm(request.POST, instance=build_occurrence(rule, day), user=request.user)
+    if not form.is_valid():
+        context = {
+            'form': form,
+            'schedule': form.instance,
+            'recurrence_form': None,
+            'form_options_version': get_form_options_version(request.user.pk),
+        }
+        return render(request, 'todo/partials/schedule_edit_form.html', context)
+    with transaction.atomic():
+        schedule = materialize_occurrence(rule, day)
+        ScheduleForm(request.POST, instance=schedule, user=request.user).save()
+    return _schedule_saved_response(request, schedule, summary=True)
+
+
+@login_required
+@require_POST
+def schedule_occurrence_delete(request, pk, occurrence_date):
+    """繰り返しの回を削除する（除外日に追加する）"""
+    rule, day, existing = _parse_occurrence_url(request, pk, occurrence_date)
+    if existing:
+        return schedule_delete(request, existing.pk)
+    add_exception_date(rule, day)
+    response = HttpResponse(status=204)
+    response['HX-Redirect'] = reverse('todo:calendar')
+    return response
+
+
+def _build_schedule_form_options(user):
+    """カテゴリごとのページ記録フラグとアイテム一覧"""
+    track_pages_map = dict(
+        ActionCategory.objects.filter(owner=user).values_list('id', 'track_pages')
+    )
+    items_by_category = {}
+    action_items = (
+        ActionItem.objects
+        .filter(owner=user, category__isnull=False)
+        .order_by('id')
+        .values_list('id', 'title', 'category_id')
+    )
+    for item_id, title, category_id in action_items:
+        items_by_category.setdefault(category_id, []).append({'id': item_id, 'title': title})
+    return {'track_pages_map': track_pages_map, 'items_by_category': items_by_category}
+
+
+def _schedule_form_options_etag(request, *args, **kwargs):
+    return f'"{request.user.pk}-{get_form_options_version(request.user.pk)}"'
+
+
+@login_required
+@condition(etag_func=_schedule_form_options_etag)
+def schedule_form_options(request):
+    """スケジュールフォームの選択肢をJSONで返す（?v=バージョン付きならブラウザにキャッシュさせる）"""
+    version = get_form_options_version(request.user.pk)
+    cache_key = f"todo:form-options:{request.user.pk}:{version}"
+    options = cache.get(cache_key)
+    if options is None:
+        options = _build_schedule_form_options(request.user)
+        cache.set(cache_key, options, timeout=60 * 60 * 24)
+
+    response = JsonResponse(options)
+    if request.GET.get('v') == str(version):
+        # バージョンが変わればURLも変わるので、長めにキャッシュしてよい
+        patch_cache_control(response, private=True, max_age=60 * 60 * 24 * 30)
+    else:
+        patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _limit_action_item_choices(form):
+    """アイテムの選択肢はJSで入れるので、描画時は選択中のものだけにする"""
+    form.fields['action_item'].queryset = ActionItem.objects.filter(
+        pk=form.instance.action_item_id, owner=form.user
+    ) if form.instance.action_item_id else ActionItem.objects.none()
+
+
 @login_required
 def schedule_create_form(request): # 引数から *args, **kwargs を削除
     """モーダルに表示するための空のスケジュール作成フォームを返すビュー"""
@@ -285,43 +809,62 @@ def schedule_create_form(request): # 引数から *args, **kwargs を削除
 
     # フォームを初期化
     form = ScheduleForm(initial=initial_data, user=request.user)
-
-    categories = ActionCategory.objects.filter(owner=request.user)
-    track_pages_map = {cat.id: cat.track_pages for cat in categories}
-    
-    items_by_category = {}
-    action_items = ActionItem.objects.filter(owner=request.user).select_related('category')
-    
-    for item in action_items:
-        # カテゴリが設定されている場合のみ
-        if item.category:
-            cat_id = item.category.id
-            if cat_id not in items_by_category:
-                items_by_category[cat_id] = []
-            items_by_category[cat_id].append({'id': item.id, 'title': item.title})
+    _limit_action_item_choices(form)
 
     context = {
         'form': form,
-        'track_pages_map': json.dumps(track_pages_map),
-        'items_by_category': json.dumps(items_by_category), # ★JSONで渡す
+        'recurrence_form': ScheduleRecurrenceForm(prefix='recurrence'),
+        'form_options_version': get_form_options_version(request.user.pk),
     }
     return render(request, 'todo/partials/schedule_create_form.html', context)
 
+def _hx_trigger(response, **events):
+    """HX-Trigger ヘッダーにイベントを載せる（ensure_ascii で日本語もヘッダーに入れられる）"""
+    response['HX-Trigger'] = json.dumps(events)
+    return response
+
+
+def _schedule_saved_response(request, schedule, summary=False):
+    """保存したスケジュールを、カレンダーのイベントと同じ形で scheduleSaved イベントに載せて返す
+
+    詳細ページからの編集では、見出し部分（#schedule-summary）も差し替える。
+    時間が重なる予定があれば scheduleConflicts イベントで知らせる。
+    """
+    if summary:
+        response = render(request, 'todo/partials/schedule_summary.html', {'schedule': schedule, 'oob_swap': 'true'})
+    else:
+        response = HttpResponse()
+    events = {'closeModal': True, 'scheduleSaved': schedule_event_data(schedule.pk)}
+    conflicts = find_conflicts(schedule)
+    if conflicts:
+        events['scheduleConflicts'] = [serialize_block(block) for block in conflicts]
+    return _hx_trigger(response, **events)
+
+
 @login_required
 @require_POST
 def schedule_create(request):
     """スケジュールを作成し、ActionItemを「スケジュール済み」に更新するビュー"""
     form = ScheduleForm(request.POST, user=request.user)
-    if form.is_valid():
-        new_schedule = form.save(commit=False)
-        new_schedule.owner = request.user
-        new_schedule.save()
-
-        response = HttpResponse(status=204)
-        response['HX-Refresh'] = 'true'
-        return response
+    recurrence_form = ScheduleRecurrenceForm(request.POST, prefix='recurrence')
+    if form.is_valid() and recurrence_form.is_valid():
+        with transaction.atomic():
+            new_schedule = form.save(commit=False)
+            new_schedule.owner = request.user
+            new_schedule.save()
+            # 繰り返しはルールを1件保存するだけ（各回はカレンダー表示時に展開する）
+            if recurrence_form.is_recurring:
+                rule = recurrence_form.save(commit=False)
+                rule.schedule = new_schedule
+                rule.owner = request.user
+                rule.save()
+        return _schedule_saved_response(request, new_schedule)
     else:
-        context = {'form': form}
+        context = {
+            'form': form,
+            'recurrence_form': recurrence_form,
+            'form_options_version': get_form_options_version(request.user.pk),
+        }
         return render(request, 'todo/partials/schedule_create_form.html', context)
 
 @login_required
@@ -329,39 +872,40 @@ def schedule_create(request):
 def reorder_tasks(request):
     """タスクの並び順を更新する"""
     task_pks = request.POST.getlist('task_pks') # HTMXから送信されたタスクの主キーリスト
-    for index, pk in enumerate(task_pks):
-        try:
-            task = Task.objects.get(pk=pk, owner=request.user)
-            task.position = index
-            task.save()
-        except Task.DoesNotExist:
-            # 他人のタスクを操作しようとした場合などは無視
-            continue
+    positions = {int(pk): index for index, pk in enumerate(task_pks) if pk.isdecimal()}
+
+    with transaction.atomic():
+        # 他人のタスクはここで除外される
+        tasks = Task.objects.select_for_update().filter(pk__in=positions, owner=request.user).only('pk', 'position')
+        changed = []
+        for task in tasks:
+            if task.position != positions[task.pk]:
+                task.position = positions[task.pk]
+                changed.append(task)
+        if changed:
+            Task.objects.bulk_update(changed, ['position'])
     return HttpResponse(status=204) # 更新成功、コンテンツは返さない
 
+def _get_recurrence_form(schedule, data=None):
+    """繰り返しの設定フォーム。実体化された回そのものには出さない"""
+    if schedule.recurrence_source_id:
+        return None
+    rule = ScheduleRecurrence.objects.filter(schedule=schedule).first()
+    return ScheduleRecurrenceForm(data, instance=rule, prefix='recurrence')
+
+
 @login_required
 def schedule_edit_form(request, pk):
     """モーダルに表示するための、データが入ったスケジュール編集フォームを返す"""
     schedule = get_object_or_404(Schedule, pk=pk, owner=request.user)
     form = ScheduleForm(instance=schedule, user=request.user)
-
-    categories = ActionCategory.objects.filter(owner=request.user)
-    track_pages_map = {cat.id: cat.track_pages for cat in categories}
-
-    items_by_category = {}
-    action_items = ActionItem.objects.filter(owner=request.user).select_related('category')
-    for item in action_items:
-        if item.category:
-            cat_id = item.category.id
-            if cat_id not in items_by_category:
-                items_by_category[cat_id] = []
-            items_by_category[cat_id].append({'id': item.id, 'title': item.title})
+    _limit_action_item_choices(form)
 
     context = {
         'form': form, 
         'schedule': schedule,
-        'track_pages_map': json.dumps(track_pages_map),
-        'items_by_category': json.dumps(items_by_category), # ★追加
+        'recurrence_form': _get_recurrence_form(schedule),
+        'form_options_version': get_form_options_version(request.user.pk),
     }
     return render(request, 'todo/partials/schedule_edit_form.html', context)
 
@@ -372,13 +916,27 @@ def schedule_update(request, pk):
     schedule = get_object_or_404(Schedule, pk=pk, owner=request.user)
     # フォームにuserを渡すのを忘れない
     form = ScheduleForm(request.POST, instance=schedule, user=request.user)
-    if form.is_valid():
-        form.save()
-        response = HttpResponse(status=204)
-        response['HX-Refresh'] = 'true'
-        return response
+    recurrence_form = _get_recurrence_form(schedule, request.POST)
+    if form.is_valid() and (recurrence_form is None or recurrence_form.is_valid()):
+        with transaction.atomic():
+            form.save()
+            if recurrence_form is not None:
+                if recurrence_form.is_recurring:
+                    rule = recurrence_form.save(commit=False)
+                    rule.schedule = schedule
+                    rule.owner = request.user
+                    rule.save()
+                elif recurrence_form.instance.pk:
+                    # 繰り返しをやめる（実体化済みの回は通常の予定として残る）
+                    recurrence_form.instance.delete()
+        return _schedule_saved_response(request, schedule, summary=True)
     else:
-        context = {'form': form, 'schedule': schedule}
+        context = {
+            'form': form,
+            'schedule': schedule,
+            'recurrence_form': recurrence_form,
+            'form_options_version': get_form_options_version(request.user.pk),
+        }
         return render(request, 'todo/partials/schedule_edit_form.html', context)
 
 @login_required
@@ -388,29 +946,176 @@ def schedule_update_time(request):
     try:
         # request.bodyをデコードしてJSONとして読み込む
         data = json.loads(request.body.decode('utf-8'))
-        schedule_id = data.get('id')
-        new_start = data.get('start')
-        new_end = data.get('end')
+        if not isinstance(data, dict):
+            raise ValueError('request body must be an object')
+    except (ValueError, UnicodeDecodeError) as e:
+        logger.exception("Invalid request body in schedule_update_time")
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
-        schedule = get_object_or_404(Schedule, pk=schedule_id, owner=request.user)
+    # 文字列のまま代入せず、ここで aware な datetime にしてから保存する
+    new_start = _parse_calendar_datetime(data.get('start'))
+    new_end = _parse_calendar_datetime(data.get('end'))
+    if new_start is None:
+        return JsonResponse({'status': 'error', 'message': 'invalid start'}, status=400)
+    # endが無い場合は開始時刻から1時間にする
+    if new_end is None:
+        new_end = new_start + timedelta(hours=1)
+    if new_end <= new_start:
+        return JsonResponse({'status': 'error', 'message': 'end must be after start'}, status=400)
+
+    # 保存に失敗したときは、繰り返しの回の実体化も取り消す
+    try:
+        with transaction.atomic():
+            schedule = _get_schedule_for_update(request.user, data.get('id'))
+            schedule.start_time = new_start
+            schedule.end_time = new_end
+            schedule.save()
+    except Http404:
+        # カレンダー側はJSONを読んで元に戻すので、404もJSONで返す
+        return JsonResponse({'status': 'error', 'message': 'not found'}, status=404)
+
+    # 繰り返しの回を動かした場合は実体のIDが新しく付くので返す
+    return JsonResponse({
+        'status': 'success',
+        'id': schedule.pk,
+        'conflicts': [serialize_block(block) for block in find_conflicts(schedule)],
+    })
 
-        schedule.start_time = new_start
-        # new_endがNoneの場合もあるので、その場合は既存の終了時刻を使うか、開始時刻から計算する
-        schedule.end_time = new_end if new_end else schedule.start_time + timedelta(hours=1)
-        schedule.save()
+@login_required
+@require_POST
+def schedule_batch_update_time(request):
+    """複数のスケジュールの時間をまとめて更新する
 
-        return JsonResponse({'status': 'success'})
-    except Exception as e:
-        # エラーの詳細をログに出力するとデバッグに役立つ
-        print(f"Error in schedule_update_time: {e}")
+    リクエスト: {"moves": [{"id": 1, "start": "...", "end": "..."}, ...]}
+    """
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+    except (ValueError, UnicodeDecodeError) as e:
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    moves = data.get('moves') if isinstance(data, dict) else data
+    if not isinstance(moves, list):
+        return JsonResponse({'status': 'error', 'message': 'moves must be a list'}, status=400)
+
+    requested = []  # [(pk, 送られてきたID, (開始, 終了) またはエラーメッセージ)]
+    for move in moves:
+        schedule_id = move.get('id') if isinstance(move, dict) else None
+        # True/False は int として通ってしまうので、数値と文字列のIDだけ受け付ける
+        if isinstance(schedule_id, int) and not isinstance(schedule_id, bool):
+            pk = schedule_id
+        elif isinstance(schedule_id, str) and schedule_id.isdecimal():
+            pk = int(schedule_id)
+        elif isinstance(schedule_id, str) and parse_occurrence_key(schedule_id):
+            pk = None
+        else:
+            requested.append((None, schedule_id, 'invalid id'))
+            continue
+        # 存在しない日時（2月30日など）は None になるので、その回だけエラーにする
+        new_start = _parse_calendar_datetime(move.get('start'))
+        new_end = _parse_calendar_datetime(move.get('end'))
+        if new_start is None:
+            requested.append((None, schedule_id, 'invalid start'))
+            continue
+        # endが無い場合は開始時刻から1時間にする（schedule_update_time と同じ）
+        if new_end is None:
+            new_end = new_start + timedelta(hours=1)
+        if new_end <= new_start:
+            requested.append((None, schedule_id, 'end must be after start'))
+            continue
+        if pk is None:
+            # 繰り返しの回は、動かせると分かってから実体化して通常のIDとして扱う
+            try:
+                pk = _get_schedule_for_update(request.user, schedule_id).pk
+            except Http404:
+                requested.append((None, schedule_id, 'not found'))
+                continue
+        requested.append((pk, schedule_id, (new_start, new_end)))
+
+    results = []
+    with transaction.atomic():
+        # 所有者のチェックを1回のクエリでまとめて行う
+        valid_ids = [pk for pk, schedule_id, move in requested if pk is not None]
+        schedules = Schedule.objects.select_for_update().filter(pk__in=valid_ids, owner=request.user).in_bulk()
+        changed = []
+        affected_dates = set()
+        for pk, schedule_id, move in requested:
+            if pk is None:
+                results.append({'id': schedule_id, 'status': 'error', 'message': move})
+                continue
+            schedule = schedules.get(pk)
+            if schedule is None:
+                results.append({'id': schedule_id, 'status': 'error', 'message': 'not found'})
+                continue
+            new_start, new_end = move
+            affected_dates.add(timezone.localtime(schedule.start_time).date())
+            affected_dates.add(timezone.localtime(new_start).date())
+            schedule.start_time = new_start
+            schedule.end_time = new_end
+            changed.append(schedule)
+            results.append({'id': schedule_id, 'pk': schedule.pk, 'status': 'success'})
+        if changed:
+            Schedule.objects.bulk_update(changed, ['start_time', 'end_time'])
+            # bulk_update は save() を通らないので、動いた日の読書統計だけ作り直す
+            rebuild_reading_stats(user_ids=[request.user.pk], dates=affected_dates)
+
+    if changed:
+        # bulk_update ではシグナルが飛ばないので、キャッシュとライブ更新はここで行う
+        calendar_bulk_changed(request.user.pk)
+        # 日付が変わるとペースも変わる
+        for item_id in {schedule.action_item_id for schedule in changed} - {None}:
+            bump_reading_progress_version(item_id)
+
+    status = 'success' if all(result['status'] == 'success' for result in results) else 'partial'
+    return JsonResponse({'status': status, 'results': results})
+
+@login_required
+def schedule_import(request):
+    """.ics / CSV からスケジュールをまとめて取り込む"""
+    result = None
+    form = ScheduleImportForm()
+    if request.method == 'POST':
+        form = ScheduleImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            uploaded_file = form.cleaned_data['file']
+            try:
+                result = import_schedules(request.user, uploaded_file, detect_format(uploaded_file))
+            except (ValueError, csv.Error) as error:
+                form.add_error('file', str(error))
+    return render(request, 'todo/schedule_import.html', {
+        'form': form,
+        'result': result,
+        'csv_columns': ','.join(CSV_COLUMNS),
+    })
+
+@login_required
+def schedule_copy(request):
+    """期間内の予定をタスクごと別の期間へまとめてコピーする（先週の予定を今月の毎週に、など）"""
+    result = None
+    if request.method == 'POST':
+        form = ScheduleCopyForm(request.POST)
+        if form.is_valid():
+            result = copy_schedules(request.user, **form.cleaned_data)
+    else:
+        # 初期値は先週 → 今週から4週間
+        today = timezone.localdate()
+        start_of_week = today - timedelta(days=today.weekday())
+        form = ScheduleCopyForm(initial={
+            'source_start': start_of_week - timedelta(days=7),
+            'source_end': start_of_week - timedelta(days=1),
+            'target_start': start_of_week,
+            'target_end': start_of_week + timedelta(days=27),
+        })
+    return render(request, 'todo/schedule_copy.html', {'form': form, 'result': result})
 
 @login_required
 @require_POST
 def schedule_delete(request, pk):
     """スケジュールを削除する"""
     schedule = get_object_or_404(Schedule, pk=pk, owner=request.user)
-    schedule.delete()
+    with transaction.atomic():
+        if schedule.recurrence_source_id and schedule.occurrence_date:
+            # 繰り返しの回を消したときは、その日を除外日にして再展開されないようにする
+            add_exception_date(schedule.recurrence_source, schedule.occurrence_date)
+        schedule.delete()
     response = HttpResponse(status=204)
     response['HX-Redirect'] = reverse('todo:calendar')
     return response
@@ -432,24 +1137,19 @@ def schedule_detail(request, pk):
             return redirect('todo:schedule_detail', pk=pk)
     # --- ↑↑↑ ここまで追加 ↑↑↑ ---
 
-    tasks = schedule.tasks.order_by('completed', 'position')
-    total_tasks = tasks.count()
-    completed_tasks = tasks.filter(completed=True).count()
+    form = TaskForm() # 空のタスク作成フォームを準備
+    return _render_schedule_detail(request, schedule, form, reverse('todo:schedule_detail', kwargs={'pk': schedule.pk}))
 
-    if total_tasks > 0:
-        progress_percentage = (completed_tasks / total_tasks) * 100
-    else:
-        progress_percentage = 100
 
-    form = TaskForm() # 空のタスク作成フォームを準備
+def _render_schedule_detail(request, schedule, form, task_form_action):
+    # 実体化前の繰り返しの回（pk なし）はタスクも無い
+    tasks = schedule.tasks.order_by('completed', 'position') if schedule.pk else []
     context = {
         'schedule': schedule,
         'tasks': tasks,
-        'progress_percentage': progress_percentage,
-        'completed_tasks': completed_tasks,
-        'total_tasks': total_tasks,
+        **_task_progress(schedule),
         'form': form, # フォームをテンプレートに渡す
-        'task_form_action': reverse('todo:schedule_detail', kwargs={'pk': schedule.pk}),
+        'task_form_action': task_form_action,
     }
     return render(request, 'todo/schedule_detail.html', context)
 
@@ -462,18 +1162,17 @@ def toggle_task(request, pk):
 
     # completedフィールドの値を反転させる (True -> False, False -> True)
     task.completed = not task.completed
-    task.save()
+    task.save(update_fields=['completed'])
 
-    # 詳細ページ全体を再描画して返す
     schedule = task.schedule
-    tasks = schedule.tasks.order_by('completed', 'position')
-    total_tasks = tasks.count()
-    completed_tasks = tasks.filter(completed=True).count()
-    if total_tasks > 0:
-        progress_percentage = (completed_tasks / total_tasks) * 100
-    else:
-        progress_percentage = 100
+    progress = _task_progress(schedule)
 
+    if request.headers.get('HX-Target') == f'task-{task.pk}':
+        # 行だけを差し替え、プログレスバーは out-of-band で更新する
+        return render(request, 'todo/partials/task_toggle.html', {'task': task, **progress})
+
+    # 詳細ページ全体を再描画して返す
+    tasks = schedule.tasks.order_by('completed', 'position')
     form = TaskForm()
     if getattr(schedule, 'title_override', '') == TODAY_TASK_TITLE:
         task_form_action = reverse('todo:today_tasks_setup')
@@ -482,9 +1181,7 @@ def toggle_task(request, pk):
     context = {
         'schedule': schedule,
         'tasks': tasks,
-        'progress_percentage': progress_percentage,
-        'completed_tasks': completed_tasks,
-        'total_tasks': total_tasks,
+        **progress,
         'form': form,
         'task_form_action': task_form_action,
     }
@@ -500,6 +1197,7 @@ def toggle_action_item_completion(request, pk):
     
     # 部分テンプレートを更新して返す
     if _get_action_item_section_from_item(action_item) == 'reading':
+        attach_reading_progress([action_item])
         return render(request, 'todo/partials/reading_action_item_card.html', {'item': action_item})
     return render(request, 'todo/partials/action_item_list_item.html', {'item': action_item})
 
@@ -513,6 +1211,7 @@ def action_item_detail(request, pk):
     action_item = get_object_or_404(ActionItem, pk=pk, owner=request.user)
 
     schedules = action_item.schedules.all().order_by('start_time').prefetch_related('tasks')
+    attach_reading_progress([action_item])
 
     context = {
         'action_item': action_item,
@@ -527,15 +1226,7 @@ def action_item_list(request):
     action_items = ActionItem.objects.filter(owner=request.user).select_related('category')
 
     section_param = _normalize_action_item_section(request.GET.get('section', 'todo'))
-    if section_param == 'reading':
-        action_items = action_items.filter(category__name='読書')
-    elif section_param == 'private':
-        action_items = action_items.filter(Q(category__name='その他') | Q(category__isnull=True))
-    else:
-        section_param = 'todo'
-        action_items = action_items.exclude(
-            Q(category__name__in=['読書', 'その他']) | Q(category__isnull=True)
-        )
+    action_items = _filter_action_item_section(action_items, section_param)
 
     filter_param = request.GET.get('filter', 'all')
     if filter_param == 'completed':
@@ -547,13 +1238,48 @@ def action_item_list(request):
         if section_param == 'reading':
             action_items = action_items.filter(completed=False)
 
+    # キーセットページング: 並び順の値で続きを取るので、何ページ目でも同じコストで済む
+    cursor = _decode_cursor(
+        request.GET.get('after'),
+        READING_CURSOR_TYPES if section_param == 'reading' else ACTION_ITEM_CURSOR_TYPES,
+    )
+    if section_param == 'reading':
+        # 積読はテーマ順に並べ、テンプレートの regroup で見出しを付ける
+        action_items = action_items.annotate(theme_key=_reading_theme_key()).order_by('theme_key', 'title', 'pk')
+        if cursor:
+            action_items = _reading_items_after(action_items, cursor)
+    else:
+        action_items = action_items.order_by('completed', F('due_date').asc(nulls_last=True), 'pk')
+        if cursor:
+            action_items = _action_items_after(action_items, cursor)
+
+    page = list(action_items[:ACTION_ITEM_PAGE_SIZE + 1])
+    next_cursor = None
+    if len(page) > ACTION_ITEM_PAGE_SIZE:
+        page = page[:ACTION_ITEM_PAGE_SIZE]
+        last = page[-1]
+        if section_param == 'reading':
+            next_cursor = _encode_cursor([last.theme_key, last.title, last.pk])
+        else:
+            next_cursor = _encode_cursor([
+                last.completed, last.due_date.isoformat() if last.due_date else None, last.pk
+            ])
+
+    if section_param == 'reading':
+        attach_reading_progress(page)
+
     context = {
-        'action_items': action_items.order_by('completed', 'due_date', 'pk'),
+        'action_items': page,
+        'next_cursor': next_cursor,
         'filter_param': filter_param,
         'section_param': section_param,
+        # 前のページから続いているテーマには見出しを付けない
+        'continued_theme': cursor[0] if cursor and section_param == 'reading' else None,
     }
-    if section_param == 'reading':
-        context['reading_groups'] = _group_reading_items_by_theme(context['action_items'])
+
+    if cursor:
+        # 「もっと見る」: 続きの行と次のボタンだけを返す
+        return render(request, 'todo/partials/action_item_list_page.html', context)
 
     if request.headers.get('HX-Request'):
         return render(request, 'todo/partials/action_item_list_content.html', context)
@@ -591,9 +1317,19 @@ def action_item_create(request):
         if fixed_category:
             item.category = fixed_category
         item.save()
-        response = HttpResponse(status=204)
-        response['HX-Refresh'] = 'true' # ページ全体をリフレッシュ
-        return response
+        if section_param == 'reading':
+            # 積読はテーマごとのまとまりに入るので、一覧を読み直してもらう
+            return _hx_trigger(HttpResponse(), closeModal=True, actionItemsChanged=True)
+        if _get_action_item_section_from_item(item) != section_param:
+            return _hx_trigger(HttpResponse(), closeModal=True)
+        context = {
+            'item': item,
+            'created': True,
+            'was_empty': not _filter_action_item_section(
+                ActionItem.objects.filter(owner=request.user).exclude(pk=item.pk), section_param
+            ).exists(),
+        }
+        return _hx_trigger(render(request, 'todo/partials/action_item_saved.html', context), closeModal=True)
     return render(request, 'todo/partials/action_item_form.html', {
         'form': form,
         'section_param': section_param,
@@ -632,9 +1368,10 @@ def action_item_update(request, pk):
         if fixed_category:
             updated_item.category = fixed_category
         updated_item.save()
-        response = HttpResponse(status=204)
-        response['HX-Refresh'] = 'true' # ページ全体をリフレッシュ
-        return response
+        if section_param == 'reading':
+            attach_reading_progress([updated_item])
+        context = {'item': updated_item, 'section_param': section_param}
+        return _hx_trigger(render(request, 'todo/partials/action_item_saved.html', context), closeModal=True)
     return render(request, 'todo/partials/action_item_form.html', {
         'form': form,
         'item': item,
@@ -646,10 +1383,10 @@ def action_item_update(request, pk):
 def action_item_delete(request, pk):
     """ActionItemを削除する"""
     item = get_object_or_404(ActionItem, pk=pk, owner=request.user)
+    item_pk = item.pk
     item.delete()
-    response = HttpResponse(status=204)
-    response['HX-Refresh'] = 'true' # ページ全体をリフレッシュ
-    return response
+    response = HttpResponse(f'<div id="action-item-{item_pk}" hx-swap-oob="delete"></div>')
+    return _hx_trigger(response, closeModal=True)
 
 
 @login_required
@@ -688,8 +1425,8 @@ def category_list(request):
     categories = ActionCategory.objects.filter(owner=request.user).order_by('id')
     context = {
         'categories': categories,
-        'periodic_tasks': _build_periodic_task_items(request.user),
-        'daily_routines': DailyRoutineTask.objects.filter(owner=request.user).order_by('position', 'id'),
+        'periodic_tasks': _build_periodic_task_items(request.user, _parse_due_within(request)),
+        'daily_routines': routines_with_stats(request.user),
         'daily_routine_form': DailyRoutineTaskForm(),
     }
     return render(request, 'todo/category_list.html', context)
@@ -709,10 +1446,13 @@ def category_create(request):
         category = form.save(commit=False)
         category.owner = request.user
         category.save()
-        # 成功したらリフレッシュ
-        response = HttpResponse(status=204)
-        response['HX-Refresh'] = 'true'
-        return response
+        context = {
+            'category': category,
+            'created': True,
+            'was_empty': not ActionCategory.objects.filter(owner=request.user).exclude(pk=category.pk).exists(),
+        }
+        response = render(request, 'todo/partials/category_saved.html', context)
+        return _hx_trigger(response, closeModal=True)
     return render(request, 'todo/partials/category_form.html', {'form': form})
 
 @login_required
@@ -730,9 +1470,8 @@ def category_update(request, pk):
     form = ActionCategoryForm(request.POST, instance=category)
     if form.is_valid():
         form.save()
-        response = HttpResponse(status=204)
-        response['HX-Refresh'] = 'true'
-        return response
+        response = render(request, 'todo/partials/category_saved.html', {'category': category})
+        return _hx_trigger(response, closeModal=True)
     return render(request, 'todo/partials/category_form.html', {'form': form, 'category': category})
 
 @login_required
@@ -740,24 +1479,78 @@ def category_update(request, pk):
 def category_delete(request, pk):
     """カテゴリ削除処理"""
     category = get_object_or_404(ActionCategory, pk=pk, owner=request.user)
+    category_pk = category.pk
     category.delete()
-    response = HttpResponse(status=204)
-    response['HX-Refresh'] = 'true'
-    return response
+    response = HttpResponse(f'<tr id="category-{category_pk}" hx-swap-oob="delete"></tr>')
+    return _hx_trigger(response, closeModal=True)
+
+def _page_records(user, start_datetime, end_datetime):
+    """ページ数を記録したスケジュール（期間内）"""
+    return Schedule.objects.filter(
+        owner=user,
+        action_category__track_pages=True,
+        page_count__isnull=False,
+        start_time__range=(start_datetime, end_datetime)
+    )
+
+
+def _daily_page_totals(user, start_date, end_date):
+    """現地(Asia/Tokyo)の日付ごとのページ数合計 {date: pages}（集計テーブルから読む）"""
+    rows = (
+        DailyReadingStat.objects
+        .filter(owner=user, date__range=(start_date, end_date))
+        .values('date')
+        .annotate(total_pages=Sum('pages'))
+        .order_by('date')
+    )
+    return {row['date']: row['total_pages'] for row in rows if row['total_pages']}
+
+
+def _reading_streaks(user, today):
+    """読書した日の連続記録 (現在の連続日数, 最長の連続日数)"""
+    reading_dates = (
+        DailyReadingStat.objects
+        .filter(owner=user, pages__gt=0)
+        .order_by('date')
+        .values_list('date', flat=True)
+        .distinct()
+    )
+    longest = current = 0
+    previous = None
+    for reading_date in reading_dates:
+        if previous is not None and reading_date - previous == timedelta(days=1):
+            current += 1
+        else:
+            current = 1
+        longest = max(longest, current)
+        previous = reading_date
+    # 今日か昨日まで続いていなければ途切れている
+    if previous is None or (today - previous).days > 1:
+        current = 0
+    return current, longest
+
+
+def _heat_opacity(pages, max_pages):
+    # pagesが0なら0、それ以外は max_pages に対する割合（最低0.2の濃さは保証）
+    if max_pages > 0 and pages > 0:
+        return max(0.2, pages / max_pages)
+    return 0
+
 
 @login_required
 def weekly_summary(request):
     # 1. 表示する基準日を決める
+    today = timezone.localdate()
     date_str = request.GET.get('date')
     if date_str:
         try:
             # URLから渡された日付をパース
             target_date = datetime.strptime(date_str, '%Y-%m-%d').date()
         except ValueError:
-            target_date = date.today()
+            target_date = today
     else:
         # 指定がなければ今日
-        target_date = date.today()
+        target_date = today
 
     # 2. その週の月曜日と日曜日を計算
     # target_date.weekday() : 月=0, ..., 日=6
@@ -768,48 +1561,36 @@ def weekly_summary(request):
     prev_week_start = start_of_week - timedelta(days=7)
     next_week_start = start_of_week + timedelta(days=7)
 
-    # --- 以下、集計ロジック（既存のままですが、変数は start_of_week を使います） ---
-    
     # タイムゾーン考慮してdatetimeにする
     start_datetime = timezone.make_aware(datetime.combine(start_of_week, datetime.min.time()))
     end_datetime = timezone.make_aware(datetime.combine(end_of_week, datetime.max.time()))
 
-    records = Schedule.objects.filter(
-        owner=request.user,
-        action_category__track_pages=True,
-        page_count__isnull=False,
-        start_time__range=(start_datetime, end_datetime)
-    ).select_related('action_category').order_by('start_time')
-
-    total_pages = records.aggregate(Sum('page_count'))['page_count__sum'] or 0
-
-    # グラフ用データ作成（日別）
-    daily_stats = {}
-    for i in range(7):
-        date_obj = start_of_week + timedelta(days=i)
-        daily_stats[date_obj] = 0
+    records = _page_records(request.user, start_datetime, end_datetime)
 
-    for record in records:
-        local_date = timezone.localtime(record.start_time).date()
-        if local_date in daily_stats:
-            daily_stats[local_date] += record.page_count
-
-    daily_labels = [d.strftime('%m/%d') for d in daily_stats.keys()]
-    daily_data = list(daily_stats.values())
+    # グラフ用データ作成（日別）: 集計テーブルから現地の日付ごとに読む
+    totals = _daily_page_totals(request.user, start_of_week, end_of_week)
+    week_dates = [start_of_week + timedelta(days=i) for i in range(7)]
+    daily_labels = [d.strftime('%m/%d') for d in week_dates]
+    daily_data = [totals.get(d, 0) for d in week_dates]
 
     # カテゴリ別集計
-    category_summary = {}
-    for record in records:
-        cat_name = record.action_category.name
-        category_summary[cat_name] = category_summary.get(cat_name, 0) + record.page_count
-    
+    category_rows = (
+        DailyReadingStat.objects
+        .filter(owner=request.user, date__range=(start_of_week, end_of_week))
+        .values('category__name')
+        .annotate(total_pages=Sum('pages'))
+        .order_by('category__name')
+    )
+    category_summary = {row['category__name']: row['total_pages'] for row in category_rows}
+    total_pages = sum(category_summary.values())
+
     pie_labels = list(category_summary.keys())
     pie_data = list(category_summary.values())
 
     context = {
         'start_date': start_of_week,
         'end_date': end_of_week,
-        'records': records,
+        'records': records.select_related('action_category', 'action_item').order_by('start_time'),
         'total_pages': total_pages,
         'category_summary': category_summary,
         'daily_labels': json.dumps(daily_labels),
@@ -819,10 +1600,98 @@ def weekly_summary(request):
         # ★追加：ボタン用の日付文字列
         'prev_week_date': prev_week_start.strftime('%Y-%m-%d'),
         'next_week_date': next_week_start.strftime('%Y-%m-%d'),
-        'is_this_week': start_of_week == (date.today() - timedelta(days=date.today().weekday())),
+        'is_this_week': start_of_week == (today - timedelta(days=today.weekday())),
     }
     return render(request, 'todo/weekly_summary.html', context)
 
+TIME_SUMMARY_DEFAULT_DAYS = {'day': 30, 'week': 7 * 12, 'month': 365}
+
+
+def _parse_time_summary_params(params):
+    """時間の集計の (開始日, 終了日, 単位) を読む。不正なら ValueError"""
+    unit = params.get('unit') or 'week'
+    if unit not in TIME_UNITS:
+        raise ValueError(f'unit must be one of {", ".join(TIME_UNITS)}')
+    end_date = parse_date(params.get('end') or '') if params.get('end') else timezone.localdate()
+    if end_date is None:
+        raise ValueError('invalid end')
+    start_date = None
+    if params.get('start'):
+        start_date = parse_date(params['start'])
+        if start_date is None:
+            raise ValueError('invalid start')
+    if not all(_is_summary_year(day.year) for day in (start_date, end_date) if day is not None):
+        raise ValueError(f'dates must be between {MINYEAR + 1} and {MAXYEAR - 1}')
+    if start_date is None:
+        start_date = end_date - timedelta(days=TIME_SUMMARY_DEFAULT_DAYS[unit] - 1)
+    if end_date < start_date or (end_date - start_date).days >= MAX_RANGE_DAYS:
+        raise ValueError(f'end must be within {MAX_RANGE_DAYS} days after start')
+    return start_date, end_date, unit
+
+
+def _time_summary_etag(request, *args, **kwargs):
+    # 既定の終了日は今日なので、日付が変わったら別のETagになるよう解決後の期間と単位も入れる
+    try:
+        start_date, end_date, unit = _parse_time_summary_params(request.GET)
+    except ValueError:
+        return None
+    version = get_calendar_version(request.user.pk)
+    return f'"{request.user.pk}-{version}-{unit}-{start_date:%Y%m%d}-{end_date:%Y%m%d}"'
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_time_summary_etag)
+def time_summary_data(request):
+    """カテゴリ別・日/週/月ごとの予定時間（グラフ用のJSON）
+
+    例: ?start=2025-01-01&end=2026-12-31&unit=month
+    """
+    try:
+        start_date, end_date, unit = _parse_time_summary_params(request.GET)
+        buckets, series = time_by_category(request.user.pk, start_date, end_date, unit)
+    except ValueError as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+    return JsonResponse({
+        'status': 'success',
+        'unit': unit,
+        'start': start_date.isoformat(),
+        'end': end_date.isoformat(),
+        'buckets': [bucket.isoformat() for bucket in buckets],
+        'series': [
+            {
+                'category_id': row['category_id'],
+                'name': row['name'],
+                'color': row['color'],
+                'hours': [round(duration.total_seconds() / 3600, 2) for duration in row['durations']],
+                'total_hours': round(sum(row['durations'], timedelta(0)).total_seconds() / 3600, 2),
+            }
+            for row in series
+        ],
+    })
+
+
+@login_required
+def time_summary(request):
+    """カテゴリ別の時間の使い方（グラフはJSONを読み込んで描く）"""
+    try:
+        start_date, end_date, unit = _parse_time_summary_params(request.GET)
+    except ValueError:
+        start_date, end_date, unit = _parse_time_summary_params({})
+    context = {
+        'start_date': start_date,
+        'end_date': end_date,
+        'unit': unit,
+        'units': [('day', '日'), ('week', '週'), ('month', '月')],
+    }
+    return render(request, 'todo/time_summary.html', context)
+
+
+def _is_summary_year(year):
+    # 前後の年へのリンクやタイムゾーン変換で date/datetime の範囲を超えないように、両端の年は除く
+    return MINYEAR < year < MAXYEAR
+
+
 @login_required
 def monthly_summary(request):
     """月間ヒートマップを表示するビュー"""
@@ -831,7 +1700,7 @@ def monthly_summary(request):
     year = request.GET.get('year')
     month = request.GET.get('month')
     
-    today = date.today()
+    today = timezone.localdate()
     if year and month:
         try:
             current_year = int(year)
@@ -842,34 +1711,21 @@ def monthly_summary(request):
     else:
         current_year = today.year
         current_month = today.month
+    if not 1 <= current_month <= 12 or not _is_summary_year(current_year):
+        current_year, current_month = today.year, today.month
 
     # 2. その月のデータを取得
     # 月の初日と最終日を計算
     _, last_day = calendar.monthrange(current_year, current_month)
-    start_date = datetime(current_year, current_month, 1)
-    end_date = datetime(current_year, current_month, last_day, 23, 59, 59)
-    
-    # タイムゾーン対応
-    start_datetime = timezone.make_aware(start_date)
-    end_datetime = timezone.make_aware(end_date)
+    start_date = date(current_year, current_month, 1)
+    end_date = date(current_year, current_month, last_day)
 
-    # ページ数記録ONのデータを取得
-    records = Schedule.objects.filter(
-        owner=request.user,
-        action_category__track_pages=True,
-        page_count__isnull=False,
-        start_time__range=(start_datetime, end_datetime)
-    )
-
-    # 日ごとの合計を計算 {day(int): pages(int)}
-    daily_pages = {}
-    max_pages = 0 # ヒートマップの基準（その月で一番読んだ日のページ数）
-    
-    for record in records:
-        day = record.start_time.day
-        daily_pages[day] = daily_pages.get(day, 0) + record.page_count
-        if daily_pages[day] > max_pages:
-            max_pages = daily_pages[day]
+    # 日ごとの合計 {day(int): pages(int)}（現地の日付で集計済みのテーブルから読む）
+    daily_pages = {
+        local_date.day: pages
+        for local_date, pages in _daily_page_totals(request.user, start_date, end_date).items()
+    }
+    max_pages = max(daily_pages.values(), default=0) # ヒートマップの基準（その月で一番読んだ日のページ数）
 
     # 3. カレンダー作成
     cal = calendar.Calendar(firstweekday=0) # 0=月曜始まり
@@ -883,16 +1739,10 @@ def monthly_summary(request):
                 week_data.append(None)
             else:
                 pages = daily_pages.get(day, 0)
-                # 色の濃さを計算 (0.0 〜 1.0)
-                # pagesが0なら0、それ以外は max_pages に対する割合（最低0.1は確保）
-                opacity = 0
-                if max_pages > 0 and pages > 0:
-                    opacity = max(0.2, pages / max_pages) # 最低0.2の濃さは保証
-                
                 week_data.append({
                     'day': day,
                     'pages': pages,
-                    'opacity': opacity
+                    'opacity': _heat_opacity(pages, max_pages),
                 })
         month_calendar.append(week_data)
 
@@ -917,6 +1767,66 @@ def monthly_summary(request):
     }
     return render(request, 'todo/monthly_summary.html', context)
 
+@login_required
+def yearly_summary(request):
+    """1年分のページ数ヒートマップ（GitHubの草のような表示）"""
+    today = timezone.localdate()
+    try:
+        current_year = int(request.GET.get('year', today.year))
+    except ValueError:
+        current_year = today.year
+    if not _is_summary_year(current_year):
+        current_year = today.year
+
+    first_day = date(current_year, 1, 1)
+    last_day = date(current_year, 12, 31)
+
+    # 365日分を1回のグループ集計で取得する
+    daily_pages = _daily_page_totals(request.user, first_day, last_day)
+    max_pages = max(daily_pages.values(), default=0)
+
+    # 月曜始まりの週ごとに並べる（年の前後の日は空白）
+    grid_start = first_day - timedelta(days=first_day.weekday())
+    grid_end = last_day + timedelta(days=6 - last_day.weekday())
+    weeks = []
+    current = grid_start
+    while current <= grid_end:
+        week = []
+        for _ in range(7):
+            if first_day <= current <= last_day:
+                pages = daily_pages.get(current, 0)
+                week.append({'date': current, 'pages': pages, 'opacity': _heat_opacity(pages, max_pages)})
+            else:
+                week.append(None)
+            current += timedelta(days=1)
+        weeks.append(week)
+
+    # 表示は「行=曜日、列=週」にする
+    weekday_rows = [
+        {'label': label, 'cells': [week[index] for week in weeks]}
+        for index, label in enumerate(['月', '火', '水', '木', '金', '土', '日'])
+    ]
+    # 各月の最初の週に月ラベルを付ける
+    month_labels = []
+    for week in weeks:
+        first_of_month = next((cell for cell in week if cell and cell['date'].day == 1), None)
+        month_labels.append(f"{first_of_month['date'].month}月" if first_of_month else '')
+
+    current_streak, longest_streak = _reading_streaks(request.user, today)
+
+    context = {
+        'year': current_year,
+        'prev_year': current_year - 1,
+        'next_year': current_year + 1,
+        'weekday_rows': weekday_rows,
+        'month_labels': month_labels,
+        'total_pages': sum(daily_pages.values()),
+        'reading_days': len([pages for pages in daily_pages.values() if pages]),
+        'current_streak': current_streak,
+        'longest_streak': longest_streak,
+    }
+    return render(request, 'todo/yearly_summary.html', context)
+
 @login_required
 @require_POST
 def pomodoro_start(request):
@@ -991,34 +1901,27 @@ def periodic_task_update(request, pk):
 @require_POST
 def periodic_task_done(request, pk):
     task = get_object_or_404(PeriodicTask, pk=pk, owner=request.user)
-    task.last_done = date.today()
-    task.save()
+    task.last_done = timezone.localdate()
+    task.save(update_fields=['last_done'])
     return redirect(request.META.get('HTTP_REFERER', reverse('todo:today_tasks_setup')))
 
+@cache_control(no_cache=True)
+@condition(etag_func=_public_calendar_events_etag, last_modified_func=_public_calendar_events_last_modified)
 def public_calendar_events(request):
     """
     公開用カレンダーのイベントデータを返す
     - 内容は伏せて「予定あり」で統一
     """
-    target_user_id = 1
-    schedules = (
-        Schedule.objects
-        .filter(owner_id=target_user_id)
-        .exclude(title_override=TODAY_TASK_TITLE)
-        .select_related('action_category', 'action_item')
-    )
-
-    events = []
-    for schedule in schedules:
-        title_text = "予定あり"
-        bg_color = "#6c757d"
-
-        events.append({
-            'title': title_text,
-            'start': schedule.start_time.isoformat(),
-            'end': schedule.end_time.isoformat(),
-            'backgroundColor': bg_color,
-            'borderColor': bg_color,
-        })
-
+    # 重なる予定をまとめた「予定あり」ブロックをキャッシュから返す（Scheduleは読まない）
+    range_start, range_end = _calendar_range(request)
+    blocks = busy_blocks_in_range(get_busy_blocks(PUBLIC_CALENDAR_OWNER_ID), range_start, range_end)
+    if range_start and range_end:
+        # 繰り返し予定は表示範囲の分だけ展開して合流させる
+        recurring = recurring_busy_intervals(PUBLIC_CALENDAR_OWNER_ID, range_start, range_end)
+        if recurring:
+            blocks = merge_intervals(list(blocks) + recurring)
+    events = [
+        {'title': "予定あり", 'start': timezone.localtime(start).isoformat(), 'end': timezone.localtime(end).isoformat()}
+        for start, end in blocks
+    ]
     return JsonResponse(events, safe=False)